@@ -0,0 +1,155 @@
+"""
+Measure what the detail panel costs the GUI thread on a torrent with many pieces.
+
+Times table refresh ticks with the panel hidden and with it open on a
+seeded torrent of 100k pieces, and the piece map itself: the NumPy
+downsampling against a plain Python loop over the bitfield.
+
+    python -m benchmarks.bench_detail_panel --pieces 100000 --ticks 20
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+import libtorrent as lt
+from PyQt6.QtWidgets import QApplication, QMainWindow
+from PyQt6.QtCore import Qt
+from modules.core.torrent_manager import TorrentManager
+from modules.utils.settings_handler import SettingsHandler
+from modules.ui.table_manager import setup_table, update_table
+from modules.ui.detail_panel import DetailPanel, fetch_details, piece_map
+from benchmarks.bench_table_refresh import make_torrents, tick
+from benchmarks.swarm import working_directory, loopback
+
+PIECE_SIZE = 16 * 1024
+BINS = 1000  # pixel columns of the piece bar
+
+
+def make_sparse_torrent(directory, pieces):
+    """Return the torrent_info of a sparse, all-zero file of ``pieces`` pieces, and its save path."""
+    path = os.path.join(directory, "sparse.bin")
+    with open(path, "wb") as f:
+        f.truncate(pieces * PIECE_SIZE)
+    files = lt.file_storage()
+    files.add_file("sparse.bin", pieces * PIECE_SIZE)
+    torrent = lt.create_torrent(files, PIECE_SIZE, lt.create_torrent.v1_only)
+    digest = hashlib.sha1(bytes(PIECE_SIZE)).digest()
+    for piece in range(pieces):
+        torrent.set_hash(piece, digest)
+    return lt.torrent_info(lt.bdecode(lt.bencode(torrent.generate()))), directory
+
+
+def legacy_piece_map(have, availability, bins):
+    """The piece map computed with Python loops over the bitfield."""
+    done, least = [], []
+    for column in range(bins):
+        first, last = column * len(have) // bins, (column + 1) * len(have) // bins
+        done.append(sum(have[first:last]) / max(last - first, 1))
+        least.append(min((availability[piece] + have[piece] for piece in range(first, last)), default=0))
+    return done, least
+
+
+def _time_ticks(app, model, torrents, ticks, active, panel=None):
+    """Return the mean milliseconds the GUI thread spends per tick, panel fetches included."""
+    times = []
+    for _ in range(ticks):
+        changed = tick(torrents, active)
+        start = time.perf_counter()
+        if panel is not None:
+            panel.refresh()
+        update_table(model, changed)
+        app.processEvents()
+        elapsed = time.perf_counter() - start
+        # The fetch runs on its own thread; count only the GUI-thread work of rendering it
+        while panel is not None and panel._fetching:
+            time.sleep(0.001)
+            start = time.perf_counter()
+            app.processEvents()
+            elapsed += time.perf_counter() - start
+        times.append(elapsed)
+    return 1000 * sum(times) / ticks
+
+
+def run(pieces, torrents, ticks, active, app):
+    """Return the tick times with the panel hidden and open, and the cost of a piece map."""
+    with tempfile.TemporaryDirectory() as directory, working_directory(directory):
+        info, save_path = make_sparse_torrent(directory, pieces)
+        torrentmanager = TorrentManager(settings=loopback(SettingsHandler("settings.ini")))
+        try:
+            info_hash = torrentmanager.add_torrent(info, save_path, seed=True)
+            while torrentmanager.get_handle(info_hash) is None:
+                time.sleep(0.01)
+            handle = torrentmanager.get_handle(info_hash)
+
+            window = QMainWindow()
+            window.show_context_menu = lambda position: None
+            table, model = setup_table(window)
+            window.setCentralWidget(table)
+            panel = DetailPanel(window, torrentmanager=torrentmanager)
+            window.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, panel)
+            panel.hide()
+            window.resize(BINS + 40, 700)
+            window.show()
+            rows = make_torrents(torrents)
+            update_table(model, [dict(torrent) for torrent in rows])
+            app.processEvents()
+
+            hidden_ms = _time_ticks(app, model, rows, ticks, active)
+            panel.set_torrent(info_hash)
+            panel.show()
+            panel.timer.stop()  # ticks are driven here
+            app.processEvents()
+            open_ms = _time_ticks(app, model, rows, ticks, active, panel)
+
+            start = time.perf_counter()
+            for _ in range(ticks):
+                fetch_details(handle, BINS, peers=True)
+            fetch_ms = 1000 * (time.perf_counter() - start) / ticks
+        finally:
+            torrentmanager.stop()
+
+    have = np.ones(pieces, dtype=bool)
+    have[::3] = False
+    availability = np.zeros(pieces, dtype=np.int32)
+    start = time.perf_counter()
+    legacy_piece_map(have.tolist(), availability.tolist(), BINS)
+    legacy_ms = 1000 * (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        piece_map(have, availability, BINS)
+    numpy_ms = 1000 * (time.perf_counter() - start) / ticks
+
+    return {
+        "pieces": pieces,
+        "torrents": torrents,
+        "active": active,
+        "ticks": ticks,
+        "hidden_ms_per_tick": hidden_ms,
+        "open_ms_per_tick": open_ms,
+        "fetch_ms": fetch_ms,
+        "legacy_piece_map_ms": legacy_ms,
+        "numpy_piece_map_ms": numpy_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pieces", type=int, default=100_000)
+    parser.add_argument("--torrents", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--active", type=int, default=200, help="torrents changing per tick")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    print(json.dumps(run(args.pieces, args.torrents, args.ticks, min(args.active, args.torrents), app), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure TorrentManager startup, status and metadata costs with K torrents loaded.
+
+Each run creates K small tracker-less torrents, then starts TorrentManager
+twice: a cold start that checks every torrent on disk, and a warm start
+from the resume data the first run saved.
+
+    python -m benchmarks.bench_engine --torrents 1000
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from modules.core.torrent_manager import TorrentManager
+from modules.utils.settings_handler import SettingsHandler
+from benchmarks.swarm import make_library, write_metadata, working_directory, loopback
+
+
+def _start(timeout):
+    """Start a TorrentManager and return it with the seconds until every torrent was added."""
+    start = time.perf_counter()
+    torrentmanager = TorrentManager(settings=loopback(SettingsHandler("settings.ini")))
+    torrentmanager.loaded.wait(timeout)
+    return torrentmanager, time.perf_counter() - start
+
+
+def _get_torrents_ms(torrentmanager, repeats):
+    """Return the mean milliseconds of one get_torrents call."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        torrentmanager.get_torrents()
+    return 1000 * (time.perf_counter() - start) / repeats
+
+
+def _select_ms(torrentmanager, repeats):
+    """Return the mean milliseconds of a name search through the registry, statuses included."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        torrentmanager.get_torrents(torrentmanager.torrents.select(search="00001"))
+    return 1000 * (time.perf_counter() - start) / repeats
+
+
+def run(count=1000, repeats=20, timeout=600):
+    """Return startup, get_torrents, select and metadata save timings with ``count`` torrents."""
+    with tempfile.TemporaryDirectory() as directory, working_directory(directory):
+        torrents = make_library(directory, count)
+        write_metadata(directory, torrents, os.path.join(directory, "content"))
+
+        results = {"torrents": count}
+        for phase in ("cold", "warm"):
+            torrentmanager, startup = _start(timeout)
+            # Let the first status batch arrive so get_torrents sees every torrent
+            time.sleep(1.5)
+            results[f"{phase}_startup_s"] = startup
+            results[f"{phase}_get_torrents_ms"] = _get_torrents_ms(torrentmanager, repeats)
+            results[f"{phase}_select_ms"] = _select_ms(torrentmanager, repeats)
+
+            start = time.perf_counter()
+            torrentmanager.stop()
+            results[f"{phase}_stop_s"] = time.perf_counter() - start
+            results[f"{phase}_metadata_save_s"] = torrentmanager.metrics.timings()["metadata_save"]["mean"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--torrents", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.torrents, args.repeats), indent=4))
+
+
+if __name__ == "__main__":
+    main()
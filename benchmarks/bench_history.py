@@ -0,0 +1,111 @@
+"""
+Measure the memory and the per-second cost of the rate history.
+
+Fills the history of N torrents for a simulated day, sample by sample,
+and compares its memory with keeping the same samples as Python tuples
+in a deque per torrent and resolution.
+
+    python -m benchmarks.bench_history --torrents 10000 --hours 24
+"""
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from collections import deque
+from types import SimpleNamespace
+from modules.core.rate_history import RateHistory, RESOLUTIONS
+from modules.core.status_cache import info_hash_of
+from modules.utils.settings_handler import SettingsHandler
+from benchmarks.swarm import working_directory, loopback
+
+LEGACY_TORRENTS = 1000  # the tuple baseline is measured on fewer torrents and scaled up
+
+
+def make_statuses(count):
+    """Create synthetic torrent statuses with the fields the history reads."""
+    return [
+        SimpleNamespace(
+            info_hashes=SimpleNamespace(get_best=lambda index=index: f"{index:040x}"),
+            download_rate=0, upload_rate=0, num_peers=0,
+        )
+        for index in range(count)
+    ]
+
+
+def churn(statuses, active):
+    """Change the rates of ``active`` random torrents and return them, like a status batch."""
+    changed = random.sample(statuses, active)
+    for status in changed:
+        status.download_rate = random.randint(0, 5_000_000)
+        status.upload_rate = random.randint(0, 500_000)
+        status.num_peers = random.randint(0, 50)
+    return changed
+
+
+def legacy_bytes(settings):
+    """Return the traced bytes of full rings of (time, download, upload, peers) tuples in deques."""
+    tracemalloc.start()
+    history = {}
+    for index in range(LEGACY_TORRENTS):
+        history[f"{index:040x}"] = {
+            name: deque(
+                ((float(now), random.random(), random.random(), float(now % 50))
+                 for now in range(settings.get_int("History", name, 1))),
+                maxlen=settings.get_int("History", name, 1),
+            )
+            for name, _ in RESOLUTIONS
+        }
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def run(torrents, hours, active):
+    """Return the memory of the history and the mean cost of a sample and of a status batch."""
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory, working_directory(directory):
+        settings = loopback(SettingsHandler("settings.ini"))
+        history = RateHistory(settings)
+        statuses = make_statuses(torrents)
+        for status in statuses:
+            history.add(info_hash_of(status))
+        history.update(statuses)
+
+        seconds = int(hours * 3600)
+        sample_time = update_time = 0.0
+        for now in range(seconds):
+            batch = churn(statuses, active)
+            start = time.perf_counter()
+            history.update(batch)
+            update_time += time.perf_counter() - start
+            start = time.perf_counter()
+            history.sample(now)
+            sample_time += time.perf_counter() - start
+
+        legacy = legacy_bytes(settings) * torrents / LEGACY_TORRENTS
+        settings.close()
+
+    return {
+        "torrents": torrents,
+        "hours": hours,
+        "active": active,
+        "history_mb": history.nbytes / 1e6,
+        "legacy_tuples_mb": legacy / 1e6,
+        "sample_us": sample_time / seconds * 1e6,
+        "update_us": update_time / seconds * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--torrents", type=int, default=10_000)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--active", type=int, default=200, help="torrents changing per second")
+    args = parser.parse_args()
+    print(json.dumps(run(args.torrents, args.hours, min(args.active, args.torrents)), indent=4))
+
+
+if __name__ == "__main__":
+    main()
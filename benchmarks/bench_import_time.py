@@ -0,0 +1,50 @@
+"""
+Measure the cold-start import cost of the headless engine.
+
+Runs ``python -m modules.daemon --check-imports`` in fresh interpreters and
+fails if any run imported Qt.
+
+    python -m benchmarks.bench_import_time --runs 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def run(runs):
+    """Return wall-clock and in-process import timings over ``runs`` fresh interpreters."""
+    wall, imports, qt = [], [], False
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-m", "modules.daemon", "--check-imports"],
+            capture_output=True, text=True,
+        )
+        wall.append(time.perf_counter() - start)
+        fields = dict(field.split("=") for field in result.stdout.split())
+        imports.append(float(fields["import_time_ms"]))
+        qt = qt or fields["qt_loaded"] == "True"
+
+    return {
+        "runs": runs,
+        "interpreter_start_ms": 1000 * statistics.median(wall),
+        "engine_import_ms": statistics.median(imports),
+        "qt_loaded": qt,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    print(json.dumps(results, indent=4))
+    sys.exit(1 if results["qt_loaded"] else 0)
+
+
+if __name__ == "__main__":
+    main()
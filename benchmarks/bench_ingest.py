@@ -0,0 +1,94 @@
+"""
+Measure watch-folder ingestion and magnet metadata fetching, offline.
+
+Drops K .torrent files, a tenth of them again under other names, and a
+.magnet file into a watch folder. The magnet link points at a loopback
+seeder with ``x.pe``, so its metadata is fetched without DHT or trackers.
+
+    python -m benchmarks.bench_ingest --torrents 1000
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import libtorrent as lt
+from modules.core.torrent_manager import TorrentManager
+from modules.utils.settings_handler import SettingsHandler
+from benchmarks.swarm import make_content, make_library, make_torrent, working_directory, Seeder, loopback
+
+
+def _wait(condition, timeout):
+    """Wait until ``condition()`` is true and return the seconds it took, or None on timeout."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if condition():
+            return time.perf_counter() - start
+        time.sleep(0.01)
+    return None
+
+
+def _fill_watch_folder(directory, torrents, magnet):
+    """Copy the torrents, some duplicates and the magnet file into a watch folder, all settled."""
+    watch = os.path.join(directory, "watch")
+    os.makedirs(watch)
+    for path in torrents:
+        shutil.copy(path, watch)
+    for path in torrents[::10]:
+        shutil.copy(path, os.path.join(watch, "copy-" + os.path.basename(path)))
+    with open(os.path.join(watch, "links.magnet"), "w") as f:
+        f.write(magnet + "\n")
+    # Files younger than the settle time are left for the next scan
+    settled = time.time() - 60
+    for name in os.listdir(watch):
+        os.utime(os.path.join(watch, name), (settled, settled))
+    return watch
+
+
+def run(count=1000, timeout=60):
+    """Return watch folder scan, registration and magnet metadata fetch timings for ``count`` files."""
+    with tempfile.TemporaryDirectory() as directory, working_directory(directory):
+        torrents = make_library(directory, count)
+        content = make_content(os.path.join(directory, "seed"), "magnet-content", 4 << 20)
+        seeder = Seeder(make_torrent(content, os.path.join(directory, "magnet.torrent")), os.path.dirname(content))
+        seeder.wait_seeding()
+        info_hash = str(seeder.handle.info_hashes().get_best())
+        magnet = f"{lt.make_magnet_uri(seeder.handle)}&x.pe=127.0.0.1:{seeder.port}"
+        watch = _fill_watch_folder(directory, torrents, magnet)
+
+        settings = loopback(SettingsHandler("settings.ini"))
+        settings.set("Downloads", "download_path", os.path.join(directory, "downloads"))
+        # Queue limits would hold the magnet back behind the library
+        settings.set("Queue", "active_downloads", "-1")
+        settings.set("Queue", "active_limit", "-1")
+        settings.flush()
+        torrentmanager = TorrentManager(settings=settings)
+        torrentmanager.loaded.wait(timeout)
+
+        start = time.perf_counter()
+        counts = torrentmanager.watch_folder.scan(watch)
+        scan = time.perf_counter() - start
+        registered = _wait(lambda: len(torrentmanager.torrents) == count + 1, timeout)
+        metadata = _wait(lambda: info_hash in torrentmanager.torrents and not torrentmanager.metadata_pending(), timeout)
+
+        torrentmanager.stop()
+        settings.close()
+        return {
+            "files": count + count // 10 + 1,
+            **counts,
+            "scan_s": scan,
+            "registered_s": None if registered is None else scan + registered,
+            "metadata_fetch_s": torrentmanager.metrics.timings().get("metadata_fetch", {}).get("mean", metadata),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--torrents", type=int, default=1000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.torrents), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measure the cost of logging on the calling thread and of alert diagnostics.
+
+Times log calls through a plain FileHandler, as the client used to log,
+and through the queued pipeline of ``setup_logging``. Then downloads from
+loopback seeders with no diagnostic alert categories and with the peer
+and block ones, whose alerts are sampled at the source.
+
+    python -m benchmarks.bench_logging --calls 100000 --size-mb 256
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+from modules.utils.logger import setup_logging, stop_logging, TEXT_FORMAT
+from modules.utils.settings_handler import SettingsHandler
+from benchmarks import bench_swarm
+from benchmarks.swarm import working_directory
+
+DIAGNOSTICS = "peer, block_progress, piece_progress, performance_warning"
+
+
+def _time_calls(calls):
+    """Return the mean microseconds of a logging.info call with the current root handlers."""
+    start = time.perf_counter()
+    for index in range(calls):
+        logging.info(f"Benchmark record {index}")
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def run(calls=100000, seeders=2, size_mb=128):
+    """Return microseconds per log call, synchronous and queued, and swarm throughput without and with diagnostics."""
+    root = logging.getLogger()
+    previous = root.handlers[:], root.level
+    with tempfile.TemporaryDirectory() as directory:
+        handler = logging.FileHandler(os.path.join(directory, "sync.log"))
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.handlers, root.level = [handler], logging.INFO
+        synchronous = _time_calls(calls)
+        handler.close()
+
+        with working_directory(directory):
+            settings = SettingsHandler("settings.ini")
+            settings.set("Logging", "file", os.path.join(directory, "queued.log"))
+            # Only the file is written, as with the FileHandler
+            settings.set("Logging", "console", "false")
+            settings.flush()
+            setup_logging(settings)
+        queued = _time_calls(calls)
+
+        # The swarms log through the same pipeline, as the client does, once the backlog is written
+        settings.set("Logging", "format", "json")
+        setup_logging(settings)
+        plain = bench_swarm.run(seeders, size_mb)
+        diagnostics = bench_swarm.run(seeders, size_mb, alert_categories=DIAGNOSTICS)
+        with open(os.path.join(directory, "queued.log")) as f:
+            alerts = sum(1 for line in f if '"alert": ' in line)
+        stop_logging()
+        settings.close()
+    root.handlers, root.level = previous
+
+    return {
+        "calls": calls,
+        "file_handler_us": synchronous,
+        "queued_us": queued,
+        "swarm_mb_s": plain["throughput_mb_s"],
+        "swarm_diagnostics_mb_s": diagnostics["throughput_mb_s"],
+        "alert_lines": alerts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--seeders", type=int, default=2)
+    parser.add_argument("--size-mb", type=int, default=128)
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls, args.seeders, args.size_mb), indent=4))
+
+
+if __name__ == "__main__":
+    main()
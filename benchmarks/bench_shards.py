@@ -0,0 +1,110 @@
+"""
+Measure the sharded session mode against one in-process session with K torrents.
+
+Adds K small torrents, seeding on 127.0.0.1, to a TorrentManager and to a
+ShardedTorrentManager of N shards. Times how long until every status has
+reached the front end and the CPU the front end and the shard processes
+spent on it, then a get_torrents call and a restart from the saved library.
+
+    python -m benchmarks.bench_shards --torrents 2000 --shards 4
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from modules.core.torrent_manager import TorrentManager
+from modules.core.shards import ShardedTorrentManager
+from modules.utils.settings_handler import SettingsHandler
+from benchmarks.swarm import make_library, working_directory, loopback
+
+SETTLE_SECONDS = 3  # seconds after the last status arrived that still count towards the CPU figures
+
+def _settings():
+    # Every shard listens on a free port of 127.0.0.1
+    settings = loopback(SettingsHandler("settings.ini"))
+    settings.set("Logging", "console", "false")
+    settings.flush()
+    return settings
+
+
+def _process_cpu(pid):
+    """Return the CPU seconds a process has used, from /proc."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _start(shards):
+    settings = _settings()
+    if shards:
+        return ShardedTorrentManager(settings, shards)
+    return TorrentManager(settings=settings)
+
+
+def _wait_statuses(torrentmanager, count, timeout):
+    deadline = time.monotonic() + timeout
+    while len(torrentmanager.get_torrents()) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return len(torrentmanager.get_torrents()) >= count
+
+
+def _measure(directory, paths, shards, repeats, timeout):
+    """Return the add, status, CPU and restart figures of one configuration."""
+    results = {}
+    torrentmanager = _start(shards)
+    try:
+        torrentmanager.loaded.wait(timeout)
+        pids = [shard.process.pid for shard in torrentmanager.shards] if shards else []
+        front, workers = _process_cpu(os.getpid()), [_process_cpu(pid) for pid in pids]
+        start = time.perf_counter()
+        for path in paths:
+            torrentmanager.add_torrent(path, os.path.join(directory, "content"), seed=True)
+        results["all_statuses"] = _wait_statuses(torrentmanager, len(paths), timeout)
+        results["add_s"] = time.perf_counter() - start
+        # Let the status bursts of the new torrents settle
+        time.sleep(SETTLE_SECONDS)
+        results["front_cpu_s"] = _process_cpu(os.getpid()) - front
+        results["shard_cpu_s"] = [_process_cpu(pid) - before for pid, before in zip(pids, workers)]
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            torrentmanager.get_torrents()
+        results["get_torrents_ms"] = 1000 * (time.perf_counter() - start) / repeats
+    finally:
+        torrentmanager.stop()
+
+    start = time.perf_counter()
+    torrentmanager = _start(shards)
+    try:
+        torrentmanager.loaded.wait(timeout)
+        _wait_statuses(torrentmanager, len(paths), timeout)
+        results["restart_s"] = time.perf_counter() - start
+    finally:
+        torrentmanager.stop()
+    return results
+
+
+def run(count=2000, shards=4, repeats=20, timeout=600):
+    """Return the figures of one session and of ``shards`` shards, each with ``count`` torrents."""
+    results = {"torrents": count, "shards": shards}
+    with tempfile.TemporaryDirectory() as directory, working_directory(directory):
+        paths = make_library(directory, count)
+        for name, configuration in (("single", 0), ("sharded", shards)):
+            os.makedirs(name)
+            with working_directory(name):
+                results[name] = _measure(directory, paths, configuration, repeats, timeout)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--torrents", type=int, default=2000)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.torrents, args.shards, args.repeats), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Measure write throughput and hash-check speed of each storage choice.
+
+Downloads a multi-file torrent from a loopback seeder into ``--directory``
+(the filesystem under test) once per disk write mode and allocation, and
+once with the second file skipped, which writes a part file. Every
+download is then dropped from the page cache and re-checked from disk.
+
+    python -m benchmarks.bench_storage --size-mb 256 --directory /mnt/xfs/bench
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import libtorrent as lt
+from modules.core.storage_policy import ALLOCATION
+from benchmarks.swarm import make_content, make_torrent, drop_cache, Seeder, loopback_pack
+
+WRITE_MODES = ("auto_mmap_write", "always_mmap_write", "always_pwrite")
+
+
+def _wait(handle, done, timeout):
+    """Wait until ``done(status)`` is true and return the seconds it took, or None on timeout."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if done(handle.status()):
+            return time.perf_counter() - start
+        time.sleep(0.01)
+    return None
+
+
+def _case(torrent, seeder, directory, write_mode, allocation, skip_file, timeout):
+    """Download into a fresh directory, then re-check it, and return the timings of both."""
+    save_path = os.path.join(directory, f"{write_mode}-{allocation}-{skip_file}")
+    settings = loopback_pack(disk_write_mode=int(getattr(lt.mmap_write_mode_t, write_mode)))
+    session = lt.session(settings)
+    info = lt.torrent_info(torrent)
+    files = info.files()
+    skipped = [index for index in range(files.num_files()) if not files.file_flags(index) & lt.file_storage.flag_pad_file][1]
+    params = lt.add_torrent_params()
+    params.ti = info
+    params.save_path = save_path
+    params.storage_mode = ALLOCATION[allocation]
+    if skip_file:
+        params.file_priorities = [0 if index == skipped else 4 for index in range(info.num_files())]
+    handle = session.add_torrent(params)
+    handle.connect_peer(("127.0.0.1", seeder.port))
+    download = _wait(handle, lambda status: status.is_finished, timeout)
+    wanted = handle.status().total_wanted
+
+    session.remove_torrent(handle)
+    del session
+    drop_cache(save_path)
+    session = lt.session(settings)
+    handle = session.add_torrent(params)
+    check = _wait(handle, lambda status: status.state not in (
+        lt.torrent_status.checking_files, lt.torrent_status.checking_resume_data
+    ) and status.has_metadata, timeout)
+    verified = handle.status().total_wanted_done == wanted
+    session.remove_torrent(handle)
+    del session
+
+    parts = [name for name in os.listdir(save_path) if name.endswith(".parts")] if os.path.isdir(save_path) else []
+    shutil.rmtree(save_path, ignore_errors=True)
+    return {
+        "write_mode": write_mode,
+        "allocation": allocation,
+        "skipped_file": skip_file,
+        "write_mb_per_s": None if download is None else wanted / download / (1 << 20),
+        "check_mb_per_s": None if check is None else wanted / check / (1 << 20),
+        "part_file_written": bool(parts),
+        "verified": verified,
+    }
+
+
+def run(size_mb=256, directory=None, timeout=300):
+    """Return write and hash-check throughput for each write mode and allocation, and with a skipped file."""
+    with tempfile.TemporaryDirectory(dir=directory) as work:
+        content = make_content(os.path.join(work, "seed"), "storage", size_mb << 20, files=4)
+        torrent = make_torrent(content, os.path.join(work, "storage.torrent"), 1 << 20)
+        seeder = Seeder(torrent, os.path.dirname(content))
+        seeder.wait_seeding()
+
+        cases = [(mode, allocation, False) for mode in WRITE_MODES for allocation in ALLOCATION]
+        cases.append(("auto_mmap_write", "sparse", True))
+        return {
+            "size_mb": size_mb,
+            "directory": directory or tempfile.gettempdir(),
+            "cases": [_case(torrent, seeder, work, *case, timeout) for case in cases],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--directory", help="directory on the filesystem to measure, by default the temp dir")
+    args = parser.parse_args()
+    print(json.dumps(run(args.size_mb, args.directory), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure streaming latency and throughput against a loopback seeder.
+
+Streams the middle file of a three-file torrent through the local HTTP
+server: first a Range request from the middle of the file, then the
+whole file, and checks the bytes against the seeded content.
+
+    python -m benchmarks.bench_stream --size-mb 64
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import urllib.request
+import libtorrent as lt
+from modules.core.torrent_manager import TorrentManager
+from modules.utils.settings_handler import SettingsHandler
+from benchmarks.swarm import make_content, make_torrent, working_directory, Seeder, loopback
+
+
+def _get(url, byte_range=None):
+    """Return the seconds until the first byte, the total seconds and the body of a GET."""
+    headers = {"Range": f"bytes={byte_range[0]}-{byte_range[1]}"} if byte_range else {}
+    start = time.perf_counter()
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+        first = response.read(1)
+        first_byte = time.perf_counter() - start
+        body = first + response.read()
+    return first_byte, time.perf_counter() - start, body
+
+
+def run(size_mb=64, piece_size=256 * 1024):
+    """Return time to first byte for a mid-file seek and full-file streaming throughput."""
+    with tempfile.TemporaryDirectory() as directory, working_directory(directory):
+        content = make_content(os.path.join(directory, "seed"), "media", size_mb << 20, files=3)
+        torrent = make_torrent(content, os.path.join(directory, "media.torrent"), piece_size)
+        seeder = Seeder(torrent, os.path.dirname(content))
+        seeder.wait_seeding()
+
+        settings = loopback(SettingsHandler("settings.ini"))
+        settings.set("Streaming", "port", "0")
+        settings.flush()
+        torrentmanager = TorrentManager(settings=settings)
+        torrentmanager.loaded.wait(30)
+        info_hash = torrentmanager.add_torrent(torrent, os.path.join(directory, "downloads"))
+        while torrentmanager.get_handle(info_hash) is None:
+            time.sleep(0.01)
+
+        files = lt.torrent_info(torrent).files()
+        streamed = [index for index in range(files.num_files()) if not files.file_flags(index) & lt.file_storage.flag_pad_file][1]
+        with open(os.path.join(os.path.dirname(content), files.file_path(streamed)), "rb") as f:
+            expected = f.read()
+        url = torrentmanager.streams.start(info_hash, streamed)
+        torrentmanager.get_handle(info_hash).connect_peer(("127.0.0.1", seeder.port))
+
+        middle = len(expected) // 2
+        seek_first_byte, seek_total, seek_body = _get(url, (middle, middle + 1024 * 1024 - 1))
+        full_first_byte, full_total, full_body = _get(url)
+
+        torrentmanager.stop()
+        settings.close()
+        return {
+            "size_mb": size_mb,
+            "piece_size": piece_size,
+            "seek_first_byte_s": seek_first_byte,
+            "seek_1mb_s": seek_total,
+            "full_first_byte_s": full_first_byte,
+            "full_mb_per_s": len(full_body) / full_total / (1 << 20),
+            "verified": seek_body == expected[middle:middle + 1024 * 1024] and full_body == expected,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--piece-size", type=int, default=256 * 1024)
+    args = parser.parse_args()
+    print(json.dumps(run(args.size_mb, args.piece_size), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Measure download throughput from loopback seeders.
+
+Starts N seeder sessions on 127.0.0.1 and a TorrentManager as the leecher,
+with no trackers: the leecher is pointed at the seeders with connect_peer.
+
+    python -m benchmarks.bench_swarm --seeders 4 --size-mb 256
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+import libtorrent as lt
+from modules.core.torrent_manager import TorrentManager
+from modules.utils.settings_handler import SettingsHandler
+from benchmarks.swarm import Seeder, make_content, make_torrent, working_directory, loopback
+
+
+def run(seeders=4, size_mb=256, files=4, timeout=600, alert_categories=""):
+    """
+    Return the time and throughput of downloading one torrent from ``seeders`` loopback peers.
+
+    ``alert_categories`` turns on diagnostic alert logging in the leecher, as in [Logging].
+    """
+    with tempfile.TemporaryDirectory() as directory, working_directory(directory):
+        content = make_content(os.path.join(directory, "seed"), "payload", size_mb * 1024 * 1024, files)
+        torrent_path = make_torrent(content, os.path.join(directory, "payload.torrent"))
+        swarm = [Seeder(torrent_path, os.path.dirname(content)) for _ in range(seeders)]
+        for seeder in swarm:
+            seeder.wait_seeding()
+
+        settings = loopback(SettingsHandler("settings.ini"))
+        settings.set("Logging", "alert_categories", alert_categories)
+        settings.flush()
+        torrentmanager = TorrentManager(settings=settings)
+        finished = threading.Event()
+        torrentmanager.dispatcher.subscribe(lt.torrent_finished_alert, lambda alert: finished.set())
+        try:
+            info_hash = torrentmanager.add_torrent(torrent_path, os.path.join(directory, "leech"))
+            while torrentmanager.get_handle(info_hash) is None:
+                time.sleep(0.01)
+
+            start = time.perf_counter()
+            handle = torrentmanager.get_handle(info_hash)
+            for seeder in swarm:
+                handle.connect_peer(("127.0.0.1", seeder.port))
+            completed = finished.wait(timeout)
+            elapsed = time.perf_counter() - start
+        finally:
+            torrentmanager.stop()
+
+    size = size_mb * 1024 * 1024
+    return {
+        "seeders": seeders,
+        "size_mb": size_mb,
+        "completed": completed,
+        "seconds": elapsed,
+        "throughput_mb_s": size / elapsed / 1024 / 1024 if completed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seeders", type=int, default=4)
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--files", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.seeders, args.size_mb, args.files), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Measure the cost of one table refresh tick.
+
+Compares the previous implementation, which rebuilt a QTableWidget from the
+full torrent list every second, with the incremental TorrentTableModel.
+
+    python -m benchmarks.bench_table_refresh --torrents 10000 --ticks 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication, QMainWindow, QTableWidget, QTableWidgetItem
+from PyQt6.QtGui import QColor
+from modules.ui.table_manager import setup_table, update_table
+
+
+def legacy_update_table(table, torrents):
+    """The QTableWidget rebuild used before the model/view table."""
+    torrents = sorted(torrents, key=lambda t: t["progress"] >= 1.0)
+
+    table.setRowCount(len(torrents))
+    for i, torrent in enumerate(torrents):
+        name_item = QTableWidgetItem(torrent["name"])
+        progress_item = QTableWidgetItem(f"{torrent['progress'] * 100:.2f}%")
+        download_rate = (
+            f"{torrent['download_rate'] / 1_000:.2f} kB/s"
+            if torrent["download_rate"] < 1_000_000
+            else f"{torrent['download_rate'] / 1_000_000:.2f} MB/s"
+        )
+        upload_rate = (
+            f"{torrent['upload_rate'] / 1_000:.2f} kB/s"
+            if torrent["upload_rate"] < 1_000_000
+            else f"{torrent['upload_rate'] / 1_000_000:.2f} MB/s"
+        )
+        download_item = QTableWidgetItem(download_rate)
+        upload_item = QTableWidgetItem(upload_rate)
+        for item in (name_item, progress_item, download_item, upload_item):
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+
+        table.setItem(i, 0, name_item)
+        table.setItem(i, 1, progress_item)
+        table.setItem(i, 2, download_item)
+        table.setItem(i, 3, upload_item)
+
+        color = QColor(0, 255, 0, 20) if torrent["progress"] >= 1.0 else QColor(0, 0, 255, 20)
+        for col in range(table.columnCount()):
+            table.item(i, col).setBackground(color)
+
+
+def make_torrents(count):
+    """Create synthetic status dictionaries, a quarter of them finished."""
+    return [
+        {
+            "info_hash": f"{i:040x}",
+            "name": f"torrent-{i:06d}",
+            "progress": 1.0 if i % 4 == 0 else random.random(),
+            "download_rate": 0,
+            "upload_rate": 0,
+            "peers": 0,
+            "state": "Downloading",
+            "queue_position": i,
+        }
+        for i in range(count)
+    ]
+
+
+def tick(torrents, active):
+    """Change the rates and progress of ``active`` random torrents and return them."""
+    changed = random.sample(torrents, active)
+    for torrent in changed:
+        torrent["download_rate"] = random.randint(0, 5_000_000)
+        torrent["upload_rate"] = random.randint(0, 500_000)
+        if torrent["progress"] < 1.0:
+            torrent["progress"] = min(1.0, torrent["progress"] + 0.001)
+    return [dict(torrent) for torrent in changed]
+
+
+def run(count, ticks, active, app):
+    """Return the mean milliseconds per tick for both implementations."""
+    random.seed(0)
+    torrents = make_torrents(count)
+
+    legacy = QTableWidget()
+    legacy.setColumnCount(4)
+    legacy.show()
+    legacy_times = []
+    for _ in range(ticks):
+        tick(torrents, active)
+        start = time.perf_counter()
+        legacy_update_table(legacy, torrents)
+        app.processEvents()
+        legacy_times.append(time.perf_counter() - start)
+
+    window = QMainWindow()
+    window.show_context_menu = lambda position: None
+    table, model = setup_table(window)
+    window.setCentralWidget(table)
+    window.show()
+    update_table(model, [dict(torrent) for torrent in torrents])
+    app.processEvents()
+    model_times = []
+    for _ in range(ticks):
+        changed = tick(torrents, active)
+        start = time.perf_counter()
+        update_table(model, changed)
+        app.processEvents()
+        model_times.append(time.perf_counter() - start)
+
+    return {
+        "torrents": count,
+        "active": active,
+        "ticks": ticks,
+        "legacy_ms_per_tick": 1000 * sum(legacy_times) / ticks,
+        "model_ms_per_tick": 1000 * sum(model_times) / ticks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--torrents", type=int, default=10_000)
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--active", type=int, default=200, help="torrents changing per tick")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    print(json.dumps(run(args.torrents, args.ticks, min(args.active, args.torrents), app), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Measure offline verification throughput for a range of worker counts.
+
+Verifies a multi-file torrent from disk once per worker count, after
+dropping its files from the page cache, so the figures show what the
+disk under ``--directory`` sustains rather than memory bandwidth.
+
+    python -m benchmarks.bench_verify --size-mb 4096 --directory /mnt/nvme/bench
+"""
+import os
+import json
+import argparse
+import tempfile
+import libtorrent as lt
+from modules.core.verifier import verify
+from benchmarks.swarm import make_content, make_torrent, drop_cache
+
+
+def run(size_mb=256, directory=None, workers=(1, 2, 4, 0)):
+    """Return verification MB/s per worker count, 0 meaning one per CPU."""
+    with tempfile.TemporaryDirectory(dir=directory) as work:
+        content = make_content(os.path.join(work, "data"), "library", size_mb << 20, files=8)
+        info = lt.torrent_info(make_torrent(content, os.path.join(work, "library.torrent"), 1 << 20))
+        results = []
+        for count in workers:
+            drop_cache(os.path.dirname(content))
+            report = verify(info, os.path.dirname(content), workers=count)
+            results.append({
+                "workers": count or os.cpu_count(),
+                "mb_per_s": report["mb_per_s"],
+                "verified": not report["bad_pieces"],
+            })
+        return {"size_mb": size_mb, "directory": directory or tempfile.gettempdir(), "runs": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--directory", help="directory on the disk to measure, by default the temp dir")
+    args = parser.parse_args()
+    print(json.dumps(run(args.size_mb, args.directory), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Run the benchmark suite and emit the results as one JSON document.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --quick
+
+Compare two runs by diffing their JSON; every figure is a plain number
+under a stable key.
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import libtorrent as lt
+from benchmarks import (
+    bench_engine, bench_history, bench_import_time, bench_ingest, bench_logging, bench_shards, bench_storage,
+    bench_stream, bench_swarm, bench_verify,
+)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run(torrent_counts, seeders, size_mb, table=True):
+    """Run every benchmark and return the combined results."""
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "libtorrent": lt.__version__,
+        "platform": platform.platform(),
+        "import": bench_import_time.run(5),
+        "throughput": bench_swarm.run(seeders, size_mb),
+        "stream": bench_stream.run(size_mb),
+        "storage": bench_storage.run(size_mb),
+        "verify": bench_verify.run(size_mb),
+        "logging": bench_logging.run(size_mb=size_mb),
+        "engine": [bench_engine.run(count) for count in torrent_counts],
+        "ingest": [bench_ingest.run(count) for count in torrent_counts],
+        "history": [bench_history.run(count, 1, min(200, count)) for count in torrent_counts],
+        "shards": [bench_shards.run(count) for count in torrent_counts],
+    }
+    if table:
+        results["table"] = [_table_refresh(count) for count in torrent_counts]
+        results["detail_panel"] = _qt_benchmark("benchmarks.bench_detail_panel")
+    return results
+
+
+def _table_refresh(count):
+    """Run the Qt table benchmark in its own process, away from the engine's libtorrent sessions."""
+    return _qt_benchmark("benchmarks.bench_table_refresh", "--torrents", str(count), "--ticks", "10")
+
+
+def _qt_benchmark(module, *args):
+    """Run a Qt benchmark module in its own process and return its JSON output."""
+    output = subprocess.run(
+        [sys.executable, "-m", module, *args], capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    parser.add_argument("--torrents", default="1000,10000", help="comma-separated library sizes")
+    parser.add_argument("--seeders", type=int, default=4)
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--no-table", action="store_true", help="skip the Qt table and detail panel benchmarks")
+    parser.add_argument("--quick", action="store_true", help="small sizes for a smoke run")
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.torrents.split(",")]
+    size_mb = args.size_mb
+    if args.quick:
+        counts, size_mb = [100], 16
+
+    results = json.dumps(run(counts, args.seeders, size_mb, table=not args.no_table), indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
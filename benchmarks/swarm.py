@@ -0,0 +1,138 @@
+"""
+Loopback swarm fixtures for the benchmarks.
+
+Creates synthetic content and tracker-less .torrent files, and runs seeder
+sessions bound to 127.0.0.1 that a leecher reaches with ``connect_peer``.
+Every session, the client's included, goes through ``loopback`` so nothing
+leaves the machine.
+"""
+import os
+import time
+import contextlib
+import configparser
+import libtorrent as lt
+from modules.core.torrent_store import TorrentStore
+from modules.core.session_profiles import parse_value
+
+
+def loopback(settings):
+    """Listen on a free port of 127.0.0.1 with DHT, LSD, UPnP and NAT-PMP off, and return ``settings``."""
+    settings.set("Session", "listen_interfaces", "127.0.0.1:0")
+    for option in ("enable_dht", "enable_lsd", "enable_upnp", "enable_natpmp"):
+        settings.set("Session", option, "false")
+    return settings
+
+
+def loopback_pack(**overrides):
+    """Return the settings of a bare libtorrent session under ``loopback``, with ``overrides`` on top."""
+    config = configparser.ConfigParser()
+    config.add_section("Session")
+    pack = {key: parse_value(key, value) for key, value in loopback(config)["Session"].items()}
+    pack["allow_multiple_connections_per_ip"] = True
+    pack["alert_mask"] = lt.alert_category.error | lt.alert_category.status
+    pack.update(overrides)
+    return pack
+
+
+def make_content(directory, name, size, files=1):
+    """Write ``files`` files of random data totalling ``size`` bytes under directory/name."""
+    root = os.path.join(directory, name)
+    os.makedirs(root, exist_ok=True)
+    chunk = os.urandom(1 << 20)
+    per_file = max(size // files, 1)
+    for index in range(files):
+        with open(os.path.join(root, f"file-{index:04d}.bin"), "wb") as f:
+            remaining = per_file
+            while remaining > 0:
+                f.write(chunk[:min(remaining, len(chunk))])
+                remaining -= len(chunk)
+            # Keep every file distinct so torrents get different info-hashes
+            f.write(f"{name}-{index}".encode())
+    return root
+
+
+def make_torrent(content_path, torrent_path, piece_size=0):
+    """Hash content into a tracker-less .torrent file and return its path."""
+    fs = lt.file_storage()
+    lt.add_files(fs, content_path)
+    ct = lt.create_torrent(fs, piece_size)
+    lt.set_piece_hashes(ct, os.path.dirname(content_path))
+    with open(torrent_path, "wb") as f:
+        f.write(lt.bencode(ct.generate()))
+    return torrent_path
+
+
+def make_library(directory, count, size=16 * 1024):
+    """Create ``count`` small torrents and return their .torrent paths."""
+    content_dir = os.path.join(directory, "content")
+    torrent_dir = os.path.join(directory, "torrents")
+    os.makedirs(torrent_dir, exist_ok=True)
+    return [
+        make_torrent(
+            make_content(content_dir, f"item-{index:06d}", size),
+            os.path.join(torrent_dir, f"item-{index:06d}.torrent"),
+        )
+        for index in range(count)
+    ]
+
+
+def write_metadata(directory, torrent_paths, save_path):
+    """Fill the torrent store that makes TorrentManager load the given torrents."""
+    store = TorrentStore(os.path.join(directory, "torrents.db"))
+    for path in torrent_paths:
+        with open(path, "rb") as f:
+            torrent = f.read()
+        info = lt.torrent_info(lt.bdecode(torrent))
+        store.add(str(info.info_hashes().get_best()), info.name(), save_path, torrent=torrent)
+    store.close()
+
+
+def drop_cache(directory):
+    """Flush the files under a directory to disk and evict them from the page cache."""
+    for root, _, names in os.walk(directory):
+        for name in names:
+            fd = os.open(os.path.join(root, name), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+class Seeder:
+    """A libtorrent session on 127.0.0.1 seeding one torrent from complete data."""
+
+    def __init__(self, torrent_path, save_path):
+        self.session = lt.session(loopback_pack())
+        params = lt.add_torrent_params()
+        params.ti = lt.torrent_info(torrent_path)
+        params.save_path = save_path
+        params.flags |= lt.torrent_flags.seed_mode
+        self.handle = self.session.add_torrent(params)
+
+    @property
+    def port(self):
+        return self.session.listen_port()
+
+    def wait_seeding(self, timeout=30):
+        """Wait until the seeder is ready to serve pieces."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status = self.handle.status()
+            # Peers that connect in the torrent's first second are turned away
+            if status.is_seeding and status.active_duration.total_seconds() >= 1:
+                return True
+            time.sleep(0.05)
+        return False
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    """Run the enclosed block with ``path`` as the current directory."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
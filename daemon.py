@@ -0,0 +1,5 @@
+from modules.daemon import main
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import base64
+import libtorrent as lt
+from modules.core.torrent_manager import STATE_NAMES
+from modules.core.creator import VERSIONS
+from modules.core.rate_history import RESOLUTIONS
+
+
+class InvalidParams(Exception):
+    """Raised by an RPC method when its parameters are malformed."""
+
+
+# User-facing state names and the libtorrent states they stand for
+STATES = {name: state for state, name in STATE_NAMES.items()}
+
+# torrent.create params passed on to the creator
+CREATE_OPTIONS = ("version", "piece_size", "trackers", "web_seeds", "comment", "private")
+
+
+def _match(torrent, filter):
+    """Return True if a status dictionary matches the filter fields that have no index."""
+    if "name" in filter and filter["name"].lower() not in torrent["name"].lower():
+        return False
+    if "paused" in filter and torrent["paused"] != filter["paused"]:
+        return False
+    return True
+
+
+class RpcMethods:
+    """
+    JSON-RPC methods over a TorrentManager.
+
+    Every method takes a params dictionary and works on batches: one call
+    can add many torrents or act on every torrent matching a filter. A
+    filter may hold ``info_hashes``, ``state``, ``save_path`` (prefix),
+    ``tracker`` (host), ``search`` (words starting name words), ``name``
+    (substring) and ``paused``. All but the last two are answered from
+    the torrent registry's indexes.
+    """
+
+    def __init__(self, torrentmanager, default_save_path=""):
+        self.torrentmanager = torrentmanager
+        self.default_save_path = default_save_path
+        self.methods = {
+            "torrent.add": self.add,
+            "torrent.list": self.list,
+            "torrent.status": self.status,
+            "torrent.pause": self.pause,
+            "torrent.resume": self.resume,
+            "torrent.remove": self.remove,
+            "torrent.force_start": self.force_start,
+            "torrent.queue": self.queue,
+            "torrent.set_bandwidth": self.set_bandwidth,
+            "torrent.stream": self.stream,
+            "torrent.stop_stream": self.stop_stream,
+            "torrent.verify": self.verify,
+            "torrent.create": self.create,
+            "create.status": self.create_status,
+            "verify.status": self.verify_status,
+            "verify.cancel": self.verify_cancel,
+            "bandwidth.status": self.bandwidth_status,
+            "history.get": self.history,
+        }
+
+    def _select(self, params):
+        """Return the status dictionaries selected by ``params``."""
+        filter = params.get("filter", {})
+        if "info_hashes" in params:
+            filter = dict(filter, info_hashes=set(params["info_hashes"]))
+        if not isinstance(filter, dict):
+            raise InvalidParams("filter must be an object")
+        if "state" in filter and filter["state"] not in STATES:
+            return []
+        # Indexed fields narrow the selection before any status is read
+        info_hashes = self.torrentmanager.torrents.select(
+            info_hashes=filter.get("info_hashes"),
+            state=STATES.get(filter.get("state")),
+            save_path=filter.get("save_path"),
+            tracker=filter.get("tracker"),
+            search=filter.get("search"),
+        )
+        return [torrent for torrent in self.torrentmanager.get_torrents(info_hashes) if _match(torrent, filter)]
+
+    def add(self, params):
+        """
+        Add torrents in one batch.
+
+        params: {"torrents": [{"file": path} | {"data": base64} | {"magnet": uri}], "save_path": str}
+        Returns one {"info_hash"} or {"error"} entry per torrent, in order;
+        a torrent that is already added gets {"error": "already added"}.
+        """
+        save_path = params.get("save_path") or self.default_save_path
+        if not save_path:
+            raise InvalidParams("save_path is not set")
+
+        results = []
+        for torrent in params.get("torrents", []):
+            try:
+                if "magnet" in torrent:
+                    info_hash = self.torrentmanager.add_magnet(torrent["magnet"], save_path)
+                else:
+                    if "data" in torrent:
+                        info = lt.torrent_info(lt.bdecode(base64.b64decode(torrent["data"])))
+                    else:
+                        info = lt.torrent_info(torrent["file"])
+                    info_hash = self.torrentmanager.add_torrent(info, save_path)
+                results.append({"info_hash": info_hash} if info_hash else {"error": "already added"})
+            except Exception as e:
+                results.append({"error": str(e)})
+        return results
+
+    def list(self, params):
+        """Return the info-hashes and names of the selected torrents."""
+        return [{"info_hash": torrent["info_hash"], "name": torrent["name"]} for torrent in self._select(params)]
+
+    def status(self, params):
+        """Return the full cached status of the selected torrents."""
+        return self._select(params)
+
+    def pause(self, params):
+        """Pause the selected torrents and return their info-hashes."""
+        selected = [torrent["info_hash"] for torrent in self._select(params)]
+        for info_hash in selected:
+            self.torrentmanager.pause_torrent(info_hash)
+        return selected
+
+    def resume(self, params):
+        """Resume the selected torrents and return their info-hashes."""
+        selected = [torrent["info_hash"] for torrent in self._select(params)]
+        for info_hash in selected:
+            self.torrentmanager.resume_torrent(info_hash)
+        return selected
+
+    def remove(self, params):
+        """Remove the selected torrents, optionally deleting their files."""
+        if not params.get("info_hashes") and not params.get("filter"):
+            raise InvalidParams("remove needs info_hashes or a filter")
+        selected = [torrent["info_hash"] for torrent in self._select(params)]
+        for info_hash in selected:
+            self.torrentmanager.remove_torrent(info_hash, bool(params.get("delete_files", False)))
+        return selected
+
+    def force_start(self, params):
+        """Start the selected torrents now, outside the queue."""
+        selected = [torrent["info_hash"] for torrent in self._select(params)]
+        for info_hash in selected:
+            self.torrentmanager.force_start_torrent(info_hash)
+        return selected
+
+    def queue(self, params):
+        """
+        Move the selected torrents in the download queue.
+
+        params: selection plus {"move": "up" | "down" | "top" | "bottom"}
+        Torrents are moved in queue order, so a selection keeps its relative order.
+        """
+        direction = params.get("move")
+        if direction not in ("up", "down", "top", "bottom"):
+            raise InvalidParams("move must be up, down, top or bottom")
+        selected = sorted(
+            (torrent for torrent in self._select(params) if torrent["queue_position"] >= 0),
+            key=lambda torrent: torrent["queue_position"],
+            # Moving down or to the top starts from the end so the moved block keeps its order
+            reverse=direction in ("down", "top"),
+        )
+        for torrent in selected:
+            self.torrentmanager.move_in_queue(torrent["info_hash"], direction)
+        return [torrent["info_hash"] for torrent in selected]
+
+    def set_bandwidth(self, params):
+        """
+        Set the bandwidth class and caps of the selected torrents.
+
+        params: selection plus any of {"class": str, "download_limit": int, "upload_limit": int}
+        """
+        options = {
+            "bandwidth_class": params.get("class"),
+            "download_limit": params.get("download_limit"),
+            "upload_limit": params.get("upload_limit"),
+        }
+        selected = [torrent["info_hash"] for torrent in self._select(params)]
+        try:
+            for info_hash in selected:
+                self.torrentmanager.bandwidth.set_torrent_bandwidth(info_hash, **options)
+        except (TypeError, ValueError) as e:
+            raise InvalidParams(str(e))
+        self.torrentmanager.bandwidth.tick()
+        return {info_hash: self.torrentmanager.bandwidth.torrent_bandwidth(info_hash) for info_hash in selected}
+
+    def stream(self, params):
+        """
+        Start streaming a file of a torrent and return its local HTTP URL.
+
+        params: {"info_hash": str, "file": int}; without "file" the largest file is streamed
+        """
+        file_index = params.get("file")
+        if file_index is not None and not isinstance(file_index, int):
+            raise InvalidParams("file must be an integer")
+        try:
+            return {"url": self.torrentmanager.streams.start(params.get("info_hash"), file_index)}
+        except (KeyError, ValueError) as e:
+            raise InvalidParams(str(e).strip("'"))
+
+    def stop_stream(self, params):
+        """
+        Stop streaming a file, or every file, of a torrent.
+
+        params: {"info_hash": str, "file": int}; without "file" every stream of the torrent stops
+        """
+        self.torrentmanager.streams.stop(params.get("info_hash"), params.get("file"))
+        return self.torrentmanager.streams.streams()
+
+    def verify(self, params):
+        """
+        Start verifying the data of the selected torrents from disk, in the background.
+
+        params: selection plus {"resume": bool}; with resume the verified pieces
+        replace the torrent's downloaded pieces. Returns one {"info_hash"} or
+        {"error"} entry per torrent; progress and reports come from verify.status.
+        """
+        results = []
+        for torrent in self._select(params):
+            try:
+                self.torrentmanager.verifier.start(torrent["info_hash"], bool(params.get("resume", False)))
+                results.append({"info_hash": torrent["info_hash"]})
+            except (KeyError, ValueError) as e:
+                results.append({"info_hash": torrent["info_hash"], "error": str(e).strip("'")})
+        return results
+
+    def verify_status(self, params):
+        """Return the state, progress and report of every verification started in this run."""
+        return self.torrentmanager.verifier.status()
+
+    def verify_cancel(self, params):
+        """Cancel the running verifications of the selected torrents."""
+        selected = [torrent["info_hash"] for torrent in self._select(params)]
+        for info_hash in selected:
+            self.torrentmanager.verifier.cancel(info_hash)
+        return selected
+
+    def create(self, params):
+        """
+        Start creating a torrent from a file or directory on the server, in the background.
+
+        params: {"path": str, "output": str, "version": "v1" | "v2" | "hybrid", "piece_size": int,
+                 "trackers": [url], "web_seeds": [url], "comment": str, "private": bool, "seed": bool}
+        Only "path" is required. With "seed" the torrent is added and seeds from the path
+        without a check. Returns {"job"}; progress and the info-hash come from create.status.
+        """
+        path = params.get("path")
+        if not isinstance(path, str) or not path:
+            raise InvalidParams("path must be a file or directory")
+        options = {option: params[option] for option in CREATE_OPTIONS if option in params}
+        if options.get("version", "v1") not in VERSIONS:
+            raise InvalidParams(f"version must be one of {', '.join(VERSIONS)}")
+        if not isinstance(options.get("piece_size", 0), int):
+            raise InvalidParams("piece_size must be an integer")
+        return {"job": self.torrentmanager.creator.start(path, params.get("output"), bool(params.get("seed")), **options)}
+
+    def create_status(self, params):
+        """Return the state, progress and info-hash of every torrent creation started in this run."""
+        return self.torrentmanager.creator.status()
+
+    def history(self, params):
+        """
+        Return the rate history of a torrent, or of the whole session without an info-hash.
+
+        params: {"info_hash": str, "resolution": "seconds" | "minutes" | "hours"}
+        Returns {"step", "span", "times", "download", "upload", "peers"}, oldest sample
+        first, or null for an unknown torrent.
+        """
+        resolution = params.get("resolution", "seconds")
+        if resolution not in dict(RESOLUTIONS):
+            raise InvalidParams(f"resolution must be one of {', '.join(name for name, _ in RESOLUTIONS)}")
+        series = self.torrentmanager.history.series(params.get("info_hash"), resolution)
+        if series is None:
+            return None
+        return {key: value.tolist() if hasattr(value, "tolist") else value for key, value in series.items()}
+
+    def bandwidth_status(self, params):
+        """Return the active bandwidth plan, the classes and the next scheduled change."""
+        return self.torrentmanager.bandwidth.status()
@@ -0,0 +1,326 @@
+"""
+Local HTTP control API.
+
+Endpoints:
+
+    POST /rpc                       JSON-RPC 2.0, single requests or batches
+    GET  /poll?since=N&timeout=S    long-poll for status deltas after sequence N; since=0 gets a snapshot
+    GET  /events                    server-sent events: a snapshot, then deltas
+    GET  /metrics                   session counters and timings, Prometheus text format
+
+A delta is the status dictionary of a changed torrent, or
+{"info_hash": ..., "removed": true} for a torrent that left the session.
+The server binds to localhost or a Unix socket and runs its own asyncio
+loop on a background thread. It never imports Qt.
+"""
+import os
+import json
+import asyncio
+import logging
+import threading
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+from .methods import RpcMethods, InvalidParams
+
+MAX_BODY_SIZE = 64 * 1024 * 1024
+FEED_SIZE = 1000  # status batches kept for long-poll clients
+
+
+class StatusFeed:
+    """Sequence-numbered log of status deltas, shared by long-poll and SSE clients."""
+
+    def __init__(self, loop, size=FEED_SIZE):
+        self.loop = loop
+        self.seq = 1  # starts past 0, which asks /poll for a snapshot, so a snapshot's sequence can be waited on
+        self._log = deque(maxlen=size)
+        self._changed = asyncio.Event()
+
+    def publish(self, torrents):
+        """Append a batch of changed status dictionaries or removals; safe to call from any thread."""
+        self.loop.call_soon_threadsafe(self._append, torrents)
+
+    def _append(self, torrents):
+        self.seq += 1
+        self._log.append((self.seq, torrents))
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def since(self, seq):
+        """
+        Return the latest delta of every torrent changed after ``seq``, or None if the log no longer reaches back that far.
+
+        A removal replaces the torrent's earlier statuses, and a later status replaces a removal.
+        """
+        if self._log and seq < self._log[0][0] - 1:
+            return None
+        merged = {}
+        for batch_seq, torrents in self._log:
+            if batch_seq > seq:
+                for torrent in torrents:
+                    merged[torrent["info_hash"]] = torrent
+        return list(merged.values())
+
+    async def wait(self, seq, timeout):
+        """Wait until a batch newer than ``seq`` is published or the timeout expires."""
+        if self.seq > seq:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class ApiServer:
+    """JSON-RPC and status-stream server over a TorrentManager or a ShardedTorrentManager."""
+
+    def __init__(self, torrentmanager, host="127.0.0.1", port=8089, unix_socket=None, default_save_path=""):
+        self.torrentmanager = torrentmanager
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket or None
+        self.rpc = RpcMethods(torrentmanager, default_save_path)
+        self.feed = None
+        self._loop = None
+        self._stopped = None
+        self._started = threading.Event()
+        self._thread = None
+        self.error = None  # the OSError that kept the server from binding
+
+    @classmethod
+    def from_settings(cls, torrentmanager, settings, overrides=None):
+        """Create a server from the [API] settings, or return None if the API is disabled."""
+        options = {option: settings.get("API", option) for option in ("enabled", "host", "port", "unix_socket")}
+        options.update(overrides or {})
+        if options["enabled"].lower() not in ("1", "true", "yes", "on"):
+            return None
+        return cls(
+            torrentmanager,
+            host=options["host"] or "127.0.0.1",
+            port=int(options["port"] or 8089),
+            unix_socket=options["unix_socket"],
+            default_save_path=settings.get("Downloads", "download_path"),
+        )
+
+    def start(self):
+        """Start serving on a background thread and wait until the socket is bound; return False if it could not be."""
+        self._thread = threading.Thread(target=self._run, name="api-server", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self.error is not None:
+            self._thread.join()
+            self._thread = None
+            return False
+        self.torrentmanager.add_status_callback(self._on_statuses)
+        self.torrentmanager.add_removed_callback(self._on_removed)
+        return True
+
+    def stop(self):
+        """Stop the server and wait for its thread to exit."""
+        if self._thread is None:
+            return
+        self.torrentmanager.remove_status_callback(self._on_statuses)
+        self.torrentmanager.remove_removed_callback(self._on_removed)
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+        self._thread = None
+
+    def _on_statuses(self, torrents):
+        self.feed.publish(torrents)
+
+    def _on_removed(self, info_hash):
+        self.feed.publish([{"info_hash": info_hash, "removed": True}])
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+            # Close streams that are still open
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        finally:
+            self._loop.close()
+
+    async def _serve(self):
+        self.feed = StatusFeed(self._loop)
+        self._stopped = asyncio.Event()
+        try:
+            if self.unix_socket:
+                if os.path.exists(self.unix_socket):
+                    os.remove(self.unix_socket)
+                server = await asyncio.start_unix_server(self._handle, path=self.unix_socket)
+                logging.info(f"API listening on {self.unix_socket}")
+            else:
+                server = await asyncio.start_server(self._handle, self.host, self.port)
+                self.port = server.sockets[0].getsockname()[1]
+                logging.info(f"API listening on http://{self.host}:{self.port}")
+        except OSError as e:
+            logging.error(f"Failed to start API server. Error: {e}")
+            self.error = e
+            self._started.set()
+            return
+
+        self._started.set()
+        async with server:
+            await self._stopped.wait()
+        if self.unix_socket and os.path.exists(self.unix_socket):
+            os.remove(self.unix_socket)
+        logging.info("API server stopped")
+
+    async def _handle(self, reader, writer):
+        """Serve one HTTP request on a connection."""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) != 3:
+                return
+            method, target, _ = request_line
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_SIZE:
+                await self._respond(writer, 413, {"error": "request body too large"})
+                return
+            body = await reader.readexactly(length) if length else b""
+
+            url = urlsplit(target)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if method == "POST" and url.path == "/rpc":
+                response = await self._rpc(body)
+                await self._respond(writer, 200 if response is not None else 204, response)
+            elif method == "GET" and url.path == "/poll":
+                await self._poll(writer, query)
+            elif method == "GET" and url.path == "/events":
+                await self._events(writer)
+            elif method == "GET" and url.path == "/metrics":
+                await self._respond(
+                    writer, 200, self.torrentmanager.metrics.render_prometheus(),
+                    content_type="text/plain; version=0.0.4",
+                )
+            else:
+                await self._respond(writer, 404, {"error": f"no route for {method} {url.path}"})
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Client went away, or the server is shutting down
+            pass
+        except Exception as e:
+            logging.error(f"API request failed. Error: {e}")
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, content_type="application/json"):
+        if payload is None:
+            body = b""
+        elif isinstance(payload, str):
+            body = payload.encode()
+        else:
+            body = json.dumps(payload).encode()
+        reasons = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}
+        writer.write(
+            f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _rpc(self, body):
+        """Handle a JSON-RPC request or batch and return the response payload."""
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return _rpc_error(None, -32700, "Parse error")
+
+        if isinstance(request, list):
+            if not request:
+                return _rpc_error(None, -32600, "Invalid Request")
+            # Run batch entries in order so a batch can add and then act on torrents
+            responses = [await self._call(entry) for entry in request]
+            return [response for response in responses if response is not None] or None
+        return await self._call(request)
+
+    async def _call(self, request):
+        """Run a single JSON-RPC call in a worker thread."""
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or "method" not in request:
+            return _rpc_error(None, -32600, "Invalid Request")
+        request_id = request.get("id")
+        notification = "id" not in request
+
+        method = self.rpc.methods.get(request["method"])
+        if method is None:
+            return None if notification else _rpc_error(request_id, -32601, "Method not found")
+        params = request.get("params", {})
+        if not isinstance(params, dict):
+            return None if notification else _rpc_error(request_id, -32602, "params must be an object")
+
+        try:
+            result = await self._loop.run_in_executor(None, method, params)
+        except InvalidParams as e:
+            return None if notification else _rpc_error(request_id, -32602, str(e))
+        except Exception as e:
+            logging.error(f"API method {request['method']} failed. Error: {e}")
+            return None if notification else _rpc_error(request_id, -32603, str(e))
+        return None if notification else {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def _poll(self, writer, query):
+        """
+        Answer a long-poll with the deltas after ``since``, waiting up to ``timeout`` seconds for one.
+
+        A first poll, or one whose sequence the log no longer covers, gets the full snapshot right away.
+        """
+        try:
+            since = int(query.get("since", 0))
+            timeout = min(float(query.get("timeout", 30)), 300)
+        except ValueError:
+            await self._respond(writer, 400, {"error": "since and timeout must be numbers"})
+            return
+
+        # A sequence beyond the feed's comes from before a restart of the server
+        current = 0 < since <= self.feed.seq
+        if current:
+            await self.feed.wait(since, timeout)
+        torrents = self.feed.since(since) if current else None
+        if torrents is None:
+            await self._respond(writer, 200, {"seq": self.feed.seq, "full": True, "torrents": self.torrentmanager.get_torrents()})
+        else:
+            await self._respond(writer, 200, {"seq": self.feed.seq, "full": False, "torrents": torrents})
+
+    async def _events(self, writer):
+        """Stream a snapshot followed by every status delta as server-sent events."""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        seq = self.feed.seq
+        writer.write(_sse("snapshot", seq, self.torrentmanager.get_torrents()))
+        await writer.drain()
+
+        while not self._stopped.is_set():
+            await self.feed.wait(seq, 15)
+            if self.feed.seq == seq:
+                writer.write(b": keep-alive\n\n")
+            else:
+                torrents = self.feed.since(seq)
+                seq = self.feed.seq
+                if torrents is None:
+                    writer.write(_sse("snapshot", seq, self.torrentmanager.get_torrents()))
+                else:
+                    writer.write(_sse("update", seq, torrents))
+            await writer.drain()
+
+
+def _rpc_error(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _sse(event, seq, payload):
+    return f"event: {event}\nid: {seq}\ndata: {json.dumps(payload)}\n\n".encode()
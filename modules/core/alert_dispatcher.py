@@ -0,0 +1,133 @@
+import os
+import select
+import logging
+import threading
+import time
+from collections import defaultdict
+
+
+class AlertDispatcher:
+    """
+    Drain libtorrent alerts on a background thread and route them to subscribers.
+
+    The thread sleeps on a pipe that libtorrent writes to through
+    ``set_alert_fd``. It wakes when there are alerts or a periodic task is
+    due, so an idle session costs next to no CPU.
+
+    ``wait_for_alert`` is not used. The binding wraps the alert it returns
+    while the network thread may still be growing the queue, and that
+    crashes under load.
+
+    Status batches and session counters are requested as periodic tasks.
+    Their results arrive as ``state_update_alert`` and ``session_stats_alert``.
+
+    Callbacks and periodic tasks run on the dispatcher thread and must not
+    block.
+    """
+
+    def __init__(self, session, status_interval=1.0, stats_interval=5.0):
+        self.session = session
+        self._subscribers = defaultdict(list)
+        self._tasks = []
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        session.set_alert_fd(self._wakeup_write)
+
+        self.every(status_interval, session.post_torrent_updates)
+        self.every(stats_interval, session.post_session_stats)
+
+    def every(self, interval, callback):
+        """Call ``callback()`` on the dispatcher thread every ``interval`` seconds."""
+        with self._lock:
+            self._tasks.append([time.monotonic(), interval, callback])
+
+    def subscribe(self, alert_type, callback):
+        """Call ``callback(alert)`` for every alert of the given type or its subclasses."""
+        with self._lock:
+            self._subscribers[alert_type].append(callback)
+
+    def unsubscribe(self, alert_type, callback):
+        """Stop routing alerts of the given type to the callback."""
+        with self._lock:
+            if callback in self._subscribers.get(alert_type, []):
+                self._subscribers[alert_type].remove(callback)
+
+    def start(self):
+        """Start the dispatcher thread."""
+        if self._thread is not None:
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+        logging.info("Alert dispatcher started")
+
+    def stop(self):
+        """Stop the dispatcher thread and wait for it to exit."""
+        if self._thread is None:
+            return
+        self._running.clear()
+        self._wake()
+        self._thread.join()
+        self._thread = None
+        logging.info("Alert dispatcher stopped")
+
+    def dispatch(self, alert):
+        """Route a single alert to the subscribers of its type."""
+        with self._lock:
+            callbacks = [
+                callback
+                for alert_type in type(alert).__mro__
+                for callback in self._subscribers.get(alert_type, ())
+            ]
+        for callback in callbacks:
+            try:
+                callback(alert)
+            except Exception as e:
+                logging.error(f"Alert subscriber failed on {type(alert).__name__}. Error: {e}")
+
+    def _run_due_tasks(self):
+        """Run the periodic tasks that are due and return the time of the next one."""
+        now = time.monotonic()
+        with self._lock:
+            due = [task for task in self._tasks if task[0] <= now]
+            for task in due:
+                task[0] = now + task[1]
+            next_due = min((task[0] for task in self._tasks), default=now + 1.0)
+
+        for _, _, callback in due:
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"Periodic task {getattr(callback, '__name__', callback)} failed. Error: {e}")
+        return next_due
+
+    def _run(self):
+        """Wait for alerts and dispatch them until stopped."""
+        while self._running.is_set():
+            timeout = self._run_due_tasks() - time.monotonic()
+            readable, _, _ = select.select([self._wakeup_read], [], [], max(timeout, 0))
+            if not readable:
+                continue
+            self._drain_wakeups()
+            for alert in self.session.pop_alerts():
+                self.dispatch(alert)
+
+    def _wake(self):
+        """Interrupt the dispatcher thread's wait."""
+        try:
+            os.write(self._wakeup_write, b"\0")
+        except BlockingIOError:
+            # The pipe is full, so the thread is about to wake anyway
+            pass
+
+    def _drain_wakeups(self):
+        """Empty the wakeup pipe before popping alerts, so later alerts write to it again."""
+        try:
+            while os.read(self._wakeup_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
@@ -0,0 +1,119 @@
+"""
+Diagnostic logging of libtorrent alerts, sampled per alert type.
+
+The client only asks libtorrent for the alert categories it handles.
+Extra categories are enabled in the [Logging] section of settings.ini and
+their alerts logged at DEBUG level to the ``nanotorrent.alerts`` logger,
+whatever the [Logging] level, with the alert's type, categories and
+info-hash as structured fields::
+
+    [Logging]
+    alert_categories = peer, block_progress, performance_warning
+    alert_sample_rate = 20
+
+High-volume types such as block or peer alerts are sampled at the
+source: once ``alert_sample_rate`` alerts of one type were logged in a
+second, their categories are taken out of the session's alert mask until
+the next second, so libtorrent stops posting them instead of the client
+popping and dropping thousands. Once a second, the types that were cut
+short are logged with the alerts that still arrived. Both settings apply
+to the running session.
+"""
+import time
+import logging
+import libtorrent as lt
+from .status_cache import info_hash_of
+
+# Categories an alert mask can name, as spelled in settings.ini
+CATEGORIES = {
+    name: int(getattr(lt.alert_category, name))
+    for name in dir(lt.alert_category)
+    if not name.startswith("_") and name != "all"
+}
+SAMPLE_WINDOW = 1.0  # seconds; each alert type is logged at most alert_sample_rate times per window
+
+logger = logging.getLogger("nanotorrent.alerts")
+
+
+def parse_categories(text):
+    """Return the alert mask of a comma-separated list of category names; unknown names are logged and skipped."""
+    mask = 0
+    for name in (part.strip() for part in text.split(",")):
+        if not name:
+            continue
+        if name not in CATEGORIES:
+            logging.warning(f"Unknown alert category {name!r}, expected one of {', '.join(sorted(CATEGORIES))}")
+            continue
+        mask |= CATEGORIES[name]
+    return mask
+
+
+def category_names(mask):
+    return [name for name, bit in CATEGORIES.items() if mask & bit]
+
+
+class AlertLogger:
+    """
+    Log the alerts of the extra [Logging] categories, at most ``alert_sample_rate`` per type and second.
+
+    Runs on the dispatcher thread: ``on_alert`` is subscribed to every
+    alert and drops the ones outside the extra categories at once, and
+    ``tick`` closes each one-second window and unmutes the categories.
+    """
+
+    def __init__(self, dispatcher, session_manager, settings):
+        self.session_manager = session_manager
+        self.settings = settings
+        self._counts = {}   # alert type -> alerts seen in this window
+        self._muted = 0     # categories taken out of the alert mask for this window
+        self._configure()
+        settings.subscribe(self._on_settings_changed)
+        dispatcher.subscribe(lt.alert, self.on_alert)
+        dispatcher.every(SAMPLE_WINDOW, self.tick)
+
+    def _configure(self):
+        self.mask = parse_categories(self.settings.get("Logging", "alert_categories"))
+        self.rate = max(self.settings.get_int("Logging", "alert_sample_rate", 20), 1)
+        logger.setLevel(logging.DEBUG if self.mask else logging.NOTSET)
+
+    def _on_settings_changed(self, changes):
+        if any(section == "Logging" for section, _ in changes):
+            self._configure()
+
+    def on_alert(self, alert):
+        """Log an alert of an extra category, muting its categories once its type used up this window."""
+        category = alert.category()
+        if not category & self.mask:
+            return
+        name = alert.what()
+        count = self._counts.get(name, 0) + 1
+        self._counts[name] = count
+        if count > self.rate:
+            # Posted before the mask change reached libtorrent
+            return
+        if count == self.rate and category & self.mask & ~self._muted:
+            self._muted |= category & self.mask
+            self.session_manager.set_alert_mask(self.session_manager.alert_mask(self._muted))
+
+        handle = getattr(alert, "handle", None)
+        logger.debug(
+            alert.message(),
+            extra={
+                "alert": name,
+                "categories": category_names(category),
+                "info_hash": info_hash_of(handle) if handle is not None and handle.is_valid() else None,
+            },
+        )
+
+    def tick(self):
+        """Close the sampling window: report the types that were cut short and unmute their categories."""
+        for name, count in self._counts.items():
+            if count > self.rate:
+                logger.debug(
+                    f"{count - self.rate} more {name} not logged (sampling)",
+                    extra={"alert": name, "sampled_out": count - self.rate},
+                )
+        self._counts.clear()
+        if self._muted:
+            self._muted = 0
+            self.session_manager.set_alert_mask(self.session_manager.alert_mask())
@@ -0,0 +1,308 @@
+"""
+Bandwidth scheduling: priority classes, per-torrent caps and weekly rate plans.
+
+Configured in the [Bandwidth] section of settings.ini::
+
+    [Bandwidth]
+    classes = high:4, normal:2, low:1
+    default_class = normal
+    plans = business=500000/100000, night=0/0
+    schedule = mon-fri 09:00-18:00 business; sat,sun 01:00-07:00 night
+
+``plans`` maps a name to download/upload limits in bytes/s (0 means
+unlimited). ``schedule`` entries are ``<days> <start>-<end> <plan>``;
+the first entry that covers the current time wins, and an end before
+the start runs past midnight. Outside every entry the [Speed] limits
+apply, reported as the ``default`` plan.
+
+libtorrent cannot put a torrent into a peer class, so classes are
+enforced here: while a global limit is in force, the budget is divided
+between active torrents by class weight (weighted max-min fairness,
+using each torrent's current rate as its demand) and applied with
+per-handle limits. Per-torrent caps always apply.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from collections import namedtuple
+
+import libtorrent as lt
+from .status_cache import info_hash_of
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+MIN_SHARE = 16 * 1024  # bytes/s a torrent may always grow into
+HEADROOM = 1.5         # demand estimate, as a multiple of the current rate
+SATURATED = 0.8        # a torrent using this fraction of its limit wants more
+
+Plan = namedtuple("Plan", "name download_limit upload_limit")
+ScheduleEntry = namedtuple("ScheduleEntry", "days start end plan")
+
+
+def parse_classes(text):
+    """Parse ``name:weight, ...`` into {name: weight}."""
+    classes = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition(":")
+        weight = float(weight or 1)
+        if weight <= 0:
+            raise ValueError(f"class {name} needs a positive weight")
+        classes[name.strip()] = weight
+    return classes
+
+
+def parse_plans(text):
+    """Parse ``name=download/upload, ...`` into {name: Plan}."""
+    plans = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, limits = item.partition("=")
+        download, _, upload = limits.partition("/")
+        plans[name.strip()] = Plan(name.strip(), int(download or 0), int(upload or 0))
+    return plans
+
+
+def _parse_days(text):
+    if text in ("*", "daily"):
+        return frozenset(range(7))
+    days = set()
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        start = DAYS.index(first)
+        end = DAYS.index(last) if last else start
+        days.update(day % 7 for day in range(start, end + 1 if end >= start else end + 8))
+    return frozenset(days)
+
+
+def _parse_minute(text):
+    hours, _, minutes = text.partition(":")
+    minute = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= minute <= 24 * 60:
+        raise ValueError(f"invalid time {text}")
+    return minute
+
+
+def parse_schedule(text, plans):
+    """Parse ``<days> <HH:MM>-<HH:MM> <plan>; ...`` into schedule entries."""
+    entries = []
+    for item in filter(None, (part.strip() for part in text.split(";"))):
+        days, times, plan = item.split()
+        start, _, end = times.partition("-")
+        if plan not in plans:
+            raise ValueError(f"schedule refers to unknown plan {plan}")
+        entries.append(ScheduleEntry(_parse_days(days.lower()), _parse_minute(start), _parse_minute(end), plan))
+    return entries
+
+
+def scheduled_plan(schedule, moment):
+    """Return the name of the plan scheduled at ``moment``, or None."""
+    day, minute = moment.weekday(), moment.hour * 60 + moment.minute
+    for entry in schedule:
+        if entry.start < entry.end:
+            if day in entry.days and entry.start <= minute < entry.end:
+                return entry.plan
+        elif (day in entry.days and minute >= entry.start) or ((day - 1) % 7 in entry.days and minute < entry.end):
+            return entry.plan
+    return None
+
+
+def next_change(schedule, moment):
+    """Return the first time after ``moment`` at which the scheduled plan changes, or None."""
+    current = scheduled_plan(schedule, moment)
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    candidates = sorted(
+        midnight + timedelta(days=offset, minutes=minute)
+        for offset in range(8)
+        for entry in schedule
+        for minute in (entry.start, entry.end)
+    )
+    for candidate in candidates:
+        if candidate > moment and scheduled_plan(schedule, candidate) != current:
+            return candidate
+    return None
+
+
+def allocate(budget, demands, weights):
+    """
+    Split ``budget`` between torrents by weight, never giving one more than it demands.
+
+    ``demands`` maps a key to bytes/s or None for unbounded; the unused
+    share of satisfied torrents is redistributed among the others.
+    """
+    limits = {}
+    active = set(demands)
+    remaining = budget
+    while active:
+        total_weight = sum(weights[key] for key in active)
+        shares = {key: remaining * weights[key] / total_weight for key in active}
+        satisfied = [key for key in active if demands[key] is not None and demands[key] <= shares[key]]
+        if not satisfied:
+            limits.update({key: max(int(share), 1) for key, share in shares.items()})
+            break
+        for key in satisfied:
+            limits[key] = max(int(demands[key]), 1)
+            remaining -= demands[key]
+            active.discard(key)
+    return limits
+
+
+class BandwidthScheduler:
+    """
+    Switch global rate plans on a weekly schedule and share them between torrents.
+
+    ``tick`` does all the work; the torrent manager runs it periodically
+    on the alert dispatcher. ``clock`` returns the local time as a
+    datetime and can be replaced to drive the schedule in tests.
+    """
+
+    def __init__(self, session_manager, store, status_cache, settings, clock=datetime.now):
+        self.session_manager = session_manager
+        self.store = store
+        self.status_cache = status_cache
+        self.settings = settings
+        self.clock = clock
+        self.classes = {}
+        self.default_class = ""
+        self.plans = {}
+        self.schedule = []
+        self.plan = None
+        self._torrents = store.bandwidth()  # info_hash -> (class, download cap, upload cap)
+        self._applied = {}                  # (info_hash, direction) -> limit set on the handle
+        self._plan_callbacks = []
+        self._lock = threading.RLock()
+        self.reload()
+        settings.subscribe(self._on_settings_changed)
+
+    def reload(self):
+        """Read classes, plans and the schedule from settings."""
+        try:
+            classes = parse_classes(self.settings.get("Bandwidth", "classes")) or {"normal": 1.0}
+            plans = parse_plans(self.settings.get("Bandwidth", "plans"))
+            schedule = parse_schedule(self.settings.get("Bandwidth", "schedule"), plans)
+        except ValueError as e:
+            logging.error(f"Invalid [Bandwidth] settings, keeping the previous ones. Error: {e}")
+            return
+        default_class = self.settings.get("Bandwidth", "default_class")
+        with self._lock:
+            self.classes, self.plans, self.schedule = classes, plans, schedule
+            self.default_class = default_class if default_class in classes else next(iter(classes))
+        logging.info(f"Bandwidth classes: {classes}, plans: {list(plans)}, {len(schedule)} schedule entries")
+
+    def _on_settings_changed(self, changes):
+        if any(section == "Bandwidth" for section, _ in changes):
+            self.reload()
+            self.tick()
+
+    def add_plan_callback(self, callback):
+        """Call ``callback(name, download_limit, upload_limit)`` when the active plan changes."""
+        self._plan_callbacks.append(callback)
+        if self.plan is not None:
+            callback(*self.plan)
+
+    def active_plan(self):
+        """Return the plan in force now; the [Speed] limits when nothing is scheduled."""
+        name = scheduled_plan(self.schedule, self.clock())
+        if name is None:
+            return Plan("default", *self.session_manager.speed_limits())
+        return self.plans[name]
+
+    def tick(self):
+        """Switch plans if the schedule says so and rebalance per-torrent limits."""
+        with self._lock:
+            plan = self.active_plan()
+            changed = plan != self.plan
+            if changed:
+                self.plan = plan
+                self.session_manager.set_plan_limits(
+                    None if plan.name == "default" else (plan.download_limit, plan.upload_limit)
+                )
+                logging.info(f"Bandwidth plan {plan.name}: download={plan.download_limit} bytes/s, upload={plan.upload_limit} bytes/s")
+            self._rebalance(plan)
+        if changed:
+            for callback in self._plan_callbacks:
+                callback(*plan)
+
+    def _rebalance(self, plan):
+        """Set the download and upload limit of every torrent handle."""
+        statuses = [status for status in self.status_cache.all() if not status.flags & lt.torrent_flags.paused]
+        downloading = [status for status in statuses if status.state == lt.torrent_status.downloading]
+        self._share(statuses, downloading, "download", plan.download_limit)
+        self._share(statuses, statuses, "upload", plan.upload_limit)
+
+    def _share(self, statuses, active, direction, budget):
+        caps = {}
+        weights = {}
+        demands = {}
+        for status in statuses:
+            info_hash = info_hash_of(status)
+            bandwidth_class, download_cap, upload_cap = self._torrents.get(info_hash, (None, 0, 0))
+            caps[info_hash] = download_cap if direction == "download" else upload_cap
+            weights[info_hash] = self.classes.get(bandwidth_class or self.default_class, 1.0)
+
+        limits = dict(caps)
+        if budget > 0 and active:
+            for status in active:
+                info_hash = info_hash_of(status)
+                rate = status.download_rate if direction == "download" else status.upload_rate
+                applied = self._applied.get((info_hash, direction), 0)
+                if applied and rate >= SATURATED * applied:
+                    demand = None  # using all it is given: it may want more
+                else:
+                    demand = max(rate * HEADROOM, MIN_SHARE)
+                if caps[info_hash]:
+                    demand = min(demand or caps[info_hash], caps[info_hash])
+                demands[info_hash] = demand
+            limits.update(allocate(budget, demands, weights))
+
+        for key in [key for key in self._applied if key[1] == direction and key[0] not in limits]:
+            del self._applied[key]  # removed torrents
+        for status in statuses:
+            info_hash = info_hash_of(status)
+            limit = limits[info_hash]
+            if self._applied.get((info_hash, direction), 0) == limit:
+                continue
+            try:
+                if direction == "download":
+                    status.handle.set_download_limit(limit)
+                else:
+                    status.handle.set_upload_limit(limit)
+            except Exception as e:
+                logging.warning(f"Failed to set the {direction} limit of {status.name}. Error: {e}")
+                continue
+            self._applied[(info_hash, direction)] = limit
+
+    def set_torrent_bandwidth(self, info_hash, bandwidth_class=None, download_limit=None, upload_limit=None):
+        """Change a torrent's class or caps; None leaves a value as it is. Takes effect on the next ``tick``."""
+        with self._lock:
+            if bandwidth_class is not None and bandwidth_class not in self.classes:
+                raise ValueError(f"Unknown bandwidth class {bandwidth_class}")
+            current = self._torrents.get(info_hash, (None, 0, 0))
+            updated = (
+                current[0] if bandwidth_class is None else bandwidth_class,
+                current[1] if download_limit is None else max(int(download_limit), 0),
+                current[2] if upload_limit is None else max(int(upload_limit), 0),
+            )
+            self._torrents[info_hash] = updated
+        self.store.update(info_hash, bandwidth_class=updated[0], download_limit=updated[1], upload_limit=updated[2])
+
+    def torrent_bandwidth(self, info_hash):
+        """Return the class and caps of a torrent."""
+        with self._lock:
+            bandwidth_class, download_limit, upload_limit = self._torrents.get(info_hash, (None, 0, 0))
+            return {
+                "class": bandwidth_class or self.default_class,
+                "download_limit": download_limit,
+                "upload_limit": upload_limit,
+            }
+
+    def status(self):
+        """Return the active plan, the configured classes and the next scheduled change."""
+        with self._lock:
+            plan = self.plan or self.active_plan()
+            change = next_change(self.schedule, self.clock())
+            return {
+                "plan": plan.name,
+                "download_limit": plan.download_limit,
+                "upload_limit": plan.upload_limit,
+                "next_change": change.isoformat(timespec="minutes") if change else None,
+                "classes": dict(self.classes),
+                "default_class": self.default_class,
+            }
@@ -0,0 +1,167 @@
+"""
+Creation of v1, v2 and hybrid torrents from a file or directory.
+
+The piece size is picked from the content size unless one is given. v1
+pieces are hashed across every CPU by the verifier's worker pool, from
+memory-mapped files, and set one by one. v2 and hybrid torrents also need
+a SHA-256 merkle tree per file, which the Python bindings only fill
+through ``set_piece_hashes``, libtorrent's own hasher; they have no
+``set_hash2``. v1 is therefore the default, and v2 or hybrid are chosen
+explicitly, at libtorrent's hashing speed.
+
+A created torrent can be seeded right away: its data was just hashed, so
+it is added in seed mode, without a check.
+"""
+import os
+import time
+import logging
+import threading
+from itertools import count
+from concurrent.futures import as_completed
+import libtorrent as lt
+from .verifier import file_layout, hash_job, hash_jobs, worker_pool
+
+VERSIONS = {
+    "v1": lt.create_torrent.v1_only,
+    "v2": lt.create_torrent.v2_only,
+    "hybrid": 0,
+}
+MIN_PIECE_SIZE = 16 * 1024  # smallest piece v2 allows
+MAX_PIECE_SIZE = 16 * 1024 * 1024
+TARGET_PIECES = 1500  # the automatic piece size keeps a torrent at or under this many pieces
+CREATOR = "NanoTorrent"
+
+
+def piece_size_for(total_size):
+    """Return the smallest power-of-two piece size keeping ``total_size`` bytes within TARGET_PIECES pieces."""
+    piece_size = MIN_PIECE_SIZE
+    while piece_size < MAX_PIECE_SIZE and total_size > piece_size * TARGET_PIECES:
+        piece_size *= 2
+    return piece_size
+
+
+def create(path, version="v1", piece_size=0, trackers=(), web_seeds=(), comment="",
+           private=False, workers=0, progress=None):
+    """
+    Return the bencoded torrent of a file or directory.
+
+    ``trackers`` are URLs, one tier each in order. ``progress(done, total)``
+    is called with piece counts while hashing.
+    """
+    if version not in VERSIONS:
+        raise ValueError(f"version must be one of {', '.join(VERSIONS)}")
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such file or directory: {path}")
+    files = lt.file_storage()
+    lt.add_files(files, path)
+    if files.num_files() == 0:
+        raise ValueError(f"No files to add in {path}")
+    if piece_size and (piece_size < MIN_PIECE_SIZE or piece_size & (piece_size - 1)):
+        raise ValueError("piece_size must be a power of two of at least 16 KiB")
+
+    torrent = lt.create_torrent(files, piece_size or piece_size_for(files.total_size()), VERSIONS[version])
+    started = time.perf_counter()
+    if version == "v1":
+        _hash_v1(torrent, os.path.dirname(path), workers, progress)
+    else:
+        done = count(1)
+        lt.set_piece_hashes(
+            torrent, os.path.dirname(path),
+            lambda piece: progress(next(done), torrent.num_pieces()) if progress is not None else None,
+        )
+    logging.info(
+        f"Hashed {torrent.num_pieces()} pieces of {os.path.basename(path)} "
+        f"({version}) in {time.perf_counter() - started:.2f}s"
+    )
+
+    for tier, url in enumerate(trackers):
+        torrent.add_tracker(url, tier)
+    for url in web_seeds:
+        torrent.add_url_seed(url)
+    if comment:
+        torrent.set_comment(comment)
+    torrent.set_creator(CREATOR)
+    torrent.set_priv(private)
+    return lt.bencode(torrent.generate())
+
+
+def _hash_v1(torrent, parent, workers, progress):
+    """Set the SHA-1 of every piece, hashed across a process pool."""
+    jobs = hash_jobs(torrent.num_pieces(), torrent.piece_length())
+    done = 0
+    with worker_pool(file_layout(torrent.files()), torrent.piece_length(), parent, workers, len(jobs)) as executor:
+        for future in as_completed([executor.submit(hash_job, first, last) for first, last in jobs]):
+            first, digests = future.result()
+            for piece, digest in enumerate(digests, first):
+                if digest is None:
+                    raise OSError(f"Failed to read piece {piece}: a file changed while it was hashed")
+                torrent.set_hash(piece, digest)
+            done += len(digests)
+            if progress is not None:
+                progress(done, torrent.num_pieces())
+
+
+def default_output(path):
+    """Return where the torrent of a file or directory is written by default: next to it."""
+    return os.path.normpath(os.path.abspath(path)) + ".torrent"
+
+
+class CreateManager:
+    """
+    Create torrents in the background, write them out and optionally seed them.
+
+    Jobs are numbered in the order they were started; ``status`` reports
+    the progress and outcome of every job of this run.
+    """
+
+    def __init__(self, torrentmanager):
+        self.torrentmanager = torrentmanager
+        self._jobs = {}  # job id -> job dictionary, as returned by status()
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    def start(self, path, output=None, seed=False, **options):
+        """
+        Start creating the torrent of a file or directory and return the job id.
+
+        ``options`` are passed to ``create``. With ``seed`` the torrent is
+        added to the session in seed mode, saving into the parent of ``path``.
+        """
+        output = output or default_output(path)
+        with self._lock:
+            job = next(self._ids)
+            self._jobs[job] = {
+                "path": path, "output": output, "seed": seed,
+                "state": "running", "progress": 0.0, "info_hash": None, "error": None,
+            }
+        threading.Thread(
+            target=self._run, args=(job, path, output, seed, options), name=f"create-{job}", daemon=True
+        ).start()
+        return job
+
+    def _run(self, job, path, output, seed, options):
+        def progress(done, total):
+            with self._lock:
+                self._jobs[job]["progress"] = done / total
+
+        try:
+            data = create(path, progress=progress, **options)
+            with open(output, "wb") as f:
+                f.write(data)
+            info = lt.torrent_info(lt.bdecode(data))
+            info_hash = str(info.info_hashes().get_best())
+            if seed:
+                self.torrentmanager.add_torrent(info, os.path.dirname(os.path.abspath(path)), seed=True)
+            update = {"state": "done", "progress": 1.0, "info_hash": info_hash}
+            logging.info(f"Created torrent {output}")
+        except Exception as e:
+            logging.error(f"Failed to create a torrent of {path}. Error: {e}")
+            update = {"state": "failed", "error": str(e)}
+        with self._lock:
+            self._jobs[job].update(update)
+
+    def status(self):
+        """Return {job id: {"path", "output", "seed", "state", "progress", "info_hash", "error"}}."""
+        with self._lock:
+            return {job: dict(details) for job, details in self._jobs.items()}
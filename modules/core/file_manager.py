@@ -0,0 +1,152 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+import libtorrent as lt
+from .status_cache import info_hash_of
+
+RETRY_DELAY = 2  # seconds before the first retry of a failed move; doubles with every attempt
+
+
+class FileManager:
+    """
+    Relocate finished torrents out of their .incomplete folder.
+
+    Moves go through ``torrent_handle.move_storage`` so libtorrent relocates
+    the files on its disk threads and keeps the handle pointing at them.
+    At most ``max_concurrent`` moves run at once and the rest wait in two
+    queues. A move within one filesystem is a rename, so renames are started
+    ahead of the moves across filesystems, which copy data; each queue is
+    served in order. A move that fails to start or fails on the disk threads
+    is retried up to ``max_retries`` times, after RETRY_DELAY seconds that
+    double with every attempt. ``tick`` is called periodically on the alert
+    dispatcher to queue the retries that are due.
+    """
+
+    def __init__(self, max_concurrent=2, max_retries=3, clock=time.monotonic):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_retries = max_retries
+        self.clock = clock
+        self._renames = deque()      # jobs waiting for a slot, started first
+        self._copies = deque()       # jobs waiting for a slot after the renames
+        self._delayed = []           # (due, job) of failed moves waiting to be retried
+        self._active = {}            # info_hash -> job
+        self._attempts = {}          # info_hash -> failed attempts so far
+        self._lock = threading.Lock()
+        self._progress_callbacks = []
+
+    def add_progress_callback(self, callback):
+        """Call ``callback(info_hash, event, active, queued)`` when a move is queued, started, done, retried or failed."""
+        self._progress_callbacks.append(callback)
+
+    def move_completed_torrent(self, handle, save_path, name):
+        """Queue the move of the finished torrent ``name`` from ``save_path`` to its parent folder."""
+        target_folder = os.path.dirname(os.path.normpath(save_path))
+        info_hash = info_hash_of(handle)
+        rename = self._same_filesystem(save_path, target_folder)
+        with self._lock:
+            if info_hash in self._active or any(job[0] == info_hash for job in self._waiting()):
+                return
+            # A rename is atomic and cheap, it goes ahead of the copies
+            (self._renames if rename else self._copies).append((info_hash, handle, target_folder, name, rename))
+        self._report(info_hash, "queued")
+        self._start_next()
+
+    def on_storage_moved(self, alert):
+        """Finish a move reported by storage_moved_alert."""
+        info_hash = info_hash_of(alert.handle)
+        with self._lock:
+            if self._active.pop(info_hash, None) is None:
+                return
+            self._attempts.pop(info_hash, None)
+        logging.info(f"Moved completed torrent: {alert.torrent_name} to {alert.storage_path()}")
+        self._report(info_hash, "moved")
+        self._start_next()
+
+    def on_storage_moved_failed(self, alert):
+        """Retry or give up on a move reported by storage_moved_failed_alert."""
+        info_hash = info_hash_of(alert.handle)
+        with self._lock:
+            job = self._active.pop(info_hash, None)
+            if job is None:
+                return
+            attempts, retry = self._retry(job)
+        self._report_failure(info_hash, job[3], attempts, retry, alert.error.message())
+        self._start_next()
+
+    def tick(self):
+        """Queue the failed moves whose retry delay has passed and start them if slots are free."""
+        now = self.clock()
+        with self._lock:
+            due = [job for when, job in self._delayed if when <= now]
+            if not due:
+                return
+            self._delayed = [(when, job) for when, job in self._delayed if when > now]
+            for job in due:
+                # Back of its queue, so other moves get a turn first
+                (self._renames if job[4] else self._copies).append(job)
+        self._start_next()
+
+    def pending(self):
+        """Return the number of moves running and waiting, retries included."""
+        with self._lock:
+            return len(self._active), len(self._renames) + len(self._copies) + len(self._delayed)
+
+    def _waiting(self):
+        """Return every job that is queued or waiting to be retried; called with the lock held."""
+        return [*self._renames, *self._copies, *(job for _, job in self._delayed)]
+
+    def _start_next(self):
+        """Start queued moves, renames first, while slots are free."""
+        started, failed = [], []
+        with self._lock:
+            while (self._renames or self._copies) and len(self._active) < self.max_concurrent:
+                job = (self._renames or self._copies).popleft()
+                info_hash, handle, target_folder, name, _ = job
+                try:
+                    handle.move_storage(target_folder, lt.move_flags_t.always_replace_files)
+                except Exception as e:
+                    failed.append((info_hash, name, *self._retry(job), str(e)))
+                    continue
+                self._active[info_hash] = job
+                started.append((info_hash, name, target_folder))
+        for info_hash, name, attempts, retry, message in failed:
+            self._report_failure(info_hash, name, attempts, retry, message)
+        for info_hash, name, target_folder in started:
+            logging.info(f"Moving torrent {name} to {target_folder}")
+            self._report(info_hash, "moving")
+
+    def _retry(self, job):
+        """Count a failed attempt and schedule the move again unless it ran out of retries; called with the lock held."""
+        info_hash = job[0]
+        attempts = self._attempts.get(info_hash, 0) + 1
+        retry = attempts <= self.max_retries
+        if retry:
+            self._attempts[info_hash] = attempts
+            self._delayed.append((self.clock() + RETRY_DELAY * 2 ** (attempts - 1), job))
+        else:
+            self._attempts.pop(info_hash, None)
+        return attempts, retry
+
+    def _report_failure(self, info_hash, name, attempts, retry, message):
+        if retry:
+            logging.warning(f"Failed to move {name} (attempt {attempts}), retrying. Error: {message}")
+            self._report(info_hash, "retrying")
+        else:
+            logging.error(f"Failed to move completed torrent: {name}. Error: {message}")
+            self._report(info_hash, "failed")
+
+    def _report(self, info_hash, event):
+        active, queued = self.pending()
+        for callback in self._progress_callbacks:
+            callback(info_hash, event, active, queued)
+
+    @staticmethod
+    def _same_filesystem(source, target):
+        """Return True if both paths live on the same device."""
+        try:
+            os.makedirs(target, exist_ok=True)
+            return os.stat(source).st_dev == os.stat(target).st_dev
+        except OSError:
+            return False
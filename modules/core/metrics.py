@@ -0,0 +1,150 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+import libtorrent as lt
+
+# Upper bounds, in seconds, of the timing histogram buckets
+TIMING_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Session counters shown in the debug panel; everything is exported to Prometheus
+HIGHLIGHTED_METRICS = (
+    "disk.queued_disk_jobs",
+    "disk.queued_write_bytes",
+    "disk.num_running_disk_jobs",
+    "disk.num_blocks_read",
+    "disk.num_blocks_written",
+    "disk.num_read_back",
+    "disk.request_latency",
+    "peer.num_peers_connected",
+    "peer.num_tcp_peers",
+    "peer.num_utp_peers",
+    "peer.num_peers_half_open",
+    "net.recv_payload_bytes",
+    "net.sent_payload_bytes",
+    "net.recv_bytes",
+    "net.sent_bytes",
+    "net.recv_tracker_bytes",
+    "net.sent_tracker_bytes",
+    "dht.dht_bytes_in",
+    "dht.dht_bytes_out",
+    "utp.num_utp_connected",
+    "utp.utp_packet_loss",
+    "utp.utp_timeout",
+    "utp.utp_packets_in",
+    "utp.utp_packets_out",
+    "ses.num_downloading_torrents",
+    "ses.num_seeding_torrents",
+)
+
+
+class Histogram:
+    """Fixed-bucket timing histogram; observing a value is one bisect and two additions."""
+
+    def __init__(self, buckets=TIMING_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsStore:
+    """
+    In-memory store for libtorrent session counters and our own timings.
+
+    Session counters are refreshed from each ``session_stats_alert``; the
+    alert dispatcher requests them periodically. Timings are recorded with
+    ``timed`` around hot paths. Both are rendered in the Prometheus text
+    format by ``render_prometheus``.
+    """
+
+    def __init__(self):
+        self._types = {metric.name: str(metric.type) for metric in lt.session_stats_metrics()}
+        self._values = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.updated = 0.0
+
+    def on_session_stats(self, alert):
+        """Store the counters carried by a session_stats_alert."""
+        self.update_values(dict(alert.values))
+
+    def update_values(self, values):
+        """Replace the session counters, e.g. with the sums of several sessions'."""
+        with self._lock:
+            self._values = values
+            self.updated = time.time()
+
+    def observe(self, name, seconds):
+        """Record one duration, in seconds, for a named timing."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, name):
+        """Time the enclosed block into the named histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def values(self):
+        """Return a copy of the latest session counters."""
+        with self._lock:
+            return dict(self._values)
+
+    def timings(self):
+        """Return count, mean, p50 and p99 in seconds for every timing."""
+        with self._lock:
+            return {
+                name: {
+                    "count": histogram.count,
+                    "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99),
+                }
+                for name, histogram in self._histograms.items()
+            }
+
+    def render_prometheus(self):
+        """Render every counter and timing in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._values.items()):
+                metric = "libtorrent_" + name.replace(".", "_")
+                kind = "counter" if self._types.get(name) == "counter" else "gauge"
+                lines.append(f"# TYPE {metric} {kind}")
+                lines.append(f"{metric} {value}")
+
+            for name, histogram in sorted(self._histograms.items()):
+                metric = f"nanotorrent_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,135 @@
+import time
+import logging
+import threading
+import libtorrent as lt
+from .status_cache import info_hash_of
+
+
+def queue_settings(settings):
+    """Map the [Queue] section onto libtorrent's auto-manager settings."""
+    pack = {
+        "active_downloads": settings.get_int("Queue", "active_downloads", 3),
+        "active_seeds": settings.get_int("Queue", "active_seeds", 5),
+        "active_limit": settings.get_int("Queue", "active_limit", 500),
+        "dont_count_slow_torrents": settings.get_bool("Queue", "dont_count_slow_torrents", True),
+        "inactive_down_rate": settings.get_int("Queue", "slow_download_rate", 2048),
+        "inactive_up_rate": settings.get_int("Queue", "slow_upload_rate", 2048),
+    }
+    # Seeds past a goal also lose their seeding slot to seeds that have not reached it
+    ratio_limit = _float_setting(settings, "Queue", "ratio_limit")
+    if ratio_limit > 0:
+        pack["share_ratio_limit"] = int(ratio_limit * 100)
+    seed_time_limit = settings.get_int("Queue", "seed_time_limit")
+    if seed_time_limit > 0:
+        pack["seed_time_limit"] = seed_time_limit * 60
+    return pack
+
+
+def _float_setting(settings, section, option):
+    try:
+        return float(settings.get(section, option) or 0)
+    except ValueError:
+        return 0.0
+
+
+class QueueManager:
+    """
+    Queue torrents with libtorrent's auto-manager.
+
+    Auto-managed torrents are started and stopped by libtorrent so that at
+    most ``active_downloads`` download and ``active_seeds`` seed at once;
+    with ``dont_count_slow_torrents`` a torrent below the slow rates does
+    not take a slot. A torrent the user pauses or force-starts leaves the
+    queue. ``tick`` stops seeds that reached the ratio or seed time goal
+    and stores changed queue positions, which ``restore_positions`` puts
+    back after a restart.
+    """
+
+    def __init__(self, store, status_cache, settings):
+        self.store = store
+        self.status_cache = status_cache
+        self.settings = settings
+        self._positions = store.queue_positions()  # info_hash -> last stored position
+        self._seeding_since = {}  # info_hash -> monotonic time an auto-managed seed started seeding
+        self._lock = threading.Lock()
+
+    def pause(self, handle):
+        """Take a torrent out of the queue and pause it."""
+        handle.unset_flags(lt.torrent_flags.auto_managed)
+        handle.pause()
+        self.store.update(info_hash_of(handle), paused=True, auto_managed=False)
+
+    def resume(self, handle):
+        """Put a torrent back into the queue; libtorrent starts it when a slot is free."""
+        handle.set_flags(lt.torrent_flags.auto_managed)
+        handle.resume()
+        self.store.update(info_hash_of(handle), paused=False, auto_managed=True)
+
+    def force_start(self, handle):
+        """Start a torrent now, outside the queue and its limits."""
+        handle.unset_flags(lt.torrent_flags.auto_managed)
+        handle.resume()
+        self.store.update(info_hash_of(handle), paused=False, auto_managed=False)
+
+    def move(self, handle, direction):
+        """Move a torrent in the download queue: up, down, top or bottom."""
+        moves = {
+            "up": handle.queue_position_up,
+            "down": handle.queue_position_down,
+            "top": handle.queue_position_top,
+            "bottom": handle.queue_position_bottom,
+        }
+        if direction not in moves:
+            raise ValueError(f"Unknown queue direction {direction}")
+        moves[direction]()
+
+    def restore_positions(self, handles):
+        """Reorder freshly loaded torrents by their stored queue positions."""
+        with self._lock:
+            stored = dict(self._positions)
+        queued = [(stored[info_hash_of(handle)], handle) for handle in handles if stored.get(info_hash_of(handle), -1) >= 0]
+        queued.sort(key=lambda item: item[0])
+        current = [handle.queue_position() for _, handle in queued]
+        if current == sorted(current):
+            return
+        # Moving each torrent to the bottom in stored order rebuilds the queue
+        for _, handle in queued:
+            handle.queue_position_bottom()
+        logging.info(f"Restored the queue order of {len(queued)} torrents")
+
+    def tick(self):
+        """Apply the seeding goals and store queue positions that changed."""
+        self._stop_finished_seeds()
+
+        positions = {info_hash_of(status): status.queue_position for status in self.status_cache.all()}
+        with self._lock:
+            changed = {info_hash: position for info_hash, position in positions.items() if self._positions.get(info_hash) != position}
+            self._positions.update(changed)
+        if changed:
+            self.store.set_queue_positions(changed)
+
+    def _stop_finished_seeds(self):
+        """Pause auto-managed seeds that reached the ratio or seed time goal, going by the cached statuses."""
+        ratio_limit = _float_setting(self.settings, "Queue", "ratio_limit")
+        seed_time_limit = self.settings.get_int("Queue", "seed_time_limit") * 60
+        if ratio_limit <= 0 and seed_time_limit <= 0:
+            return
+
+        now = time.monotonic()
+        seeding = {}
+        for status in self.status_cache.all():
+            if status.state != lt.torrent_status.seeding or status.flags & lt.torrent_flags.paused:
+                continue
+            if not status.flags & lt.torrent_flags.auto_managed:
+                continue  # force-started seeds run until the user stops them
+            info_hash = info_hash_of(status)
+            # Seeding time advances without a status update; count on from when the seed was first seen
+            started = self._seeding_since.get(info_hash, now - status.seeding_duration.total_seconds())
+            ratio = status.all_time_upload / max(status.total_done, 1)
+            seeded = now - started
+            if (ratio_limit > 0 and ratio >= ratio_limit) or (seed_time_limit > 0 and seeded >= seed_time_limit):
+                self.pause(status.handle)
+                logging.info(f"Stopped seeding {status.name}: ratio {ratio:.2f}, seeded {seeded / 3600:.1f} h")
+            else:
+                seeding[info_hash] = started
+        self._seeding_since = seeding
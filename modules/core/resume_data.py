@@ -0,0 +1,87 @@
+import logging
+import threading
+import libtorrent as lt
+from .status_cache import info_hash_of
+
+
+class ResumeDataManager:
+    """
+    Save and load libtorrent fast-resume data in the torrent store.
+
+    Saving is asynchronous: ``request`` asks libtorrent for resume data and
+    the results arrive as ``save_resume_data_alert`` or
+    ``save_resume_data_failed_alert``, which the alert dispatcher routes to
+    ``on_resume_data`` and ``on_resume_data_failed``. ``wait`` blocks until
+    every outstanding request has been answered.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._outstanding = 0
+        self._condition = threading.Condition()
+
+    def request(self, handles, flags=lt.torrent_handle.save_info_dict):
+        """Ask libtorrent to generate resume data for the given handles."""
+        requested = 0
+        for handle in handles:
+            try:
+                handle.save_resume_data(flags)
+                requested += 1
+            except Exception as e:
+                logging.warning(f"Failed to request resume data. Error: {e}")
+        with self._condition:
+            self._outstanding += requested
+        return requested
+
+    def wait(self, timeout=30.0):
+        """Wait until every requested resume data has been written or failed."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._outstanding <= 0, timeout):
+                logging.warning(f"Timed out waiting for {self._outstanding} resume data saves")
+                return False
+        return True
+
+    def on_resume_data(self, alert):
+        """Store the resume data carried by a save_resume_data_alert."""
+        try:
+            self.store.save_resume(info_hash_of(alert.handle), lt.write_resume_data_buf(alert.params))
+        except Exception as e:
+            logging.error(f"Failed to write resume data. Error: {e}")
+        finally:
+            self._done()
+
+    def on_resume_data_failed(self, alert):
+        """Account for a resume data request libtorrent could not fulfil."""
+        logging.warning(f"Failed to save resume data: {alert.message()}")
+        self._done()
+
+    def _done(self):
+        with self._condition:
+            self._outstanding -= 1
+            self._condition.notify_all()
+
+    def params(self, row):
+        """Return the add_torrent_params of a stored torrent, from its resume data where available."""
+        params = self.load(row)
+        if params is None:
+            # No resume data: libtorrent has to check the files on disk
+            params = lt.parse_magnet_uri(row["magnet"]) if row["torrent"] is None else lt.add_torrent_params()
+            params.save_path = row["save_path"]
+            if row["paused"]:
+                params.flags = (params.flags | lt.torrent_flags.paused) & ~lt.torrent_flags.auto_managed
+            elif not row["auto_managed"]:
+                # Force-started: runs outside the queue
+                params.flags &= ~(lt.torrent_flags.paused | lt.torrent_flags.auto_managed)
+        if params.ti is None and row["torrent"] is not None:
+            params.ti = lt.torrent_info(lt.bdecode(row["torrent"]))
+        return params
+
+    def load(self, row):
+        """Return the add_torrent_params stored in a torrent store row, or None."""
+        if row["resume"] is None:
+            return None
+        try:
+            return lt.read_resume_data(row["resume"])
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable resume data for {row['info_hash']}. Error: {e}")
+            return None
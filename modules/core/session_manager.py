@@ -0,0 +1,98 @@
+import libtorrent as lt
+import logging
+import threading
+from .session_profiles import build_settings, DEFAULT_PROFILE
+from .queue_manager import queue_settings
+from .alert_logger import parse_categories
+
+# Alerts the client subscribes to; the default mask only reports errors
+ALERT_MASK = (
+    lt.alert_category.error
+    | lt.alert_category.status
+    | lt.alert_category.storage
+    | lt.alert_category.tracker
+)
+
+
+class SessionManager:
+    def __init__(self, settings):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._plan_limits = None
+        self._pack = self._build_settings()
+        self.session = lt.session(self._pack)
+        self._applied = self.session.get_settings()
+        settings.subscribe(self._on_settings_changed)
+
+    def _on_settings_changed(self, changes):
+        """Apply speed limit, profile, queue and alert category changes to the running session."""
+        if any(section in ("Speed", "Session", "Queue", "Logging") for section, _ in changes):
+            self.apply_settings()
+
+    def _build_settings(self):
+        """Build the settings pack from the profile, the [Session] overrides, the queue, the speed limits and the alert mask."""
+        overrides = self.settings.options("Session")
+        profile = overrides.pop("profile", "") or DEFAULT_PROFILE
+        pack = build_settings(profile, overrides)
+        pack.update(queue_settings(self.settings))
+        pack.update(self._rate_limits())
+        pack["alert_mask"] = self.alert_mask()
+        return pack
+
+    def alert_mask(self, muted=0):
+        """Return the categories the client handles plus the diagnostic ones of [Logging], less ``muted``."""
+        extra = parse_categories(self.settings.get("Logging", "alert_categories"))
+        # Only diagnostic categories can be muted; the dispatcher's subscribers need the rest
+        muted &= ~int(ALERT_MASK)
+        return (int(ALERT_MASK) | extra) & ~muted
+
+    def set_alert_mask(self, mask):
+        """Change the alert mask of the running session; the next apply_settings restores the configured one."""
+        with self._lock:
+            if self._applied.get("alert_mask") != mask:
+                self.session.apply_settings({"alert_mask": mask})
+                self._applied["alert_mask"] = mask
+
+    def speed_limits(self):
+        """Return the download and upload limits from the [Speed] settings."""
+        return self.settings.get_int("Speed", "max_download_speed"), self.settings.get_int("Speed", "max_upload_speed")
+
+    def set_plan_limits(self, limits):
+        """Replace the [Speed] limits with a rate plan's (download, upload), or restore them with None."""
+        self._plan_limits = limits
+        self.apply_settings()
+
+    def _rate_limits(self):
+        """Return the global rate limits: the active rate plan's, or the [Speed] settings."""
+        max_download_speed, max_upload_speed = self._plan_limits or self.speed_limits()
+        logging.info(f"Speed limits: download={max_download_speed} bytes/s, upload={max_upload_speed} bytes/s")
+        return {"download_rate_limit": max_download_speed, "upload_rate_limit": max_upload_speed}
+
+    def apply_settings(self):
+        """Apply the current settings to the running session; only changed keys are sent."""
+        pack = self._build_settings()
+        with self._lock:
+            # Overrides removed from settings.ini fall back to libtorrent's defaults
+            defaults = lt.default_settings()
+            for key in self._pack.keys() - pack.keys():
+                pack[key] = defaults[key]
+            self._pack = pack
+            changed = {key: value for key, value in pack.items() if self._applied.get(key) != value}
+            if not changed:
+                return {}
+            try:
+                self.session.apply_settings(changed)
+            except (KeyError, TypeError) as e:
+                logging.error(f"Failed to apply session settings. Error: {e}")
+                return {}
+            self._applied.update(changed)
+        logging.info(f"Applied session settings: {', '.join(sorted(changed))}")
+        return changed
+
+    def pause(self):
+        """Pause the session."""
+        self.session.pause()
+
+    def get_session(self):
+        """Return the libtorrent session."""
+        return self.session
@@ -0,0 +1,130 @@
+"""
+Named libtorrent tuning profiles.
+
+A profile is a partial settings_pack applied on top of libtorrent's
+defaults. Any key of the [Session] section of settings.ini other than
+``profile`` overrides the profile value of the setting with that name,
+for example::
+
+    [Session]
+    profile = seedbox
+    connections_limit = 4000
+    listen_interfaces = 0.0.0.0:51413
+    disk_write_mode = always_pwrite
+
+Values are converted to the type of libtorrent's default for that key;
+enum settings also accept their symbolic names.
+"""
+import logging
+import libtorrent as lt
+
+KiB = 1024
+MiB = 1024 * KiB
+
+# Settings whose values may be given by name in settings.ini
+ENUM_SETTINGS = {
+    "disk_write_mode": lt.mmap_write_mode_t,
+    "disk_io_read_mode": lt.io_buffer_mode_t,
+    "disk_io_write_mode": lt.io_buffer_mode_t,
+    "mixed_mode_algorithm": lt.bandwidth_mixed_algo_t,
+    "suggest_mode": lt.suggest_mode_t,
+    "choking_algorithm": lt.choking_algorithm_t,
+    "seed_choking_algorithm": lt.seed_choking_algorithm_t,
+}
+
+PROFILES = {
+    # Interactive use next to other traffic: moderate peer counts and
+    # uTP, whose congestion control backs off when the link is busy.
+    "desktop": {
+        "connections_limit": 200,
+        "connection_speed": 20,
+        "aio_threads": 4,
+        "hashing_threads": 1,
+        "send_buffer_watermark": 512 * KiB,
+        "send_buffer_low_watermark": 10 * KiB,
+        "max_queued_disk_bytes": 1 * MiB,
+        "disk_write_mode": int(lt.mmap_write_mode_t.auto_mmap_write),
+        "enable_outgoing_utp": True,
+        "enable_incoming_utp": True,
+        "mixed_mode_algorithm": int(lt.bandwidth_mixed_algo_t.peer_proportional),
+    },
+    # Dedicated upload box: many peers, deep send buffers and disk queues,
+    # rate-based unchoking and TCP preferred over uTP.
+    "seedbox": {
+        "connections_limit": 2000,
+        "connection_speed": 200,
+        "aio_threads": 16,
+        "hashing_threads": 4,
+        "send_buffer_watermark": 4 * MiB,
+        "send_buffer_low_watermark": 1 * MiB,
+        "send_buffer_watermark_factor": 150,
+        "max_queued_disk_bytes": 16 * MiB,
+        "file_pool_size": 500,
+        "max_peerlist_size": 8000,
+        "disk_write_mode": int(lt.mmap_write_mode_t.always_pwrite),
+        "suggest_mode": int(lt.suggest_mode_t.suggest_read_cache),
+        "choking_algorithm": int(lt.choking_algorithm_t.rate_based_choker),
+        "seed_choking_algorithm": int(lt.seed_choking_algorithm_t.fastest_upload),
+        "mixed_mode_algorithm": int(lt.bandwidth_mixed_algo_t.prefer_tcp),
+    },
+    # Small VPS: few peers and threads, short buffers and no memory-mapped
+    # writes, whose dirty pages count against the container's memory.
+    "low_memory": {
+        "connections_limit": 50,
+        "connection_speed": 10,
+        "aio_threads": 2,
+        "hashing_threads": 1,
+        "send_buffer_watermark": 64 * KiB,
+        "send_buffer_low_watermark": 8 * KiB,
+        "send_buffer_watermark_factor": 25,
+        "max_queued_disk_bytes": 256 * KiB,
+        "checking_mem_usage": 32,
+        "file_pool_size": 20,
+        "max_peerlist_size": 500,
+        "max_paused_peerlist_size": 100,
+        "disk_write_mode": int(lt.mmap_write_mode_t.always_pwrite),
+        "mixed_mode_algorithm": int(lt.bandwidth_mixed_algo_t.peer_proportional),
+    },
+}
+
+DEFAULT_PROFILE = "desktop"
+
+_DEFAULTS = lt.default_settings()
+
+
+def parse_value(key, value):
+    """Convert a settings.ini string to the type libtorrent expects for ``key``."""
+    default = _DEFAULTS[key]
+    if isinstance(default, bool):
+        if value.lower() not in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+            raise ValueError(f"expected a boolean, got {value!r}")
+        return value.lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        enum = ENUM_SETTINGS.get(key)
+        if enum is not None and value in enum.names:
+            return int(enum.names[value])
+        return int(value)
+    return value
+
+
+def build_settings(profile, overrides):
+    """Return the settings of a profile with the given string overrides applied."""
+    if profile not in PROFILES:
+        logging.warning(f"Unknown session profile {profile!r}, using {DEFAULT_PROFILE}")
+        profile = DEFAULT_PROFILE
+
+    # Keys set by any profile start from libtorrent's default, so switching
+    # profiles on a running session also resets what the old one changed
+    settings = {key: _DEFAULTS[key] for values in PROFILES.values() for key in values}
+    settings.update(PROFILES[profile])
+    for key, value in overrides.items():
+        if not value:
+            continue
+        if key not in _DEFAULTS:
+            logging.warning(f"Ignoring unknown libtorrent setting in [Session]: {key}")
+            continue
+        try:
+            settings[key] = parse_value(key, value)
+        except ValueError as e:
+            logging.warning(f"Ignoring invalid value for {key}. Error: {e}")
+    return settings
@@ -0,0 +1,626 @@
+"""
+Sharded session mode: torrents spread by info-hash over worker processes.
+
+Past several thousand torrents one libtorrent session, with its alerts
+and statuses handled by one Python process, becomes the limit. With
+``count`` set, the daemon runs that many shards instead, each a worker
+process with its own TorrentManager, session, listen port, torrents.db
+and log, in a numbered folder under ``directory``::
+
+    [Shards]
+    count = 4
+    directory = shards
+
+A torrent lives on shard ``int(info_hash[:8], 16) % count``. The front
+end, ShardedTorrentManager, has the TorrentManager methods the control
+API and the watch folder use and routes each call to the torrent's
+shard over a pipe. Workers push their status batches, removals and
+session counters the other way, as tuples pickled once per batch, and
+the front end keeps the combined status dictionaries the API serves.
+
+Workers start from the front end's settings, and follow its changes,
+except that listen and streaming ports are offset by the shard number,
+the [Speed] limits are divided between the shards and the watch folder
+is left to the front end. Queue slots and bandwidth plans apply per
+shard. After the count changes, the torrents on the wrong shard, and
+those of shards that are gone, are moved to their shard with their
+resume data at startup, without a check.
+"""
+import os
+import signal
+import logging
+import threading
+import multiprocessing
+from itertools import count
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import wait
+import libtorrent as lt
+from .torrent_manager import TorrentManager, params_info_hash
+from .torrent_store import TorrentStore
+from .metrics import MetricsStore
+from .creator import CreateManager
+from .watch_folder import WatchFolder
+from modules.utils.settings_handler import SettingsHandler
+from modules.utils.logger import setup_logging
+
+CALL_TIMEOUT = 60     # seconds a front end call waits for its shard
+STOP_TIMEOUT = 120    # seconds a shard gets to save its resume data and exit
+CALL_WORKERS = 4      # threads per shard running front end calls
+MOVE_BATCH = 100      # torrents moved between shards per call
+DEFAULT_INTERFACES = "0.0.0.0:6881,[::]:6881"  # libtorrent's listen_interfaces default
+
+# Methods of a shard's TorrentManager and its components the front end may call
+COMMANDS = {
+    "pause_torrent", "resume_torrent", "force_start_torrent", "move_in_queue", "remove_torrent",
+    "export_torrents", "import_torrents", "metadata_pending",
+    "torrents.select",
+    "bandwidth.set_torrent_bandwidth", "bandwidth.torrent_bandwidth", "bandwidth.tick", "bandwidth.status",
+    "streams.start", "streams.stop", "streams.streams",
+    "verifier.start", "verifier.cancel", "verifier.status",
+    "history.series",
+}
+
+
+def shard_of(info_hash, shards):
+    """Return the shard a torrent lives on."""
+    return int(info_hash[:8], 16) % shards
+
+
+def shard_interfaces(interfaces, index):
+    """Offset every non-zero port of a listen_interfaces value by the shard number."""
+    shifted = []
+    for interface in (interfaces or DEFAULT_INTERFACES).split(","):
+        interface = interface.strip()
+        host, separator, port = interface.rpartition(":")
+        digits = port.rstrip("s")  # a trailing s marks an SSL listen socket
+        if separator and digits.isdigit() and int(digits):
+            interface = f"{host}:{int(digits) + index}{port[len(digits):]}"
+        shifted.append(interface)
+    return ",".join(shifted)
+
+
+def shard_setting(section, option, value, index, shards):
+    """Return the value a front end setting takes in shard ``index`` of ``shards``."""
+    if (section, option) == ("Session", "listen_interfaces"):
+        return shard_interfaces(value, index)
+    if (section, option) == ("Streaming", "port") and value.isdigit() and int(value):
+        return str(int(value) + index)
+    if section == "Speed" and value.isdigit() and int(value):
+        return str(max(int(value) // shards, 1))
+    if (section, option) == ("Downloads", "watch_folder"):
+        return ""
+    if (section, option) == ("Logging", "file"):
+        # Into the shard's folder, the working directory of its process
+        return os.path.basename(value)
+    return value
+
+
+def run_shard(index, shards, directory, options, connection):
+    """Entry point of a shard's worker process: serve the front end until it stops the shard or goes away."""
+    # Ctrl-C and SIGTERM reach the whole process group; the front end stops the shards in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    os.makedirs(directory, exist_ok=True)
+    os.chdir(directory)
+    settings = SettingsHandler("settings.ini")
+    for section, values in options.items():
+        for option, value in values.items():
+            settings.set(section, option, shard_setting(section, option, value, index, shards))
+    settings.flush()
+    setup_logging(settings)
+    ShardWorker(index, shards, settings, connection).serve()
+    settings.close()
+
+
+class ShardWorker:
+    """
+    One shard: a TorrentManager in a worker process, driven over a pipe.
+
+    Front end calls run on a small thread pool, so a slow one, such as
+    exporting torrents, does not hold up the others. Status batches,
+    removals and session counters are sent from the dispatcher thread.
+    """
+
+    def __init__(self, index, shards, settings, connection):
+        self.index = index
+        self.shards = shards
+        self.settings = settings
+        self.connection = connection
+        self._send_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=CALL_WORKERS, thread_name_prefix=f"shard-{index}-call")
+        self.torrentmanager = TorrentManager(settings)
+        self.handlers = {"add_params": self.add_params, "misplaced": self.misplaced}
+
+        dispatcher = self.torrentmanager.dispatcher
+        self.torrentmanager.add_status_callback(self._send_statuses)
+        dispatcher.subscribe(lt.add_torrent_alert, self._on_torrent_added)
+        dispatcher.subscribe(lt.torrent_removed_alert, self._on_torrent_removed)
+        dispatcher.subscribe(lt.session_stats_alert, self._on_session_stats)
+        dispatcher.subscribe(
+            lt.torrent_finished_alert,
+            lambda alert: logging.info(f"Torrent finished: {alert.torrent_name}"),
+        )
+        threading.Thread(target=self._report_loaded, name="shard-loaded", daemon=True).start()
+
+    def send(self, message):
+        try:
+            with self._send_lock:
+                self.connection.send(message)
+        except OSError:
+            pass  # the front end is gone; serve() sees it and stops
+
+    def serve(self):
+        """Run the front end's calls until it stops this shard or closes the pipe."""
+        while True:
+            try:
+                message = self.connection.recv()
+            except (EOFError, OSError):
+                logging.warning(f"Shard {self.index} lost its front end, stopping")
+                break
+            kind = message[0]
+            if kind == "call":
+                self._executor.submit(self._call, *message[1:])
+            elif kind == "settings":
+                for (section, option), value in message[1].items():
+                    self.settings.set(section, option, value)
+            elif kind == "stop":
+                break
+        self._executor.shutdown()
+        self.torrentmanager.stop()
+        self.connection.close()
+
+    def _call(self, call_id, command, args, kwargs):
+        try:
+            result = self._resolve(command)(*args, **kwargs)
+        except Exception as e:
+            self.send(("result", call_id, e, None))
+        else:
+            self.send(("result", call_id, None, result))
+
+    def _resolve(self, command):
+        if command in self.handlers:
+            return self.handlers[command]
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown shard command {command}")
+        target = self.torrentmanager
+        for name in command.split("."):
+            target = getattr(target, name)
+        return target
+
+    def add_params(self, data, save_path, seed=False):
+        """Add a torrent from add_torrent_params serialized with write_resume_data_buf."""
+        return self.torrentmanager.add_params(lt.read_resume_data(data), save_path, seed)
+
+    def misplaced(self):
+        """Return the info-hashes of the torrents stored here that belong to another shard."""
+        return [
+            info_hash for info_hash in self.torrentmanager.store.info_hashes()
+            if shard_of(info_hash, self.shards) != self.index
+        ]
+
+    def _send_statuses(self, torrents):
+        if torrents:
+            # Keys once per batch, values as tuples: far less to pickle than a dictionary per torrent
+            self.send(("statuses", tuple(torrents[0]), [tuple(torrent.values()) for torrent in torrents]))
+
+    def _report_loaded(self):
+        self.torrentmanager.loaded.wait()
+        self._send_statuses(self.torrentmanager.get_torrents())
+        self.send(("loaded",))
+
+    def _on_torrent_added(self, alert):
+        # Runs after the TorrentManager registered the torrent; its first status may never change
+        if not alert.error.value():
+            self._send_statuses(self.torrentmanager.get_torrents([params_info_hash(alert.params)]))
+
+    def _on_torrent_removed(self, alert):
+        self.send(("removed", [str(alert.info_hashes.get_best())]))
+
+    def _on_session_stats(self, alert):
+        self.send(("stats", dict(alert.values)))
+
+
+class Shard:
+    """The front end's end of a worker process."""
+
+    def __init__(self, index, process, connection):
+        self.index = index
+        self.process = process
+        self.connection = connection
+        self.loaded = threading.Event()
+        self._send_lock = threading.Lock()
+
+    def send(self, message):
+        with self._send_lock:
+            self.connection.send(message)
+
+
+def _merge(results):
+    """Combine the results of a call on every shard: dictionaries are merged and lists joined."""
+    results = [result for result in results if result is not None]
+    if not results:
+        return None
+    if isinstance(results[0], dict):
+        merged = {}
+        for result in results:
+            merged.update(result)
+        return merged
+    if isinstance(results[0], list):
+        return [item for result in results for item in result]
+    return results
+
+
+class ShardedComponent:
+    """
+    Front of a component every shard's TorrentManager has, such as ``verifier``.
+
+    Methods named in ``routed`` act on one torrent, their first argument,
+    and go to its shard; the others go to every shard and their results
+    are merged.
+    """
+
+    def __init__(self, manager, name, routed):
+        self._manager = manager
+        self._name = name
+        self._routed = set(routed)
+
+    def __getattr__(self, method):
+        command = f"{self._name}.{method}"
+        if command not in COMMANDS:
+            raise AttributeError(method)
+        if method in self._routed:
+            return lambda info_hash, *args, **kwargs: self._manager.call_owner(
+                info_hash, command, info_hash, *args, **kwargs
+            )
+        return lambda *args, **kwargs: _merge(self._manager.broadcast(command, *args, **kwargs))
+
+
+class ShardedRegistry:
+    """Front of the shards' torrent registries: lookups from the front end's statuses, selections from every shard."""
+
+    def __init__(self, manager):
+        self._manager = manager
+
+    def __len__(self):
+        return len(self._manager.get_torrents())
+
+    def __contains__(self, info_hash):
+        return self._manager.owner(info_hash) is not None
+
+    def select(self, **filters):
+        """Return the info-hashes matching every given filter, shard by shard; see TorrentRegistry.select."""
+        return _merge(self._manager.broadcast("torrents.select", **filters))
+
+
+class ShardedHistory:
+    """Rate history of the shards: a torrent's from its shard, the session's summed over every shard."""
+
+    def __init__(self, manager):
+        self._manager = manager
+
+    def series(self, info_hash=None, resolution="seconds"):
+        """See RateHistory.series."""
+        if info_hash is not None:
+            return self._manager.call_owner(info_hash, "history.series", info_hash, resolution)
+        series = [result for result in self._manager.broadcast("history.series", None, resolution) if result]
+        if not series:
+            return None
+        # Shards sample on their own clocks; line up the newest samples
+        length = min(len(result["times"]) for result in series)
+        if not length:
+            return {**series[0], "times": series[0]["times"][:0]}
+        total = {"step": series[0]["step"], "span": series[0]["span"], "times": series[0]["times"][-length:]}
+        for field in ("download", "upload", "peers"):
+            total[field] = sum(result[field][-length:] for result in series)
+        return total
+
+
+class ShardedTorrentManager:
+    """
+    TorrentManager front end over ``shards`` worker processes.
+
+    Offers what the control API, the watch folder and the torrent creator
+    use: adding, acting on and removing torrents by info-hash, the cached
+    status dictionaries, status callbacks, metrics, and the bandwidth,
+    streams, verifier, history and torrents components. The GUI works on
+    libtorrent handles and stays on a single TorrentManager.
+    """
+
+    def __init__(self, settings, shards):
+        self.settings = settings
+        self.count = shards
+        self.directory = settings.get("Shards", "directory") or "shards"
+        self.metrics = MetricsStore()
+        self.torrents = ShardedRegistry(self)
+        self.history = ShardedHistory(self)
+        self.bandwidth = ShardedComponent(self, "bandwidth", routed=("set_torrent_bandwidth", "torrent_bandwidth"))
+        self.streams = ShardedComponent(self, "streams", routed=("start", "stop"))
+        self.verifier = ShardedComponent(self, "verifier", routed=("start", "cancel"))
+        self.creator = CreateManager(self)
+        self.watch_folder = WatchFolder(self, settings)
+        self.loaded = threading.Event()
+        self._statuses = {}  # info-hash -> status dictionary
+        self._owners = {}    # info-hash -> shard the status came from
+        self._stats = {}     # shard -> latest session counters
+        self._calls = {}     # call id -> (shard, Future)
+        self._call_ids = count(1)
+        self._status_callbacks = []
+        self._removed_callbacks = []
+        self._lock = threading.Lock()
+        self._stopping = False
+
+        context = multiprocessing.get_context("spawn")
+        options = {section: settings.options(section) for section in settings.sections()}
+        self.shards = []
+        for index in range(shards):
+            connection, child = context.Pipe()
+            process = context.Process(
+                target=run_shard, name=f"shard-{index}",
+                args=(index, shards, os.path.join(self.directory, str(index)), options, child),
+            )
+            process.start()
+            child.close()
+            self.shards.append(Shard(index, process, connection))
+        logging.info(f"Started {shards} shards in {self.directory}")
+
+        self._receiver = threading.Thread(target=self._receive, name="shard-receiver", daemon=True)
+        self._receiver.start()
+        settings.subscribe(self._on_settings_changed)
+        threading.Thread(target=self._finish_loading, name="shard-loader", daemon=True).start()
+        self.watch_folder.start()
+
+    def call(self, index, command, *args, **kwargs):
+        """Start a call on a shard and return a Future of its result."""
+        future = Future()
+        call_id = next(self._call_ids)
+        with self._lock:
+            self._calls[call_id] = (index, future)
+        try:
+            self.shards[index].send(("call", call_id, command, args, kwargs))
+        except OSError as e:
+            with self._lock:
+                self._calls.pop(call_id, None)
+            future.set_exception(ConnectionError(f"Shard {index} is not running: {e}"))
+        return future
+
+    def broadcast(self, command, *args, **kwargs):
+        """Run a call on every shard at once and return their results in shard order."""
+        futures = [self.call(shard.index, command, *args, **kwargs) for shard in self.shards]
+        return [future.result(CALL_TIMEOUT) for future in futures]
+
+    def owner(self, info_hash):
+        """Return the shard a loaded torrent is on, or None."""
+        with self._lock:
+            return self._owners.get(info_hash)
+
+    def call_owner(self, info_hash, command, *args, **kwargs):
+        """Run a call on the shard of a torrent and return its result."""
+        index = self.owner(info_hash)
+        if index is None:
+            index = shard_of(info_hash, self.count)
+        return self.call(index, command, *args, **kwargs).result(CALL_TIMEOUT)
+
+    def _receive(self):
+        """Handle the messages of every shard until all their pipes are closed."""
+        connections = {shard.connection: shard for shard in self.shards}
+        while connections:
+            for connection in wait(list(connections)):
+                shard = connections[connection]
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    del connections[connection]
+                    self._on_shard_exited(shard)
+                    continue
+                try:
+                    self._handle(shard, message)
+                except Exception as e:
+                    logging.error(f"Failed to handle a message from shard {shard.index}. Error: {e}")
+
+    def _handle(self, shard, message):
+        kind = message[0]
+        if kind == "statuses":
+            _, keys, rows = message
+            torrents = [dict(zip(keys, row)) for row in rows]
+            with self._lock:
+                for torrent in torrents:
+                    self._statuses[torrent["info_hash"]] = torrent
+                    self._owners[torrent["info_hash"]] = shard.index
+            for callback in self._status_callbacks:
+                callback(torrents)
+        elif kind == "removed":
+            removed = []
+            with self._lock:
+                for info_hash in message[1]:
+                    # A torrent moved to another shard may already report from there
+                    if self._owners.get(info_hash) == shard.index:
+                        del self._owners[info_hash]
+                        self._statuses.pop(info_hash, None)
+                        removed.append(info_hash)
+            for info_hash in removed:
+                for callback in self._removed_callbacks:
+                    callback(info_hash)
+        elif kind == "stats":
+            self._stats[shard.index] = message[1]
+            totals = {}
+            for values in list(self._stats.values()):
+                for name, value in values.items():
+                    totals[name] = totals.get(name, 0) + value
+            self.metrics.update_values(totals)
+        elif kind == "result":
+            _, call_id, error, result = message
+            with self._lock:
+                _, future = self._calls.pop(call_id)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        elif kind == "loaded":
+            shard.loaded.set()
+
+    def _on_shard_exited(self, shard):
+        if not self._stopping:
+            logging.error(f"Shard {shard.index} exited with code {shard.process.exitcode}")
+        shard.loaded.set()
+        with self._lock:
+            failed = [call_id for call_id, (index, _) in self._calls.items() if index == shard.index]
+            futures = [self._calls.pop(call_id)[1] for call_id in failed]
+        for future in futures:
+            future.set_exception(ConnectionError(f"Shard {shard.index} exited"))
+
+    def _on_settings_changed(self, changes):
+        for shard in self.shards:
+            try:
+                shard.send(("settings", {
+                    (section, option): shard_setting(section, option, value, shard.index, self.count)
+                    for (section, option), value in changes.items()
+                }))
+            except OSError as e:
+                logging.error(f"Failed to pass settings to shard {shard.index}. Error: {e}")
+
+    def _finish_loading(self):
+        """Wait for every shard to load its torrents, move the misplaced ones and report the library loaded."""
+        for shard in self.shards:
+            shard.loaded.wait()
+        try:
+            self._rebalance()
+        except Exception as e:
+            logging.error(f"Failed to move torrents between shards. Error: {e}")
+        self.loaded.set()
+        logging.info(f"Loaded {len(self.get_torrents())} torrents in {self.count} shards")
+
+    def _rebalance(self):
+        """Move the torrents on the wrong shard, and those of shards beyond the count, to their shard."""
+        moved = 0
+        for shard, misplaced in zip(self.shards, self.broadcast("misplaced")):
+            for first in range(0, len(misplaced), MOVE_BATCH):
+                batch = misplaced[first:first + MOVE_BATCH]
+                moved += self._import(self.call(shard.index, "export_torrents", batch).result(CALL_TIMEOUT))
+        for directory in self._orphaned_directories():
+            store = TorrentStore(os.path.join(directory, "torrents.db"))
+            try:
+                info_hashes = store.info_hashes()
+                for first in range(0, len(info_hashes), MOVE_BATCH):
+                    batch = info_hashes[first:first + MOVE_BATCH]
+                    moved += self._import([dict(store.get(info_hash)) for info_hash in batch])
+                    for info_hash in batch:
+                        store.remove(info_hash)
+            finally:
+                store.close()
+        if moved:
+            logging.info(f"Moved {moved} torrents to their shards")
+
+    def _import(self, rows):
+        """Add exported torrents to their shards and return how many were added."""
+        batches = {}
+        for row in rows:
+            batches.setdefault(shard_of(row["info_hash"], self.count), []).append(row)
+        futures = [self.call(index, "import_torrents", batch) for index, batch in batches.items()]
+        return sum(len(future.result(CALL_TIMEOUT)) for future in futures)
+
+    def _orphaned_directories(self):
+        """Return the folders of shards numbered beyond the count that still hold torrents."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [
+            os.path.join(self.directory, name) for name in sorted(names)
+            if name.isdigit() and int(name) >= self.count
+            and os.path.exists(os.path.join(self.directory, name, "torrents.db"))
+        ]
+
+    def add_status_callback(self, callback):
+        """Call ``callback(torrents)`` with the status dictionaries of every batch of changed torrents."""
+        self._status_callbacks.append(callback)
+
+    def remove_status_callback(self, callback):
+        self._status_callbacks.remove(callback)
+
+    def add_removed_callback(self, callback):
+        """Call ``callback(info_hash)`` whenever a torrent left its shard's session, however it was removed."""
+        self._removed_callbacks.append(callback)
+
+    def remove_removed_callback(self, callback):
+        self._removed_callbacks.remove(callback)
+
+    def add_torrent(self, torrent_file, save_path, seed=False):
+        """Add a new torrent from a .torrent path or a torrent_info on its shard, and return its info-hash, or None if it is already added."""
+        try:
+            params = lt.add_torrent_params()
+            params.ti = torrent_file if isinstance(torrent_file, lt.torrent_info) else lt.torrent_info(torrent_file)
+            return self.add_params(params, save_path, seed)
+        except Exception as e:
+            logging.error(f"Failed to add torrent: {torrent_file}. Error: {e}")
+            raise
+
+    def add_magnet(self, uri, save_path):
+        """Add a new torrent from a magnet link on its shard and return its info-hash, or None if it is already added."""
+        try:
+            params = lt.parse_magnet_uri(uri)
+            return self.add_params(params, save_path)
+        except Exception as e:
+            logging.error(f"Failed to add magnet link: {uri}. Error: {e}")
+            raise
+
+    def add_params(self, params, save_path, seed=False):
+        """Add a new torrent on its shard; see TorrentManager.add_params."""
+        info_hash = params_info_hash(params)
+        # Shards run in their own folders
+        data = lt.write_resume_data_buf(params)
+        return self.call(shard_of(info_hash, self.count), "add_params", data, os.path.abspath(save_path), seed).result(
+            CALL_TIMEOUT
+        )
+
+    def pause_torrent(self, info_hash):
+        self.call_owner(info_hash, "pause_torrent", info_hash)
+
+    def resume_torrent(self, info_hash):
+        self.call_owner(info_hash, "resume_torrent", info_hash)
+
+    def force_start_torrent(self, info_hash):
+        self.call_owner(info_hash, "force_start_torrent", info_hash)
+
+    def move_in_queue(self, info_hash, direction):
+        """Move a torrent in its shard's download queue."""
+        self.call_owner(info_hash, "move_in_queue", info_hash, direction)
+
+    def is_paused(self, info_hash):
+        with self._lock:
+            torrent = self._statuses.get(info_hash)
+        return bool(torrent and torrent["paused"])
+
+    def remove_torrent(self, info_hash, delete_files=False):
+        """Remove a torrent from its shard, optionally deleting its files."""
+        self.call_owner(info_hash, "remove_torrent", info_hash, delete_files)
+        with self._lock:
+            self._statuses.pop(info_hash, None)
+            self._owners.pop(info_hash, None)
+
+    def metadata_pending(self):
+        return _merge(self.broadcast("metadata_pending"))
+
+    def get_torrents(self, info_hashes=None):
+        """Get the latest statuses of all torrents, or of the given info-hashes."""
+        with self.metrics.timed("get_torrents"), self._lock:
+            if info_hashes is None:
+                return list(self._statuses.values())
+            return [self._statuses[info_hash] for info_hash in info_hashes if info_hash in self._statuses]
+
+    def stop(self):
+        """Stop every shard, each saving its resume data, and wait for them."""
+        self.watch_folder.stop()
+        self._stopping = True
+        for shard in self.shards:
+            try:
+                shard.send(("stop",))
+            except OSError:
+                pass
+        for shard in self.shards:
+            shard.process.join(STOP_TIMEOUT)
+            if shard.process.is_alive():
+                logging.error(f"Shard {shard.index} did not stop in {STOP_TIMEOUT}s, terminating it")
+                shard.process.terminate()
+                shard.process.join()
+        self._receiver.join()
+        logging.info("Sharded torrent manager stopped")
@@ -0,0 +1,69 @@
+import logging
+import threading
+
+
+def info_hash_of(torrent):
+    """Return the hex info-hash for a torrent handle or status."""
+    hashes = torrent.info_hashes
+    if callable(hashes):
+        hashes = hashes()
+    return str(hashes.get_best())
+
+
+class StatusCache:
+    """
+    Snapshot of the last known status of every torrent.
+
+    Statuses are refreshed in one batch through ``post_torrent_updates``,
+    which makes libtorrent post a ``state_update_alert`` holding only the
+    torrents whose status changed since the previous request; the alert
+    dispatcher feeds those batches into ``apply``. Every status read in the
+    client is served from this cache instead of calling
+    ``torrent_handle.status()``.
+    """
+
+    def __init__(self):
+        self._statuses = {}
+        self._lock = threading.Lock()
+
+    def apply(self, statuses):
+        """
+        Store a batch of statuses of known torrents and return those.
+
+        A batch posted before a torrent was removed can arrive after
+        ``remove``; its status is dropped rather than bringing the torrent back.
+        """
+        applied = []
+        with self._lock:
+            for status in statuses:
+                info_hash = info_hash_of(status)
+                if info_hash in self._statuses:
+                    self._statuses[info_hash] = status
+                    applied.append(status)
+        return applied
+
+    def add(self, handle):
+        """Seed the cache with the initial status of a newly added torrent."""
+        try:
+            status = handle.status()
+        except Exception as e:
+            logging.warning(f"Failed to retrieve initial status for a torrent. Error: {e}")
+            return None
+        with self._lock:
+            self._statuses[info_hash_of(status)] = status
+        return status
+
+    def remove(self, info_hash):
+        """Forget a removed torrent."""
+        with self._lock:
+            self._statuses.pop(info_hash, None)
+
+    def get(self, info_hash):
+        """Return the cached status for an info-hash, or None."""
+        with self._lock:
+            return self._statuses.get(info_hash)
+
+    def all(self):
+        """Return all cached statuses."""
+        with self._lock:
+            return list(self._statuses.values())
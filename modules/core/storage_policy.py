@@ -0,0 +1,87 @@
+"""
+Storage allocation and part-file policy per save path.
+
+The [Storage] section holds the defaults; a ``[Storage:<path>]`` section
+overrides them for torrents saved under that path; when several sections
+match, the longest path wins::
+
+    [Storage]
+    allocation = sparse
+    part_file = keep
+
+    [Storage:/mnt/xfs]
+    allocation = full
+    part_file = remove
+
+``allocation`` is ``sparse`` (files grow as pieces arrive) or ``full``
+(every file is allocated when the torrent starts). ``part_file`` decides
+what happens to pieces shared between a wanted and a skipped file:
+
+- ``keep``: they are stored in a ``.<info-hash>.parts`` file in the save
+  path, left behind when the torrent is removed without its files.
+- ``remove``: as ``keep``, but the part file is deleted on removal.
+
+libtorrent 2.0 always writes a part file for skipped files, and the
+Python bindings cannot turn it off, so ``off`` is rejected like any
+other unknown value and ``keep`` is used.
+
+The disk I/O backend is session-wide: libtorrent 2.x selects it when the
+session is built, and the Python bindings only expose its write mode.
+Set ``disk_write_mode`` in [Session] to ``auto_mmap_write``,
+``always_mmap_write`` or ``always_pwrite`` (plain pwrite, as the posix
+backend does); ``benchmarks/bench_storage`` compares them all.
+"""
+import os
+import logging
+import libtorrent as lt
+
+ALLOCATION = {
+    "sparse": lt.storage_mode_t.storage_mode_sparse,
+    "full": lt.storage_mode_t.storage_mode_allocate,
+}
+PART_FILE = ("keep", "remove")
+SECTION_PREFIX = "Storage:"
+
+
+class StoragePolicy:
+    """Look up the allocation and part-file policy of a save path in settings."""
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    def for_path(self, save_path):
+        """Return {"allocation": ..., "part_file": ...} for a save path."""
+        policy = {
+            "allocation": self.settings.get("Storage", "allocation") or "sparse",
+            "part_file": self.settings.get("Storage", "part_file") or "keep",
+        }
+        path = os.path.normpath(save_path)
+        matches = []
+        for section in self.settings.sections():
+            if not section.startswith(SECTION_PREFIX):
+                continue
+            prefix = os.path.normpath(section[len(SECTION_PREFIX):])
+            if path == prefix or path.startswith(prefix.rstrip(os.sep) + os.sep):
+                matches.append((len(prefix), section))
+        for _, section in sorted(matches):
+            policy.update({key: value for key, value in self.settings.options(section).items() if value})
+
+        if policy["allocation"] not in ALLOCATION:
+            logging.warning(f"Unknown storage allocation {policy['allocation']!r} for {save_path}, using sparse")
+            policy["allocation"] = "sparse"
+        if policy["part_file"] not in PART_FILE:
+            logging.warning(f"Unknown part file policy {policy['part_file']!r} for {save_path}, using keep")
+            policy["part_file"] = "keep"
+        return policy
+
+    def apply(self, params, save_path):
+        """Set the storage mode of add_torrent_params from the policy of a save path."""
+        params.storage_mode = ALLOCATION[self.for_path(save_path)["allocation"]]
+
+    def remove_options(self, save_path, delete_files=False):
+        """Return the remove_torrent options for a torrent under a save path."""
+        if delete_files:
+            return lt.options_t.delete_files
+        if self.for_path(save_path)["part_file"] == "remove":
+            return lt.session.delete_partfile
+        return 0
@@ -0,0 +1,307 @@
+"""
+Streaming of files that are still downloading.
+
+A stream switches a torrent to sequential download, skips the other files
+and serves the streamed files from a localhost HTTP server
+with Range support::
+
+    GET http://127.0.0.1:8090/stream/<info_hash>/<file index>/<name>
+
+Each read sets piece deadlines for a read-ahead window in front of the
+requested position, with ``alert_when_available`` so libtorrent posts a
+``read_piece_alert`` with the data as soon as a piece has passed its hash
+check; for a piece already on disk the deadline acts as ``read_piece``.
+A request blocks only until the pieces it covers have arrived.
+
+Configured in the [Streaming] section of settings.ini.
+"""
+import logging
+import mimetypes
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import quote
+import libtorrent as lt
+from .status_cache import info_hash_of
+
+CACHED_PIECES = 32  # pieces kept in memory per streamed torrent, beyond the read-ahead window
+
+
+class StreamError(Exception):
+    """Raised when a piece of a streamed file cannot be read."""
+
+
+class TorrentStream:
+    """
+    Piece reader for the streamed files of one torrent.
+
+    Piece data arrives through ``on_read_piece`` on the alert dispatcher
+    thread; readers wait on a condition until their piece is cached.
+    """
+
+    def __init__(self, handle, info, deadline, read_ahead):
+        self.handle = handle
+        self.info = info
+        self.files = set()
+        self.priorities = handle.get_file_priorities()  # restored when the last file stops
+        self.flags = handle.flags() & (lt.torrent_flags.paused | lt.torrent_flags.auto_managed)  # restored too
+        self.deadline = deadline
+        self.window = max(read_ahead // info.piece_length(), 1)
+        self._cache = OrderedDict()  # piece -> bytes, least recently used first
+        self._requested = set()
+        self._errors = {}
+        self._condition = threading.Condition()
+
+    def file_range(self, index):
+        """Return the offset of a file in the torrent and its size."""
+        files = self.info.files()
+        return files.file_offset(index), files.file_size(index)
+
+    def read(self, offset, size, timeout):
+        """
+        Return up to ``size`` bytes at a torrent offset, from a single piece.
+
+        Sets deadlines for the read-ahead window and blocks until the piece
+        holding ``offset`` is available.
+        """
+        piece, start = divmod(offset, self.info.piece_length())
+        last = min(piece + self.window, self.info.num_pieces()) - 1
+        for ahead in range(piece, last + 1):
+            self._request(ahead, self.deadline * (ahead - piece + 1))
+        data = self._wait(piece, timeout)[start:start + size]
+        if not data:
+            raise StreamError(f"piece {piece} holds no data at offset {start}")
+        return data
+
+    def _request(self, piece, deadline):
+        with self._condition:
+            if piece in self._cache or piece in self._requested:
+                return
+            self._requested.add(piece)
+            self._errors.pop(piece, None)
+        # For a piece already on disk this posts the read_piece_alert right away
+        self.handle.set_piece_deadline(piece, deadline, lt.deadline_flags_t.alert_when_available)
+
+    def _wait(self, piece, timeout):
+        with self._condition:
+            available = self._condition.wait_for(
+                lambda: piece in self._cache or piece in self._errors, timeout
+            )
+            if not available:
+                # Let the next read request the piece again
+                self._requested.discard(piece)
+                raise StreamError(f"timed out waiting for piece {piece}")
+            if piece in self._errors:
+                raise StreamError(f"failed to read piece {piece}: {self._errors[piece]}")
+            self._cache.move_to_end(piece)
+            return self._cache[piece]
+
+    def on_read_piece(self, alert):
+        """Cache the data of a read_piece_alert and wake the readers waiting for it."""
+        with self._condition:
+            self._requested.discard(alert.piece)
+            if alert.error.value():
+                self._errors[alert.piece] = alert.error.message()
+            else:
+                self._cache[alert.piece] = bytes(alert.buffer)
+                while len(self._cache) > self.window + CACHED_PIECES:
+                    self._cache.popitem(last=False)
+            self._condition.notify_all()
+
+
+class StreamManager:
+    """
+    Start and stop file streams and run the HTTP server that serves them.
+
+    The server is started with the first stream and keeps running until
+    ``close``.
+    """
+
+    def __init__(self, torrentmanager, settings):
+        self.torrentmanager = torrentmanager
+        self.settings = settings
+        self._streams = {}  # info_hash -> TorrentStream
+        self._lock = threading.Lock()
+        self._server = None
+        torrentmanager.dispatcher.subscribe(lt.read_piece_alert, self._on_read_piece)
+
+    def start(self, info_hash, file_index=None):
+        """Start streaming a file of a torrent, by default its largest, and return its URL."""
+        handle = self.torrentmanager.get_handle(info_hash)
+        if handle is None:
+            raise KeyError(f"Unknown torrent {info_hash}")
+        info = handle.torrent_file()
+        if info is None:
+            raise ValueError("The torrent's metadata has not been received yet")
+        files = info.files()
+        if file_index is None:
+            file_index = max(range(info.num_files()), key=files.file_size)
+        if not 0 <= file_index < info.num_files() or files.file_flags(file_index) & lt.file_storage.flag_pad_file:
+            raise ValueError(f"The torrent has no file {file_index}")
+
+        with self._lock:
+            stream = self._streams.get(info_hash)
+            if stream is None:
+                stream = TorrentStream(
+                    handle, info,
+                    deadline=self.settings.get_int("Streaming", "deadline", 500),
+                    read_ahead=self.settings.get_int("Streaming", "read_ahead", 8 * 1024 * 1024),
+                )
+                self._streams[info_hash] = stream
+            stream.files.add(file_index)
+            priorities = [4 if index in stream.files else 0 for index in range(info.num_files())]
+        handle.prioritize_files(priorities)
+        handle.set_flags(lt.torrent_flags.sequential_download)
+        if self.torrentmanager.is_paused(info_hash):
+            self.torrentmanager.force_start_torrent(info_hash)
+
+        url = self._ensure_server()
+        name = files.file_name(file_index)
+        logging.info(f"Streaming {name} of {info.name()}")
+        return f"{url}/stream/{info_hash}/{file_index}/{quote(name)}"
+
+    def stop(self, info_hash, file_index=None):
+        """Stop streaming one file, or every file, of a torrent."""
+        with self._lock:
+            stream = self._streams.get(info_hash)
+            if stream is None:
+                return
+            if file_index is None:
+                stream.files.clear()
+            else:
+                stream.files.discard(file_index)
+            if stream.files:
+                return
+            del self._streams[info_hash]
+        try:
+            stream.handle.clear_piece_deadlines()
+            stream.handle.unset_flags(lt.torrent_flags.sequential_download)
+            stream.handle.prioritize_files(stream.priorities)
+        except RuntimeError as e:
+            logging.warning(f"Failed to restore {stream.info.name()} after streaming. Error: {e}")
+        if stream.flags & lt.torrent_flags.paused:
+            # A paused torrent was force-started for the stream
+            if stream.flags & lt.torrent_flags.auto_managed:
+                self.torrentmanager.resume_torrent(info_hash)  # back into the queue, which paused it
+            else:
+                self.torrentmanager.pause_torrent(info_hash)
+        logging.info(f"Stopped streaming {stream.info.name()}")
+
+    def streams(self):
+        """Return {info_hash: [file index, ...]} of the active streams."""
+        with self._lock:
+            return {info_hash: sorted(stream.files) for info_hash, stream in self._streams.items()}
+
+    def get(self, info_hash, file_index):
+        """Return the stream serving a file, or None."""
+        with self._lock:
+            stream = self._streams.get(info_hash)
+            return stream if stream is not None and file_index in stream.files else None
+
+    def close(self):
+        """Stop every stream and the HTTP server."""
+        for info_hash in list(self.streams()):
+            self.stop(info_hash)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _on_read_piece(self, alert):
+        with self._lock:
+            stream = self._streams.get(info_hash_of(alert.handle))
+        if stream is not None:
+            stream.on_read_piece(alert)
+
+    def _ensure_server(self):
+        """Start the HTTP server if it is not running and return its base URL."""
+        with self._lock:
+            if self._server is None:
+                host = self.settings.get("Streaming", "host") or "127.0.0.1"
+                server = ThreadingHTTPServer((host, self.settings.get_int("Streaming", "port", 8090)), _StreamHandler)
+                server.daemon_threads = True
+                server.streams = self
+                server.timeout_seconds = self.settings.get_int("Streaming", "timeout", 60)
+                threading.Thread(target=server.serve_forever, name="stream-server", daemon=True).start()
+                self._server = server
+                logging.info(f"Stream server listening on {host}:{server.server_address[1]}")
+            host, port = self._server.server_address[:2]
+            return f"http://{host}:{port}"
+
+
+def parse_range(header, size):
+    """Return the (first, last) byte positions of a single-range Range header, or None if unsatisfiable."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            return (max(size - length, 0), size - 1) if length > 0 and size else None
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    return (first, last) if first <= last else None
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    """Serve GET and HEAD requests for streamed files, honouring Range."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Stream server: {format % args}")
+
+    def _serve(self, body):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        stream = None
+        if len(parts) >= 3 and parts[0] == "stream" and parts[2].isdigit():
+            stream = self.server.streams.get(parts[1], int(parts[2]))
+        if stream is None:
+            self.send_error(404, "No such stream")
+            return
+
+        file_offset, size = stream.file_range(int(parts[2]))
+        status, first, last = 200, 0, size - 1
+        if "Range" in self.headers:
+            byte_range = parse_range(self.headers["Range"], size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status, (first, last) = 206, byte_range
+
+        self.send_response(status)
+        content_type = mimetypes.guess_type(parts[3] if len(parts) > 3 else "")[0]
+        self.send_header("Content-Type", content_type or "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(last - first + 1 if size else 0))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+        self.end_headers()
+        if not body or not size:
+            return
+
+        position = first
+        try:
+            while position <= last:
+                data = stream.read(file_offset + position, last - position + 1, self.server.timeout_seconds)
+                self.wfile.write(data)
+                position += len(data)
+        except StreamError as e:
+            # Headers are already sent: all that is left is to drop the connection
+            logging.warning(f"Stream of {stream.info.name()} interrupted. Error: {e}")
+            self.close_connection = True
+        except (ConnectionError, OSError):
+            self.close_connection = True  # the player seeked or went away
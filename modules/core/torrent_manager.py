@@ -0,0 +1,510 @@
+import logging
+import threading
+import time
+import libtorrent as lt
+from concurrent.futures import ThreadPoolExecutor
+from .session_manager import SessionManager
+from .file_manager import FileManager
+from .status_cache import StatusCache, info_hash_of
+from .torrent_registry import TorrentRegistry
+from .watch_folder import WatchFolder
+from .streaming import StreamManager
+from .storage_policy import StoragePolicy
+from .verifier import VerifyManager
+from .creator import CreateManager
+from .alert_dispatcher import AlertDispatcher
+from .alert_logger import AlertLogger
+from .resume_data import ResumeDataManager
+from .torrent_store import TorrentStore
+from .bandwidth import BandwidthScheduler
+from .queue_manager import QueueManager
+from .metrics import MetricsStore
+from .rate_history import RateHistory
+import os
+
+RESUME_DATA_INTERVAL = 60  # seconds between saves of modified resume data
+CHECKPOINT_INTERVAL = 300  # seconds between torrent store WAL checkpoints
+BANDWIDTH_INTERVAL = 5  # seconds between bandwidth plan checks and rebalancing
+QUEUE_INTERVAL = 30  # seconds between seeding goal checks and queue position saves
+HISTORY_INTERVAL = 1  # seconds between rate history samples, the finest resolution kept
+MOVE_RETRY_INTERVAL = 1  # seconds between checks for failed moves that are due a retry
+
+# libtorrent states and the names shown to users
+STATE_NAMES = {
+    lt.torrent_status.queued_for_checking: "Queued",
+    lt.torrent_status.checking_files: "Checking",
+    lt.torrent_status.downloading_metadata: "Downloading Metadata",
+    lt.torrent_status.downloading: "Downloading",
+    lt.torrent_status.finished: "Finished",
+    lt.torrent_status.seeding: "Seeding",
+    lt.torrent_status.allocating: "Allocating",
+    lt.torrent_status.error: "Error",
+}
+
+
+def params_info_hash(params):
+    """Return the hex info-hash of add_torrent_params, from the metadata or the magnet link."""
+    hashes = params.ti.info_hashes() if params.ti is not None else params.info_hashes
+    return str(hashes.get_best())
+
+
+class TorrentManager:
+    def __init__(self, settings):
+        self.settings = settings
+        self.session_manager = SessionManager(settings)
+        self.store = TorrentStore()
+        self.store.migrate_json()
+        self.file_manager = FileManager(
+            max_concurrent=self.settings.get_int("Storage", "move_concurrency", 2),
+            max_retries=self.settings.get_int("Storage", "move_retries", 3),
+        )
+        self.status_cache = StatusCache()
+        self.storage = StoragePolicy(settings)
+        self.resume_data = ResumeDataManager(self.store)
+        self.metrics = MetricsStore()
+        self.history = RateHistory(settings)
+        self.bandwidth = BandwidthScheduler(self.session_manager, self.store, self.status_cache, settings)
+        self.queue = QueueManager(self.store, self.status_cache, settings)
+        self.dispatcher = AlertDispatcher(self.session_manager.get_session())
+        self.alert_logger = AlertLogger(self.dispatcher, self.session_manager, settings)
+        self.streams = StreamManager(self, settings)
+        self.verifier = VerifyManager(self, settings)
+        self.creator = CreateManager(self)
+        self.torrents = TorrentRegistry()
+        self.watch_folder = WatchFolder(self, settings)
+        self._adding = set()  # info-hashes of new torrents waiting for their add_torrent_alert
+        self._fetching = {}   # info-hash -> time a magnet link started fetching metadata
+
+        # Startup loading state
+        self.executor = ThreadPoolExecutor(thread_name_prefix="torrent-loader")
+        self.loaded = threading.Event()
+        self._loading = set()
+        self._load_total = 0
+        self._load_done = 0
+        self._load_started = 0.0
+        self._load_lock = threading.Lock()
+        self._load_progress_callbacks = []
+        self._status_callbacks = []
+        self._removed_callbacks = []
+
+        self.dispatcher.subscribe(lt.add_torrent_alert, self._on_torrent_added)
+        self.dispatcher.subscribe(lt.state_update_alert, self._on_state_update)
+        self.dispatcher.subscribe(lt.torrent_finished_alert, self._on_torrent_finished)
+        self.dispatcher.subscribe(lt.metadata_received_alert, self._on_metadata_received)
+        self.dispatcher.subscribe(lt.storage_moved_alert, self.file_manager.on_storage_moved)
+        self.dispatcher.subscribe(lt.storage_moved_alert, self._on_storage_moved)
+        self.dispatcher.subscribe(lt.storage_moved_failed_alert, self.file_manager.on_storage_moved_failed)
+        self.dispatcher.subscribe(lt.session_stats_alert, self.metrics.on_session_stats)
+        self.dispatcher.subscribe(lt.save_resume_data_alert, self.resume_data.on_resume_data)
+        self.dispatcher.subscribe(lt.save_resume_data_failed_alert, self.resume_data.on_resume_data_failed)
+        self.dispatcher.every(RESUME_DATA_INTERVAL, self._save_modified_resume_data)
+        self.dispatcher.every(CHECKPOINT_INTERVAL, self.store.checkpoint)
+        self.dispatcher.every(BANDWIDTH_INTERVAL, self.bandwidth.tick)
+        self.dispatcher.every(QUEUE_INTERVAL, self.queue.tick)
+        self.dispatcher.every(HISTORY_INTERVAL, self.history.sample)
+        self.dispatcher.every(MOVE_RETRY_INTERVAL, self.file_manager.tick)
+
+        self.dispatcher.start()
+        self._load_metadata()
+        self.watch_folder.start()
+
+    def add_load_progress_callback(self, callback):
+        """Call ``callback(done, total)`` whenever a startup torrent finished loading."""
+        with self._load_lock:
+            self._load_progress_callbacks.append(callback)
+            callback(self._load_done, self._load_total)
+
+    def add_status_callback(self, callback):
+        """Call ``callback(torrents)`` with the status dictionaries of every batch of changed torrents."""
+        self._status_callbacks.append(callback)
+
+    def remove_status_callback(self, callback):
+        self._status_callbacks.remove(callback)
+
+    def add_removed_callback(self, callback):
+        """Call ``callback(info_hash)`` whenever a torrent left the session, however it was removed."""
+        self._removed_callbacks.append(callback)
+
+    def remove_removed_callback(self, callback):
+        self._removed_callbacks.remove(callback)
+
+    def _load_metadata(self):
+        """Start loading the stored torrents in the background."""
+        info_hashes = self.store.info_hashes()
+        self._load_started = time.perf_counter()
+        self._load_total = len(info_hashes)
+        if not info_hashes:
+            self.loaded.set()
+            return
+
+        logging.info(f"Loading {len(info_hashes)} torrents")
+        for info_hash in info_hashes:
+            future = self.executor.submit(self._read_torrent_params, info_hash)
+            future.add_done_callback(self._on_torrent_params_ready)
+
+    def _read_torrent_params(self, info_hash):
+        """Build add_torrent_params for a stored torrent, using fast-resume data where available."""
+        row = self.store.get(info_hash)
+        params = self.resume_data.params(row)
+        # Resume data records the allocation a torrent started with; the policy may have changed since
+        self.storage.apply(params, row["save_path"])
+        return params
+
+    def _on_torrent_params_ready(self, future):
+        """Queue a parsed startup torrent for adding to the session."""
+        try:
+            params = future.result()
+        except Exception as e:
+            logging.error(f"Failed to load torrent. Error: {e}")
+            self._loaded_one()
+            return
+
+        with self._load_lock:
+            self._loading.add(params_info_hash(params))
+        self.session_manager.get_session().async_add_torrent(params)
+
+    def _on_torrent_added(self, alert):
+        """Register the handle of a torrent added through async_add_torrent."""
+        params = alert.params
+        info_hash = params_info_hash(params)
+        with self._load_lock:
+            startup = info_hash in self._loading
+
+        if alert.error.value():
+            logging.error(f"Failed to add torrent: {alert.torrent_name}. Error: {alert.error.message()}")
+        else:
+            status = self.status_cache.add(alert.handle)
+            if params.ti is not None:
+                trackers = [tracker.url for tracker in params.ti.trackers()]
+            else:
+                # The alert's copy of a magnet link's params has its trackers moved into the torrent
+                trackers = [tracker["url"] for tracker in alert.handle.trackers()]
+            if status is not None and not self.torrents.add(info_hash, alert.handle, status, trackers):
+                logging.info(f"Torrent already added: {alert.torrent_name}")
+            else:
+                self.history.add(info_hash)
+                if params.ti is None:
+                    self._fetching[info_hash] = time.monotonic()
+                if not startup:
+                    # A new torrent: store it right away so a crash does not lose it
+                    self._store_new_torrent(info_hash, alert.handle, params)
+        # Only now that the handle is registered can duplicates be found in the registry
+        with self._load_lock:
+            self._loading.discard(info_hash)
+            self._adding.discard(info_hash)
+
+        if startup:
+            self._loaded_one()
+
+    def _loaded_one(self):
+        """Count a finished startup load and report progress."""
+        with self._load_lock:
+            self._load_done += 1
+            done, total = self._load_done, self._load_total
+            # Report under the lock so callbacks see progress in order
+            for callback in self._load_progress_callbacks:
+                callback(done, total)
+        if done == total:
+            self.queue.restore_positions(self.torrents)
+            self.loaded.set()
+            logging.info(f"Loaded {total} torrents in {time.perf_counter() - self._load_started:.2f}s")
+
+    def _store_new_torrent(self, info_hash, handle, params):
+        """Insert a torrent added in this run into the store, as metadata or as a magnet link."""
+        if params.ti is not None:
+            self.store.add(
+                info_hash,
+                params.ti.name(),
+                params.save_path,
+                torrent=lt.bencode(lt.create_torrent(params.ti).generate()),
+            )
+        else:
+            self.store.add(info_hash, params.name or info_hash, params.save_path, magnet=lt.make_magnet_uri(handle))
+
+    def add_torrent(self, torrent_file, save_path, seed=False):
+        """
+        Add a new torrent from a .torrent path or a torrent_info, and return
+        its info-hash, or None if the torrent is already loaded or being added.
+
+        With ``seed`` the data is already complete in save_path: the torrent
+        starts seeding from it without a check.
+        """
+        try:
+            params = lt.add_torrent_params()
+            params.ti = torrent_file if isinstance(torrent_file, lt.torrent_info) else lt.torrent_info(torrent_file)
+            return self.add_params(params, save_path, seed)
+        except Exception as e:
+            logging.error(f"Failed to add torrent: {torrent_file}. Error: {e}")
+            raise
+
+    def add_magnet(self, uri, save_path):
+        """Add a new torrent from a magnet link and return its info-hash, or None if it is already added; peers send the metadata."""
+        try:
+            params = lt.parse_magnet_uri(uri)
+            return self.add_params(params, save_path)
+        except Exception as e:
+            logging.error(f"Failed to add magnet link: {uri}. Error: {e}")
+            raise
+
+    def add_params(self, params, save_path, seed=False):
+        """
+        Add a new torrent downloading into save_path/.incomplete, or seeding from save_path.
+
+        Returns its info-hash, or None if the torrent is already loaded or
+        being added. The handle is registered when libtorrent posts the
+        add_torrent_alert.
+        """
+        info_hash = params_info_hash(params)
+        name = params.ti.name() if params.ti is not None else params.name or info_hash
+        with self._load_lock:
+            if info_hash in self.torrents or info_hash in self._adding or info_hash in self._loading:
+                logging.info(f"Skipped duplicate torrent: {name}")
+                return None
+            self._adding.add(info_hash)
+
+        if seed:
+            params.save_path = save_path
+            params.flags |= lt.torrent_flags.seed_mode
+        else:
+            incomplete_folder = os.path.join(save_path, ".incomplete")
+            os.makedirs(incomplete_folder, exist_ok=True)
+            params.save_path = incomplete_folder
+        self.storage.apply(params, save_path)
+        self.session_manager.get_session().async_add_torrent(params)
+
+        logging.info(f"Added torrent: {name}")
+        return info_hash
+
+    def pause_torrent(self, info_hash):
+        """Pause a torrent by info-hash."""
+        handle = self.get_handle(info_hash)
+        if handle is not None:
+            self.queue.pause(handle)
+            logging.info(f"Paused torrent: {self.status_cache.get(info_hash).name}")
+
+    def resume_torrent(self, info_hash):
+        """Resume a torrent by info-hash."""
+        handle = self.get_handle(info_hash)
+        if handle is not None:
+            self.queue.resume(handle)
+            logging.info(f"Resumed torrent: {self.status_cache.get(info_hash).name}")
+
+    def force_start_torrent(self, info_hash):
+        """Start a torrent now, bypassing the queue."""
+        handle = self.get_handle(info_hash)
+        if handle is not None:
+            self.queue.force_start(handle)
+            logging.info(f"Force started torrent: {self.status_cache.get(info_hash).name}")
+
+    def move_in_queue(self, info_hash, direction):
+        """Move a torrent up, down, to the top or to the bottom of the download queue."""
+        handle = self.get_handle(info_hash)
+        if handle is not None:
+            self.queue.move(handle, direction)
+
+    def is_paused(self, info_hash):
+        """Return True if the cached status of a torrent says it is paused."""
+        status = self.status_cache.get(info_hash)
+        return bool(status and status.flags & lt.torrent_flags.paused)
+
+    def get_handle(self, info_hash):
+        """Return the handle of a torrent by info-hash."""
+        return self.torrents.get(info_hash)
+
+    def remove_torrent(self, info_hash, delete_files=False):
+        """Remove a torrent from the session, optionally deleting its files."""
+        handle = self.get_handle(info_hash)
+        if handle is None:
+            return
+        status = self.status_cache.get(info_hash)
+        if status is not None:
+            save_path, name = status.save_path, status.name
+        else:
+            # Its initial status could not be read; the store still knows where it lives
+            row = self.store.get(info_hash)
+            save_path, name = (row["save_path"], row["name"]) if row is not None else ("", info_hash)
+        self.streams.stop(info_hash)
+        session = self.session_manager.get_session()
+        session.remove_torrent(handle, self.storage.remove_options(save_path, delete_files))
+        if delete_files:
+            logging.info(f"Deleted torrent and files: {name}")
+        else:
+            logging.info(f"Deleted torrent: {name}")
+        self._forget(info_hash)
+
+    def _forget(self, info_hash):
+        """Drop a torrent removed from the session from every index and from the store."""
+        self.torrents.remove(info_hash)
+        self.status_cache.remove(info_hash)
+        self.history.remove(info_hash)
+        self._fetching.pop(info_hash, None)
+        self.store.remove(info_hash)
+        for callback in self._removed_callbacks:
+            callback(info_hash)
+
+    def export_torrents(self, info_hashes):
+        """
+        Remove torrents from the session, keeping their files, and return their store rows as dictionaries.
+
+        Their resume data is saved first, so ``import_torrents`` can add them
+        to another session without checking the files. Unknown info-hashes
+        are skipped.
+        """
+        handles = {info_hash: self.get_handle(info_hash) for info_hash in info_hashes}
+        handles = {info_hash: handle for info_hash, handle in handles.items() if handle is not None}
+        self.resume_data.request(handles.values())
+        self.resume_data.wait()
+        rows = []
+        session = self.session_manager.get_session()
+        for info_hash, handle in handles.items():
+            rows.append(dict(self.store.get(info_hash)))
+            self.streams.stop(info_hash)
+            # Part files go with the torrent, whatever the part_file policy
+            session.remove_torrent(handle)
+            self._forget(info_hash)
+        logging.info(f"Exported {len(rows)} torrents")
+        return rows
+
+    def import_torrents(self, rows):
+        """Add torrents exported from another session and return the info-hashes of those that were not loaded yet."""
+        imported = []
+        for row in rows:
+            info_hash = row["info_hash"]
+            with self._load_lock:
+                if info_hash in self.torrents or info_hash in self._adding or info_hash in self._loading:
+                    logging.info(f"Skipped duplicate torrent: {row['name']}")
+                    continue
+                self._adding.add(info_hash)
+
+            self.store.add(
+                info_hash, row["name"], row["save_path"], torrent=row["torrent"], paused=row["paused"], magnet=row["magnet"]
+            )
+            self.store.update(info_hash, auto_managed=row["auto_managed"])
+            if row["resume"] is not None:
+                self.store.save_resume(info_hash, row["resume"])
+            self.bandwidth.set_torrent_bandwidth(
+                info_hash, row["bandwidth_class"], row["download_limit"], row["upload_limit"]
+            )
+            self.session_manager.get_session().async_add_torrent(self._read_torrent_params(info_hash))
+            imported.append(info_hash)
+        logging.info(f"Imported {len(imported)} torrents")
+        return imported
+
+    def reload_torrent(self, info_hash, have_pieces, flags):
+        """
+        Re-add a torrent with new downloaded pieces and flags.
+
+        The pieces are written to the store as resume data, so libtorrent
+        takes them without checking the files.
+        """
+        handle = self.get_handle(info_hash)
+        if handle is None:
+            return
+        params = self._read_torrent_params(info_hash)
+        params.save_path = self.status_cache.get(info_hash).save_path
+        params.have_pieces = have_pieces
+        params.unfinished_pieces = {}
+        mask = lt.torrent_flags.paused | lt.torrent_flags.auto_managed
+        params.flags = (params.flags & ~mask) | (flags & mask)
+        self.store.save_resume(info_hash, lt.write_resume_data_buf(params))
+
+        with self._load_lock:
+            self.torrents.remove(info_hash)
+            self.status_cache.remove(info_hash)
+            self._adding.add(info_hash)
+        session = self.session_manager.get_session()
+        session.remove_torrent(handle)
+        session.async_add_torrent(params)
+        logging.info(f"Reloaded torrent with {sum(have_pieces)} of {len(have_pieces)} pieces: {params.ti.name()}")
+
+    def get_torrents(self, info_hashes=None):
+        """Get the cached statuses of all torrents, or of the given info-hashes."""
+        with self.metrics.timed("get_torrents"):
+            if info_hashes is None:
+                return [self.status_to_dict(status) for status in self.status_cache.all()]
+            statuses = (self.status_cache.get(info_hash) for info_hash in info_hashes)
+            return [self.status_to_dict(status) for status in statuses if status is not None]
+
+    def _on_state_update(self, alert):
+        """Store a batch of changed statuses, re-index the torrents whose state, path or name changed and record their rates."""
+        statuses = self.status_cache.apply(alert.status)
+        self.torrents.update(statuses)
+        self.history.update(statuses)
+        if self._status_callbacks and statuses:
+            torrents = [self.status_to_dict(status) for status in statuses]
+            for callback in self._status_callbacks:
+                callback(torrents)
+
+    def stop(self):
+        """Stop the torrent manager, saving resume data for every modified torrent."""
+        self.watch_folder.stop()
+        self.streams.close()
+        self.verifier.close()
+        self.loaded.wait(timeout=30)
+        self.executor.shutdown()
+        self.session_manager.pause()
+        # Everything else is already stored; only unsaved progress is left
+        self.resume_data.request([handle for handle in self.torrents if handle.need_save_resume_data()])
+        self.resume_data.wait()
+        self.dispatcher.stop()
+        with self.metrics.timed("metadata_save"):
+            self.store.close()
+        logging.info("Torrent manager stopped")
+
+    def _save_modified_resume_data(self):
+        """Request resume data for the torrents that changed since their last save."""
+        handles = [status.handle for status in self.status_cache.all() if status.need_save_resume]
+        if handles:
+            self.resume_data.request(handles)
+
+    def _on_torrent_finished(self, alert):
+        """Move a finished download out of its .incomplete folder."""
+        status = self.status_cache.get(info_hash_of(alert.handle))
+        if status and os.path.basename(os.path.normpath(status.save_path)) == ".incomplete":
+            self.file_manager.move_completed_torrent(alert.handle, status.save_path, status.name)
+
+    def _on_metadata_received(self, alert):
+        """Store the metadata a magnet link fetched from peers."""
+        info_hash = info_hash_of(alert.handle)
+        info = alert.handle.torrent_file()
+        if info is None:
+            return
+        self.store.update(info_hash, name=info.name(), torrent=lt.bencode(lt.create_torrent(info).generate()))
+        self.torrents.set_trackers(info_hash, [tracker["url"] for tracker in alert.handle.trackers()])
+        started = self._fetching.pop(info_hash, None)
+        if started is not None:
+            elapsed = time.monotonic() - started
+            self.metrics.observe("metadata_fetch", elapsed)
+            logging.info(f"Received metadata for {info.name()} in {elapsed:.2f}s")
+
+    def metadata_pending(self):
+        """Return {info_hash: seconds waited} for the magnet links still fetching metadata."""
+        now = time.monotonic()
+        return {info_hash: now - started for info_hash, started in list(self._fetching.items())}
+
+    def _on_storage_moved(self, alert):
+        """Record the new save path of a moved torrent."""
+        self.store.update(info_hash_of(alert.handle), save_path=alert.storage_path())
+
+    @classmethod
+    def status_to_dict(cls, status):
+        """Convert a libtorrent status into the dictionary used by the UI."""
+        return {
+            "info_hash": info_hash_of(status),
+            "name": status.name,
+            "progress": status.progress,
+            "download_rate": status.download_rate,
+            "upload_rate": status.upload_rate,
+            "peers": status.num_peers,
+            "state": cls._get_state(status.state),
+            "paused": bool(status.flags & lt.torrent_flags.paused),
+            # Paused by the queue rather than by the user
+            "queued": bool(status.flags & lt.torrent_flags.paused and status.flags & lt.torrent_flags.auto_managed),
+            "queue_position": status.queue_position,
+            "save_path": status.save_path,
+        }
+
+    @staticmethod
+    def _get_state(state_code):
+        """Map libtorrent state codes to user-friendly strings."""
+        return STATE_NAMES.get(state_code, "Unknown")
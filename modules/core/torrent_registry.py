@@ -0,0 +1,182 @@
+import os
+import re
+import bisect
+import threading
+from urllib.parse import urlsplit
+from .status_cache import info_hash_of
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def name_words(name):
+    """Split a torrent name into the lowercase words the search index holds."""
+    return set(_WORD.findall(name.lower()))
+
+
+def tracker_host(url):
+    """Return the host name of a tracker URL, or the URL itself if it has none."""
+    return urlsplit(url).hostname or url
+
+
+class TorrentRegistry:
+    """
+    Torrent handles keyed by info-hash, with secondary indexes.
+
+    Lookup, insertion and removal by info-hash are O(1). ``select``
+    answers filters from indexes by state, save path, tracker host and
+    name word prefix instead of scanning every torrent: all four are
+    dictionaries of info-hash sets. Word prefixes are found with
+    ``bisect`` in a sorted list of the distinct words, rebuilt on the
+    first search after a word was added or dropped. ``update`` re-indexes
+    torrents from a batch of statuses, so only the torrents that changed
+    are touched. Iterating yields the handles in the order they were added.
+    """
+
+    def __init__(self):
+        self._handles = {}     # info_hash -> handle, in insertion order
+        self._keys = {}        # info_hash -> (state, save_path, words)
+        self._trackers = {}    # info_hash -> tracker hosts
+        self._order = {}       # info_hash -> insertion sequence
+        self._sequence = 0
+        self._by_state = {}
+        self._by_save_path = {}
+        self._by_tracker = {}
+        self._by_word = {}
+        self._word_keys = []   # sorted words of _by_word, or None until the next search rebuilds it
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __contains__(self, info_hash):
+        return info_hash in self._handles
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._handles.values()))
+
+    def add(self, info_hash, handle, status, trackers=()):
+        """Register a torrent; return False if it is already registered."""
+        with self._lock:
+            if info_hash in self._handles:
+                return False
+            self._handles[info_hash] = handle
+            self._order[info_hash] = self._sequence
+            self._sequence += 1
+            self._index(info_hash, status)
+            self._set_trackers(info_hash, trackers)
+            return True
+
+    def remove(self, info_hash):
+        """Forget a torrent and return its handle, or None."""
+        with self._lock:
+            handle = self._handles.pop(info_hash, None)
+            if handle is None:
+                return None
+            self._unindex(info_hash)
+            self._set_trackers(info_hash, ())
+            del self._order[info_hash]
+            return handle
+
+    def get(self, info_hash):
+        """Return the handle of a torrent, or None."""
+        return self._handles.get(info_hash)
+
+    def update(self, statuses):
+        """Re-index the registered torrents of a status batch whose state, save path or name changed."""
+        with self._lock:
+            for status in statuses:
+                info_hash = info_hash_of(status)
+                if info_hash not in self._handles:
+                    continue  # a late update for a removed torrent
+                if self._keys[info_hash] == (status.state, status.save_path, name_words(status.name)):
+                    continue
+                self._unindex(info_hash)
+                self._index(info_hash, status)
+
+    def set_trackers(self, info_hash, trackers):
+        """Replace the tracker URLs indexed for a torrent."""
+        with self._lock:
+            if info_hash in self._handles:
+                self._set_trackers(info_hash, trackers)
+
+    def select(self, info_hashes=None, state=None, save_path=None, tracker=None, search=None):
+        """
+        Return the info-hashes matching every given filter, in insertion order.
+
+        ``state`` is a libtorrent state, ``save_path`` a folder the torrent is saved in or under,
+        ``tracker`` a tracker host and ``search`` words that must each
+        start a word of the name. None leaves a filter out.
+        """
+        with self._lock:
+            candidates = []
+            if info_hashes is not None:
+                candidates.append({info_hash for info_hash in info_hashes if info_hash in self._handles})
+            if state is not None:
+                candidates.append(self._by_state.get(state, set()))
+            if save_path is not None:
+                # Match whole folders: /data selects /data and /data/films, not /data2
+                folder = save_path.rstrip(os.sep)
+                candidates.append(set().union(*(
+                    hashes for path, hashes in self._by_save_path.items()
+                    if path.rstrip(os.sep) == folder or path.startswith(folder + os.sep)
+                )))
+            if tracker is not None:
+                candidates.append(self._by_tracker.get(tracker.lower(), set()))
+            if search is not None:
+                candidates.extend(self._word_prefix(word) for word in name_words(search))
+            if not candidates:
+                return list(self._handles)
+            # Intersect from the smallest set so the work is bounded by the narrowest filter
+            candidates.sort(key=len)
+            selected = candidates[0].intersection(*candidates[1:])
+            return sorted(selected, key=self._order.__getitem__)
+
+    def _word_prefix(self, prefix):
+        """Return the torrents with a name word starting with ``prefix``."""
+        if self._word_keys is None:
+            self._word_keys = sorted(self._by_word)
+        found = set()
+        position = bisect.bisect_left(self._word_keys, prefix)
+        while position < len(self._word_keys) and self._word_keys[position].startswith(prefix):
+            found |= self._by_word[self._word_keys[position]]
+            position += 1
+        return found
+
+    def _index(self, info_hash, status):
+        words = name_words(status.name)
+        self._keys[info_hash] = (status.state, status.save_path, words)
+        self._by_state.setdefault(status.state, set()).add(info_hash)
+        self._by_save_path.setdefault(status.save_path, set()).add(info_hash)
+        for word in words:
+            if word not in self._by_word:
+                self._by_word[word] = set()
+                self._word_keys = None
+            self._by_word[word].add(info_hash)
+
+    def _unindex(self, info_hash):
+        state, save_path, words = self._keys.pop(info_hash)
+        _discard(self._by_state, state, info_hash)
+        _discard(self._by_save_path, save_path, info_hash)
+        for word in words:
+            _discard(self._by_word, word, info_hash)
+            if word not in self._by_word:
+                self._word_keys = None
+
+    def _set_trackers(self, info_hash, trackers):
+        for host in self._trackers.pop(info_hash, ()):
+            _discard(self._by_tracker, host, info_hash)
+        hosts = {tracker_host(url).lower() for url in trackers}
+        if hosts:
+            self._trackers[info_hash] = hosts
+        for host in hosts:
+            self._by_tracker.setdefault(host, set()).add(info_hash)
+
+
+def _discard(index, key, info_hash):
+    """Remove an info-hash from an index entry, dropping the entry once empty."""
+    hashes = index.get(key)
+    if hashes is not None:
+        hashes.discard(info_hash)
+        if not hashes:
+            del index[key]
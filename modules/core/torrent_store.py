@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import libtorrent as lt
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS torrents (
+    info_hash  TEXT PRIMARY KEY,
+    name       TEXT NOT NULL,
+    torrent    BLOB,                       -- bencoded .torrent, NULL until metadata is known
+    save_path  TEXT NOT NULL,
+    resume     BLOB,                       -- libtorrent fast-resume data
+    paused     INTEGER NOT NULL DEFAULT 0,
+    added_at   REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+# Schema changes, applied in order; PRAGMA user_version counts the applied ones
+MIGRATIONS = (
+    "ALTER TABLE torrents ADD COLUMN bandwidth_class TEXT",
+    "ALTER TABLE torrents ADD COLUMN download_limit INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE torrents ADD COLUMN upload_limit INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE torrents ADD COLUMN queue_position INTEGER NOT NULL DEFAULT -1",
+    "ALTER TABLE torrents ADD COLUMN auto_managed INTEGER NOT NULL DEFAULT 1",
+    "ALTER TABLE torrents ADD COLUMN magnet TEXT",  # link of a torrent added without metadata
+)
+
+# Columns that ``update`` may change
+UPDATABLE = (
+    "name", "torrent", "save_path", "paused", "auto_managed",
+    "bandwidth_class", "download_limit", "upload_limit",
+)
+
+
+class TorrentStore:
+    """
+    SQLite database holding one row per torrent, keyed by info-hash.
+
+    Every change is written when it happens, in its own transaction, so a
+    crash loses at most the progress made since the last resume data save.
+    The database runs in WAL mode: commits append to the write-ahead log
+    without an fsync each, and ``checkpoint`` folds the log back into the
+    database in the background.
+    """
+
+    def __init__(self, path="torrents.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(SCHEMA)
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for statement in MIGRATIONS[version:]:
+                self._conn.execute(statement)
+            self._conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+
+    def add(self, info_hash, name, save_path, torrent=None, paused=False, magnet=None):
+        """Insert a torrent, or refresh its name, path and metadata if it is already stored."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO torrents (info_hash, name, torrent, magnet, save_path, paused, added_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(info_hash) DO UPDATE SET name = excluded.name, save_path = excluded.save_path,"
+                " torrent = COALESCE(excluded.torrent, torrent), magnet = COALESCE(excluded.magnet, magnet),"
+                " updated_at = excluded.updated_at",
+                (info_hash, name, torrent, magnet, save_path, int(paused), now, now),
+            )
+
+    def update(self, info_hash, **fields):
+        """Change some columns of a stored torrent."""
+        unknown = set(fields) - set(UPDATABLE)
+        if unknown:
+            raise ValueError(f"Cannot update {', '.join(sorted(unknown))}")
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE torrents SET {assignments}, updated_at = ? WHERE info_hash = ?",
+                (*fields.values(), time.time(), info_hash),
+            )
+
+    def save_resume(self, info_hash, resume):
+        """Store the fast-resume data of a torrent."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE torrents SET resume = ?, updated_at = ? WHERE info_hash = ?",
+                (resume, time.time(), info_hash),
+            )
+
+    def remove(self, info_hash):
+        """Delete a torrent's row."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM torrents WHERE info_hash = ?", (info_hash,))
+
+    def get(self, info_hash):
+        """Return the row of a torrent, or None."""
+        with self._lock:
+            return self._conn.execute("SELECT * FROM torrents WHERE info_hash = ?", (info_hash,)).fetchone()
+
+    def info_hashes(self):
+        """Return the info-hashes of every stored torrent, oldest first."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT info_hash FROM torrents ORDER BY added_at, rowid")]
+
+    def bandwidth(self):
+        """Return {info_hash: (bandwidth_class, download_limit, upload_limit)} for every stored torrent."""
+        with self._lock:
+            return {
+                row[0]: (row[1], row[2], row[3])
+                for row in self._conn.execute("SELECT info_hash, bandwidth_class, download_limit, upload_limit FROM torrents")
+            }
+
+    def queue_positions(self):
+        """Return {info_hash: queue_position} for every stored torrent."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT info_hash, queue_position FROM torrents"))
+
+    def set_queue_positions(self, positions):
+        """Store many queue positions in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE torrents SET queue_position = ? WHERE info_hash = ?",
+                [(position, info_hash) for info_hash, position in positions.items()],
+            )
+
+    def checkpoint(self):
+        """Copy committed WAL pages into the database without blocking writers."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self):
+        """Checkpoint and truncate the WAL, then close the database."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+
+    def migrate_json(self, metadata_file="torrent_metadata.json", resume_dir="resume"):
+        """
+        Import torrents saved by the old JSON metadata file and resume folder.
+
+        Runs once: the JSON file is renamed and the imported resume files are
+        deleted after the import has been committed.
+        """
+        if not os.path.exists(metadata_file):
+            return 0
+        try:
+            with open(metadata_file, "r") as f:
+                entries = json.load(f).get("torrents", [])
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to read {metadata_file} for migration. Error: {e}")
+            return 0
+
+        rows = []
+        resume_files = []
+        now = time.time()
+        for entry in entries:
+            try:
+                with open(entry["torrent_file"], "rb") as f:
+                    torrent = f.read()
+                info = lt.torrent_info(lt.bdecode(torrent))
+            except Exception as e:
+                logging.warning(f"Skipping {entry.get('torrent_file')} during migration. Error: {e}")
+                continue
+            info_hash = str(info.info_hashes().get_best())
+            resume = None
+            resume_file = os.path.join(resume_dir, f"{info_hash}.fastresume")
+            if os.path.exists(resume_file):
+                with open(resume_file, "rb") as f:
+                    resume = f.read()
+                resume_files.append(resume_file)
+            rows.append((info_hash, info.name(), torrent, entry["save_path"], resume, now, now))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO torrents (info_hash, name, torrent, save_path, resume, added_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+        os.replace(metadata_file, f"{metadata_file}.migrated")
+        for resume_file in resume_files:
+            os.remove(resume_file)
+        try:
+            os.rmdir(resume_dir)
+        except OSError:
+            pass
+        logging.info(f"Migrated {len(rows)} of {len(entries)} torrents from {metadata_file}")
+        return len(rows)
@@ -0,0 +1,134 @@
+"""
+Watch-folder ingestion of .torrent and .magnet files.
+
+Set ``watch_folder`` in the [Downloads] section of settings.ini to a
+directory; every ``watch_interval`` seconds the files dropped into it
+are added to the session, downloading into ``download_path``::
+
+    [Downloads]
+    download_path = /data/downloads
+    watch_folder = /data/watch
+    watch_interval = 2
+
+A .magnet file holds one magnet link per line. Ingested files are renamed
+to ``<name>.added``, files that fail to parse to ``<name>.invalid``.
+"""
+import os
+import time
+import logging
+import threading
+import libtorrent as lt
+from concurrent.futures import ThreadPoolExecutor
+
+EXTENSIONS = (".torrent", ".magnet")
+SETTLE_TIME = 1.0  # seconds a file must be left unmodified before it is read
+PARSE_WORKERS = 4
+
+
+def parse_file(path):
+    """Return the add_torrent_params described by a .torrent or .magnet file."""
+    if path.endswith(".magnet"):
+        with open(path, "r", encoding="utf-8") as f:
+            links = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        if not links:
+            raise ValueError("no magnet links in file")
+        return [lt.parse_magnet_uri(link) for link in links]
+
+    params = lt.add_torrent_params()
+    params.ti = lt.torrent_info(path)
+    return [params]
+
+
+class WatchFolder:
+    """
+    Poll a folder and add the torrents dropped into it.
+
+    Each scan reads the settled files of the folder in a pool of parser
+    threads and hands the results to ``TorrentManager.add_params``, which
+    skips torrents that are already loaded or being added and queues the
+    rest with ``async_add_torrent``. Nothing waits for libtorrent, so a
+    batch of a thousand files is done in about the time it takes to read
+    them. The folder is read from settings on every scan, so changing it
+    takes effect without a restart.
+    """
+
+    def __init__(self, torrentmanager, settings):
+        self.torrentmanager = torrentmanager
+        self.settings = settings
+        self._executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="watch-parser")
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start polling the watch folder in the background."""
+        self._thread = threading.Thread(target=self._run, name="watch-folder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling and wait for the current scan to finish."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown()
+
+    def _run(self):
+        while not self._stopping.wait(max(self.settings.get_int("Downloads", "watch_interval", 2), 1)):
+            folder = self.settings.get("Downloads", "watch_folder")
+            # Scanning before the stored torrents are loaded would re-add them
+            if not folder or not self.torrentmanager.loaded.is_set():
+                continue
+            try:
+                self.scan(folder)
+            except Exception as e:
+                logging.error(f"Failed to scan watch folder {folder}. Error: {e}")
+
+    def pending_files(self, folder):
+        """Return the .torrent and .magnet files of a folder that are no longer being written."""
+        settled = time.time() - SETTLE_TIME
+        with os.scandir(folder) as entries:
+            return sorted(
+                entry.path for entry in entries
+                if entry.name.endswith(EXTENSIONS) and entry.is_file() and entry.stat().st_mtime < settled
+            )
+
+    def scan(self, folder):
+        """Add the torrents of every settled file in a folder and return the counts of each outcome."""
+        paths = self.pending_files(folder)
+        if not paths:
+            return {}
+        save_path = self.settings.get("Downloads", "download_path")
+        if not save_path:
+            logging.warning(f"Not adding {len(paths)} files from the watch folder: download path not set!")
+            return {}
+
+        started = time.perf_counter()
+        counts = {"added": 0, "duplicate": 0, "invalid": 0}
+        futures = [(path, self._executor.submit(parse_file, path)) for path in paths]
+        for path, future in futures:
+            try:
+                torrents = future.result()
+            except Exception as e:
+                logging.warning(f"Invalid file in watch folder: {path}. Error: {e}")
+                counts["invalid"] += 1
+                _rename(path, ".invalid")
+                continue
+            for params in torrents:
+                if self.torrentmanager.add_params(params, save_path) is None:
+                    counts["duplicate"] += 1
+                else:
+                    counts["added"] += 1
+            _rename(path, ".added")
+
+        logging.info(
+            f"Watch folder: {counts['added']} added, {counts['duplicate']} duplicates, "
+            f"{counts['invalid']} invalid from {len(paths)} files in {time.perf_counter() - started:.2f}s"
+        )
+        return counts
+
+
+def _rename(path, suffix):
+    """Mark a processed file so the next scan skips it."""
+    try:
+        os.replace(path, path + suffix)
+    except OSError as e:
+        logging.error(f"Failed to rename {path}. Error: {e}")
@@ -0,0 +1,64 @@
+"""
+Create a torrent from a file or directory.
+
+    python create.py /data/releases/build-1.2 --tracker http://tracker.example/announce
+    python create.py dataset.tar --version hybrid --piece-size 4096 --private -o dataset.torrent
+
+Prints a JSON summary of the torrent; hashing progress goes to stderr. To
+seed the result right away, create it from the GUI or the control API
+instead, where it is added to the running session without a check.
+"""
+import sys
+import json
+import time
+import argparse
+import libtorrent as lt
+from modules.core.creator import VERSIONS, create, default_output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create a torrent from a file or directory.")
+    parser.add_argument("path", help="file or directory to share")
+    parser.add_argument("-o", "--output", help="where to write the .torrent, by default next to the path")
+    parser.add_argument("--version", choices=VERSIONS, default="v1", help="torrent format; v1 hashes on every CPU")
+    parser.add_argument("--piece-size", type=int, default=0, help="piece size in KiB, by default picked from the size")
+    parser.add_argument("-t", "--tracker", action="append", default=[], help="tracker URL, one tier each, repeatable")
+    parser.add_argument("--web-seed", action="append", default=[], help="web seed URL, repeatable")
+    parser.add_argument("--comment", default="")
+    parser.add_argument("--private", action="store_true", help="set the private flag")
+    parser.add_argument("--workers", type=int, default=0, help="hashing processes for v1, by default one per CPU")
+    args = parser.parse_args()
+
+    def progress(done, total):
+        print(f"\rHashing: {done}/{total} pieces", end="", file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    try:
+        data = create(
+            args.path, version=args.version, piece_size=args.piece_size * 1024,
+            trackers=args.tracker, web_seeds=args.web_seed, comment=args.comment,
+            private=args.private, workers=args.workers, progress=progress,
+        )
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(file=sys.stderr)
+    output = args.output or default_output(args.path)
+    with open(output, "wb") as f:
+        f.write(data)
+
+    info = lt.torrent_info(lt.bdecode(data))
+    print(json.dumps({
+        "output": output,
+        "name": info.name(),
+        "info_hash": str(info.info_hashes().get_best()),
+        "version": args.version,
+        "files": info.num_files(),
+        "bytes": info.total_size(),
+        "piece_size": info.piece_length(),
+        "pieces": info.num_pieces(),
+        "seconds": time.perf_counter() - started,
+    }, indent=4))
+
+
+if __name__ == "__main__":
+    main()
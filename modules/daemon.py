@@ -0,0 +1,112 @@
+"""
+Headless NanoTorrent engine.
+
+Runs the libtorrent session and the alert loop without a display. Nothing
+reachable from this module imports PyQt6.
+
+    python -m modules.daemon [--settings settings.ini] [--shards N] [--check-imports]
+
+With shards (or ``count`` in the [Shards] section) the torrents are
+spread over that many worker processes, each with its own session.
+"""
+import time
+
+_import_started = time.perf_counter()
+
+import sys
+import signal
+import logging
+import argparse
+import threading
+import libtorrent as lt
+from modules.utils.logger import setup_logging
+from modules.utils.settings_handler import SettingsHandler
+from modules.core.torrent_manager import TorrentManager
+from modules.core.shards import ShardedTorrentManager
+from modules.api.server import ApiServer
+
+IMPORT_TIME = time.perf_counter() - _import_started
+
+
+def qt_loaded():
+    """Return True if any Qt binding has been imported into this process."""
+    return any(name.split(".")[0] in ("PyQt6", "PyQt5", "PySide6") for name in sys.modules)
+
+
+def run_daemon(settings_file="settings.ini", api_overrides=None, shards=None):
+    """Run the torrent engine until SIGTERM or SIGINT, then save and exit."""
+    logging.info(f"Engine imported in {IMPORT_TIME * 1000:.1f} ms, Qt loaded: {qt_loaded()}")
+
+    stopping = threading.Event()
+
+    def request_stop(signum, frame):
+        logging.info(f"Received {signal.Signals(signum).name}, shutting down")
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    settings = SettingsHandler(settings_file)
+    setup_logging(settings)
+    shards = settings.get_int("Shards", "count", 0) if shards is None else shards
+    if shards > 0:
+        # Each shard logs its own finished torrents
+        torrentmanager = ShardedTorrentManager(settings, shards)
+    else:
+        torrentmanager = TorrentManager(settings=settings)
+        torrentmanager.dispatcher.subscribe(
+            lt.torrent_finished_alert,
+            lambda alert: logging.info(f"Torrent finished: {alert.torrent_name}"),
+        )
+    settings.watch()
+    api = ApiServer.from_settings(torrentmanager, settings, api_overrides)
+    if api:
+        api.start()
+    logging.info("Daemon started")
+
+    # Wake up periodically so signal handlers run promptly
+    while not stopping.wait(1.0):
+        pass
+
+    if api:
+        api.stop()
+    torrentmanager.stop()
+    settings.close()
+    logging.info("Daemon stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the NanoTorrent engine without a GUI.")
+    parser.add_argument("--settings", default="settings.ini", help="path to the settings file")
+    parser.add_argument(
+        "--check-imports",
+        action="store_true",
+        help="print the engine import time, exit non-zero if Qt was imported",
+    )
+    parser.add_argument("--shards", type=int, help="worker processes to spread the torrents over; 0 runs one session")
+    parser.add_argument("--api", action="store_true", help="enable the control API")
+    parser.add_argument("--api-host", help="address to bind the control API to")
+    parser.add_argument("--api-port", help="port to bind the control API to")
+    parser.add_argument("--api-socket", help="Unix socket to bind the control API to")
+    args = parser.parse_args()
+
+    if args.check_imports:
+        print(f"import_time_ms={IMPORT_TIME * 1000:.1f} qt_loaded={qt_loaded()}")
+        sys.exit(1 if qt_loaded() else 0)
+
+    setup_logging()
+    api_overrides = {
+        option: value
+        for option, value in (
+            ("enabled", "true" if args.api else None),
+            ("host", args.api_host),
+            ("port", args.api_port),
+            ("unix_socket", args.api_socket),
+        )
+        if value is not None
+    }
+    run_daemon(args.settings, api_overrides, args.shards)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,22 @@
 import sys
+import time
 import logging
 import libtorrent as lt
-from PyQt6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QMenu
-from PyQt6.QtCore import QTimer, Qt, QPoint
-from modules.ui.table_manager import setup_table, update_table
+from PyQt6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QMenu, QProgressBar, QLabel, QInputDialog
+from PyQt6.QtCore import Qt, QPoint, QTimer, QUrl
+from PyQt6.QtGui import QDesktopServices
+from modules.ui.table_manager import setup_table, update_table, info_hash_at, format_rate
 from modules.ui.menu_manager import setup_menu
-from modules.torrent_manager import TorrentManager
+from modules.ui.alert_bridge import AlertBridge
+from modules.core.torrent_manager import TorrentManager
+from modules.api.server import ApiServer
 from modules.settings_window import SettingsWindow
+from modules.ui.metrics_panel import MetricsPanel
+from modules.ui.create_dialog import CreateTorrentDialog
+from modules.ui.detail_panel import DetailPanel
+from modules.ui.history_panel import HistoryPanel
 from modules.utils.settings_handler import SettingsHandler
+from modules.utils.logger import setup_logging
 
 
 class TorrentClient(QMainWindow):
@@ -23,39 +32,93 @@ class TorrentClient(QMainWindow):
         self.speed_unit = "kB/s"
         # Settings Handler
         self.settings = SettingsHandler("settings.ini")
+        setup_logging(self.settings)
         self.global_download_path = self.settings.get("Downloads", "download_path")
         logging.info(f"Loaded download path: {self.global_download_path}")
 
         # Torrent Manager
         self.torrentmanager = TorrentManager(settings=self.settings)
         logging.info(f"TorrentManager started with settings")
+        # Apply hand edits of settings.ini without a restart
+        self.settings.watch()
+
+        # Control API
+        self.api = ApiServer.from_settings(self.torrentmanager, self.settings)
+        if self.api:
+            self.api.start()
 
         # Table Setup
-        self.table = setup_table(self)
+        self.table, self.model = setup_table(self)
         self.setCentralWidget(self.table)
+        self.table.selectionModel().currentRowChanged.connect(self.on_current_row_changed)
+
+        # Detail panel of the selected torrent, hidden until asked for
+        self.detail_panel = DetailPanel(self, torrentmanager=self.torrentmanager)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.detail_panel)
+        self.detail_panel.hide()
 
         # Menu Setup
         setup_menu(self)
 
-        # Timer for updating the UI
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_table)
-        self.timer.start(1000)  # Update the UI every 1 second
+        # Startup load progress
+        self.load_progress = QProgressBar(self)
+        self.load_progress.setFormat("Loading torrents: %v/%m")
+        self.load_progress.setMaximumWidth(250)
+        self.statusBar().addPermanentWidget(self.load_progress)
+
+        # Active bandwidth plan
+        self.bandwidth_plan = QLabel(self)
+        self.statusBar().addPermanentWidget(self.bandwidth_plan)
+
+        # Alert Bridge: the UI updates only in response to libtorrent events
+        self.alerts = AlertBridge(self.torrentmanager, self)
+        self.alerts.load_progress.connect(self.on_load_progress)
+        self.alerts.torrents_updated.connect(self.update_table)
+        self.alerts.torrent_removed.connect(self.on_torrent_removed)
+        self.alerts.torrent_finished.connect(self.on_torrent_finished)
+        self.alerts.metadata_received.connect(self.on_metadata_received)
+        self.alerts.torrent_error.connect(self.on_torrent_error)
+        self.alerts.storage_move.connect(self.on_storage_move)
+        self.alerts.bandwidth_plan.connect(self.on_bandwidth_plan)
+        self.torrentmanager.add_load_progress_callback(self.alerts.load_progress.emit)
+        self.torrentmanager.file_manager.add_progress_callback(self.alerts.storage_move.emit)
+        self.torrentmanager.bandwidth.add_plan_callback(self.alerts.bandwidth_plan.emit)
 
 
     def closeEvent(self, event):
         """Handle application close."""
         logging.info("Application is closing.")
+        if self.api:
+            self.api.stop()
         self.torrentmanager.stop()  # Save torrents and clean up
+        self.settings.close()
         event.accept()  # Allow the application to close
 
 
     def add_torrent(self):
-        """Add a new torrent to the session."""
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open Torrent File", "", "Torrent Files (*.torrent)")
-        if not file_path:
-            return
+        """Add new torrents to the session."""
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Open Torrent Files", "", "Torrent Files (*.torrent)")
+        if file_paths:
+            self._add_each(file_paths, self.torrentmanager.add_torrent)
+
+
+    def add_magnet(self):
+        """Add torrents from magnet links, one per line."""
+        text, ok = QInputDialog.getMultiLineText(self, "Add Magnet Links", "Magnet links, one per line:")
+        links = [line.strip() for line in text.splitlines() if line.strip()]
+        if ok and links:
+            self._add_each(links, self.torrentmanager.add_magnet)
+
 
+    def create_torrent(self):
+        """Open the dialog that creates a torrent from a file or folder."""
+        self.create_dialog = CreateTorrentDialog(self, torrentmanager=self.torrentmanager)
+        self.create_dialog.accepted.connect(self.update_table)
+        self.create_dialog.show()
+
+
+    def _add_each(self, sources, add):
+        """Add every source with ``add(source, save_path)`` and report the ones that failed."""
         # Use global download path if available
         save_path = self.global_download_path or ""
 
@@ -64,18 +127,66 @@ class TorrentClient(QMainWindow):
             logging.warning(f"Unable to add torrent: Download path not set!")
             return
 
-        try:
-            self.torrentmanager.add_torrent(file_path, save_path)
-            self.update_table()  # Ensure immediate UI update after adding torrent
-        except Exception as e:
-            logging.error(f"Error happened during torrent adding: {e}")
-            QMessageBox.critical(self, "Error", f"Failed to add torrent:\n{e}")
+        failed = []
+        for source in sources:
+            try:
+                add(source, save_path)
+            except Exception as e:
+                logging.error(f"Error happened during torrent adding: {e}")
+                failed.append(f"{source}: {e}")
+        self.update_table()  # Ensure immediate UI update after adding torrents
+        if failed:
+            QMessageBox.critical(self, "Error", "Failed to add torrent:\n" + "\n".join(failed))
+
+
+    def update_table(self, changed=None):
+        """Refresh the table with changed torrents, or with all of them."""
+        torrents = self.torrentmanager.get_torrents() if changed is None else changed
+        with self.torrentmanager.metrics.timed("update_table"):
+            update_table(self.model, torrents)
+
+
+    def on_load_progress(self, done: int, total: int):
+        """Show how many saved torrents have been loaded at startup."""
+        self.load_progress.setMaximum(total)
+        self.load_progress.setValue(done)
+        self.load_progress.setVisible(done < total)
+
+
+    def on_torrent_removed(self, info_hash: str):
+        """Drop the row of a torrent that left the session."""
+        self.model.remove_torrent(info_hash)
+        if self.detail_panel.info_hash == info_hash:
+            self.detail_panel.set_torrent(None)
+
+
+    def on_torrent_finished(self, info_hash: str, name: str):
+        """Report a finished download in the status bar."""
+        self.statusBar().showMessage(f"Finished: {name}", 5000)
+
+
+    def on_metadata_received(self, info_hash: str, name: str):
+        """Report that a magnet link has fetched its metadata."""
+        self.statusBar().showMessage(f"Metadata received: {name}", 5000)
+
+
+    def on_storage_move(self, info_hash: str, event: str, active: int, queued: int):
+        """Report the progress of moving finished torrents in the status bar."""
+        status = self.torrentmanager.status_cache.get(info_hash)
+        name = status.name if status else info_hash
+        self.statusBar().showMessage(f"{name}: {event} ({active} moving, {queued} queued)", 5000)
 
 
-    def update_table(self):
-        """Refresh the table with torrent data."""
-        torrents = self.torrentmanager.get_torrents()
-        update_table(self.table, torrents)
+    def on_bandwidth_plan(self, name: str, download_limit: int, upload_limit: int):
+        """Show the active bandwidth plan in the status bar."""
+        download = format_rate(download_limit) if download_limit else "unlimited"
+        upload = format_rate(upload_limit) if upload_limit else "unlimited"
+        self.bandwidth_plan.setText(f"Plan: {name} (down {download}, up {upload})")
+
+
+    def on_torrent_error(self, info_hash: str, message: str):
+        """Report a torrent, tracker or peer error in the status bar."""
+        self.statusBar().showMessage(message, 5000)
 
 
     def open_settings(self):
@@ -85,6 +196,21 @@ class TorrentClient(QMainWindow):
         self.settings_window.accepted.connect(self.reload_settings)
 
 
+    def open_metrics(self):
+        """Open the metrics debug panel."""
+        if getattr(self, "metrics_panel", None) is None:
+            self.metrics_panel = MetricsPanel(self, metrics=self.torrentmanager.metrics)
+            self.alerts.session_stats.connect(self.metrics_panel.refresh)
+        self.metrics_panel.show()
+
+
+    def open_history(self):
+        """Open the transfer history of the session."""
+        if getattr(self, "history_panel", None) is None:
+            self.history_panel = HistoryPanel(self, history=self.torrentmanager.history)
+        self.history_panel.show()
+
+
     def reload_settings(self):
         """Reload settings after closing the settings window."""
         self.global_download_path = self.settings.get("Downloads", "download_path")
@@ -97,53 +223,116 @@ class TorrentClient(QMainWindow):
         if not index.isValid():
             return
 
-        row = index.row()
+        info_hash = info_hash_at(self.table, index)
 
         menu = QMenu(self)
         pause_start_action = menu.addAction("Pause/Start")
+        force_start_action = menu.addAction("Force Start")
+        queue_menu = menu.addMenu("Queue")
+        queue_actions = {
+            queue_menu.addAction("Move Up"): "up",
+            queue_menu.addAction("Move Down"): "down",
+            queue_menu.addAction("Move to Top"): "top",
+            queue_menu.addAction("Move to Bottom"): "bottom",
+        }
+        streaming = info_hash in self.torrentmanager.streams.streams()
+        stream_action = menu.addAction("Stop Streaming" if streaming else "Stream")
         refresh_action = menu.addAction("Refresh")
         explore_files_action = menu.addAction("Explore Files")
         show_info_action = menu.addAction("Show Information")
         delete_entry_action = menu.addAction("Delete Entry")
         delete_entry_files_action = menu.addAction("Delete Entry and Files")
 
+        class_menu = menu.addMenu("Bandwidth Class")
+        current_class = self.torrentmanager.bandwidth.torrent_bandwidth(info_hash)["class"]
+        class_actions = {}
+        for name in self.torrentmanager.bandwidth.classes:
+            class_action = class_menu.addAction(name)
+            class_action.setCheckable(True)
+            class_action.setChecked(name == current_class)
+            class_actions[class_action] = name
+
         action = menu.exec(self.table.viewport().mapToGlobal(position))
 
         if action == pause_start_action:
-            self.toggle_pause_start(row)
+            self.toggle_pause_start(info_hash)
+        elif action == force_start_action:
+            self.torrentmanager.force_start_torrent(info_hash)
+        elif action in queue_actions:
+            self.torrentmanager.move_in_queue(info_hash, queue_actions[action])
+        elif action == stream_action:
+            if streaming:
+                self.torrentmanager.streams.stop(info_hash)
+            else:
+                self.stream_file(info_hash)
         elif action == refresh_action:
-            self.refresh_torrent(row)
+            self.refresh_torrent(info_hash)
         elif action == explore_files_action:
-            self.explore_files(row)
+            self.explore_files(info_hash)
         elif action == show_info_action:
-            self.show_information(row)
+            self.show_information(info_hash)
         elif action == delete_entry_action:
-            self.delete_entry(row, delete_files=False)
+            self.delete_entry(info_hash, delete_files=False)
         elif action == delete_entry_files_action:
-            self.delete_entry(row, delete_files=True)
+            self.delete_entry(info_hash, delete_files=True)
+        elif action in class_actions:
+            self.torrentmanager.bandwidth.set_torrent_bandwidth(info_hash, bandwidth_class=class_actions[action])
+            self.torrentmanager.bandwidth.tick()
 
 
-    def toggle_pause_start(self, row: int):
+    def toggle_pause_start(self, info_hash: str):
         """Toggle pause/start for the selected torrent."""
-        torrent = self.torrentmanager.torrents[row]
-        if torrent.status().is_paused:
-            torrent.resume()
-            logging.info(f"Resumed torrent: {torrent.status().name}")
+        if self.torrentmanager.is_paused(info_hash):
+            self.torrentmanager.resume_torrent(info_hash)
         else:
-            torrent.pause()
-            logging.info(f"Paused torrent: {torrent.status().name}")
+            self.torrentmanager.pause_torrent(info_hash)
+
+
+    def stream_file(self, info_hash: str):
+        """Stream a file of the torrent, chosen by the user if it has several, and open it in the default player."""
+        handle = self.torrentmanager.get_handle(info_hash)
+        info = handle.torrent_file() if handle else None
+        if info is None:
+            QMessageBox.warning(self, "Error", "The torrent's metadata has not been received yet.")
+            return
 
+        files = info.files()
+        indexes = [index for index in range(files.num_files()) if not files.file_flags(index) & lt.file_storage.flag_pad_file]
+        file_index = indexes[0]
+        if len(indexes) > 1:
+            names = [files.file_path(index) for index in indexes]
+            largest = max(range(len(indexes)), key=lambda position: files.file_size(indexes[position]))
+            name, ok = QInputDialog.getItem(self, "Stream", "File to stream:", names, largest, False)
+            if not ok:
+                return
+            file_index = indexes[names.index(name)]
 
-    def refresh_torrent(self, row: int):
+        try:
+            url = self.torrentmanager.streams.start(info_hash, file_index)
+        except Exception as e:
+            logging.error(f"Failed to start streaming. Error: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to start streaming:\n{e}")
+            return
+        QApplication.clipboard().setText(url)
+        self.statusBar().showMessage(f"Streaming at {url} (copied to the clipboard)", 10000)
+        QDesktopServices.openUrl(QUrl(url))
+
+
+    def refresh_torrent(self, info_hash: str):
         """Refresh the torrent information."""
-        logging.info(f"Refreshing torrent: {self.torrentmanager.torrents[row].status().name}")
+        status = self.torrentmanager.status_cache.get(info_hash)
+        if status is None:
+            return
+        logging.info(f"Refreshing torrent: {status.name}")
         self.update_table()
 
 
-    def explore_files(self, row: int):
+    def explore_files(self, info_hash: str):
         """Open the download folder for the selected torrent."""
-        torrent = self.torrentmanager.torrents[row]
-        file_path = f"{self.global_download_path}/{torrent.status().name}"
+        status = self.torrentmanager.status_cache.get(info_hash)
+        if status is None:
+            return
+        file_path = f"{self.global_download_path}/{status.name}"
         logging.info(f"Opening file path: {file_path}")
         try:
             import subprocess
@@ -153,40 +342,31 @@ class TorrentClient(QMainWindow):
             QMessageBox.critical(self, "Error", f"Failed to open file:\n{e}")
 
 
-    def show_information(self, row: int):
-        """Show detailed information about the selected torrent."""
-        torrent = self.torrentmanager.torrents[row]
-        info = (
-            f"Name: {torrent.status().name}\n"
-            f"Progress: {torrent.status().progress * 100:.2f}%\n"
-            f"Download Rate: {torrent.status().download_rate / 1000:.2f} kB/s\n"
-            f"Upload Rate: {torrent.status().upload_rate / 1000:.2f} kB/s\n"
-            f"Peers: {torrent.status().num_peers}\n"
-        )
-        QMessageBox.information(self, "Torrent Information", info)
+    def show_information(self, info_hash: str):
+        """Show the peers, files and pieces of the selected torrent in the detail panel."""
+        self.detail_panel.set_torrent(info_hash)
+        self.detail_panel.show()
+
+
+    def on_current_row_changed(self, current, previous):
+        """Follow the selection in the detail panel."""
+        self.detail_panel.set_torrent(info_hash_at(self.table, current) if current.isValid() else None)
 
 
-    def delete_entry(self, row: int, delete_files: bool):
+    def delete_entry(self, info_hash: str, delete_files: bool):
         """Delete the torrent entry, optionally removing files."""
-        torrent = self.torrentmanager.torrents[row]
         try:
-            if delete_files:
-                self.torrentmanager.session.remove_torrent(torrent, lt.options_t.delete_files)
-                logging.info(f"Deleted torrent and files: {torrent.status().name}")
-            else:
-                self.torrentmanager.session.remove_torrent(torrent)
-                logging.info(f"Deleted torrent: {torrent.status().name}")
-
-            # Remove the torrent from the list
-            self.torrentmanager.torrents.pop(row)
-            self.update_table()
+            # The row goes with the torrent_removed signal
+            self.torrentmanager.remove_torrent(info_hash, delete_files)
         except Exception as e:
             logging.error(f"Failed to delete torrent: {e}")
             QMessageBox.critical(self, "Error", f"Failed to delete torrent:\n{e}")
 
 
 def start_ui():
+    started = time.perf_counter()
     app = QApplication(sys.argv)
     client = TorrentClient()
     client.show()
+    QTimer.singleShot(0, lambda: logging.info(f"First paint after {time.perf_counter() - started:.2f}s"))
     sys.exit(app.exec())
@@ -1,7 +1,9 @@
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog,
-    QTabWidget, QWidget, QSpinBox, QHBoxLayout, QComboBox
+    QTabWidget, QWidget, QSpinBox, QHBoxLayout, QComboBox, QCheckBox, QDoubleSpinBox
 )
+from modules.core.session_profiles import PROFILES
+from modules.core.storage_policy import ALLOCATION, PART_FILE
 
 
 class SettingsWindow(QDialog):
@@ -29,6 +31,16 @@ class SettingsWindow(QDialog):
         self.setup_speed_tab()
         self.tabs.addTab(self.speed_tab, "Speed")
 
+        # Queue Tab
+        self.queue_tab = QWidget()
+        self.setup_queue_tab()
+        self.tabs.addTab(self.queue_tab, "Queue")
+
+        # Performance Tab
+        self.performance_tab = QWidget()
+        self.setup_performance_tab()
+        self.tabs.addTab(self.performance_tab, "Performance")
+
         # Save Button
         self.save_button = QPushButton("Save")
         self.save_button.clicked.connect(self.save_settings)
@@ -54,6 +66,18 @@ class SettingsWindow(QDialog):
         self.select_path_button.clicked.connect(self.browse_path)
         downloads_layout.addWidget(self.select_path_button)
 
+        # Watch Folder
+        self.watch_folder_label = QLabel("Watch Folder (.torrent and .magnet files are added automatically):")
+        downloads_layout.addWidget(self.watch_folder_label)
+
+        self.watch_folder_edit = QLineEdit(self)
+        downloads_layout.addWidget(self.watch_folder_edit)
+
+        self.select_watch_folder_button = QPushButton("Browse")
+        self.select_watch_folder_button.clicked.connect(self.browse_watch_folder)
+        downloads_layout.addWidget(self.select_watch_folder_button)
+        downloads_layout.addStretch()
+
         self.downloads_tab.setLayout(downloads_layout)
 
     def setup_speed_tab(self):
@@ -92,19 +116,108 @@ class SettingsWindow(QDialog):
 
         self.speed_tab.setLayout(speed_layout)
 
+    def setup_queue_tab(self):
+        """Setup the Queue tab."""
+        queue_layout = QVBoxLayout()
+
+        # Active Torrents
+        self.active_downloads_label = QLabel("Active Downloads:")
+        queue_layout.addWidget(self.active_downloads_label)
+        self.active_downloads_spinbox = QSpinBox(self)
+        self.active_downloads_spinbox.setRange(-1, 10_000)  # -1 means unlimited
+        queue_layout.addWidget(self.active_downloads_spinbox)
+
+        self.active_seeds_label = QLabel("Active Seeds:")
+        queue_layout.addWidget(self.active_seeds_label)
+        self.active_seeds_spinbox = QSpinBox(self)
+        self.active_seeds_spinbox.setRange(-1, 10_000)  # -1 means unlimited
+        queue_layout.addWidget(self.active_seeds_spinbox)
+
+        self.slow_torrents_checkbox = QCheckBox("Slow torrents do not count towards the limits", self)
+        queue_layout.addWidget(self.slow_torrents_checkbox)
+
+        # Seeding Goals
+        self.ratio_limit_label = QLabel("Stop Seeding at Ratio (0 for never):")
+        queue_layout.addWidget(self.ratio_limit_label)
+        self.ratio_limit_spinbox = QDoubleSpinBox(self)
+        self.ratio_limit_spinbox.setRange(0, 100)
+        self.ratio_limit_spinbox.setSingleStep(0.1)
+        queue_layout.addWidget(self.ratio_limit_spinbox)
+
+        self.seed_time_label = QLabel("Stop Seeding After Minutes (0 for never):")
+        queue_layout.addWidget(self.seed_time_label)
+        self.seed_time_spinbox = QSpinBox(self)
+        self.seed_time_spinbox.setRange(0, 525_600)
+        queue_layout.addWidget(self.seed_time_spinbox)
+        queue_layout.addStretch()
+
+        self.queue_tab.setLayout(queue_layout)
+
+    def setup_performance_tab(self):
+        """Setup the Performance tab."""
+        performance_layout = QVBoxLayout()
+
+        # Session Profile
+        self.profile_label = QLabel("Session Profile:")
+        performance_layout.addWidget(self.profile_label)
+
+        self.profile_selector = QComboBox(self)
+        self.profile_selector.addItems(PROFILES.keys())
+        performance_layout.addWidget(self.profile_selector)
+
+        # Listen Interfaces
+        self.listen_interfaces_label = QLabel("Listen Interfaces (empty for the default):")
+        performance_layout.addWidget(self.listen_interfaces_label)
+
+        self.listen_interfaces_edit = QLineEdit(self)
+        self.listen_interfaces_edit.setPlaceholderText("0.0.0.0:6881,[::]:6881")
+        performance_layout.addWidget(self.listen_interfaces_edit)
+
+        # Storage
+        self.allocation_label = QLabel("File Allocation:")
+        performance_layout.addWidget(self.allocation_label)
+
+        self.allocation_selector = QComboBox(self)
+        self.allocation_selector.addItems(ALLOCATION.keys())
+        performance_layout.addWidget(self.allocation_selector)
+
+        self.part_file_label = QLabel("Part File for Skipped Files:")
+        performance_layout.addWidget(self.part_file_label)
+
+        self.part_file_selector = QComboBox(self)
+        self.part_file_selector.addItems(PART_FILE)
+        performance_layout.addWidget(self.part_file_selector)
+
+        self.overrides_label = QLabel(
+            "Other libtorrent settings can be overridden in the [Session] section of settings.ini, "
+            "and storage settings per save path in [Storage:<path>] sections."
+        )
+        self.overrides_label.setWordWrap(True)
+        performance_layout.addWidget(self.overrides_label)
+        performance_layout.addStretch()
+
+        self.performance_tab.setLayout(performance_layout)
+
     def browse_path(self):
         """Open a dialog to select a download path."""
         path = QFileDialog.getExistingDirectory(self, "Select Download Directory")
         if path:
             self.download_path_edit.setText(path)
 
+    def browse_watch_folder(self):
+        """Open a dialog to select the watch folder."""
+        path = QFileDialog.getExistingDirectory(self, "Select Watch Folder")
+        if path:
+            self.watch_folder_edit.setText(path)
+
     def load_settings(self):
         """Load settings from the settings handler."""
         download_path = self.settings_handler.get("Downloads", "download_path")
         self.download_path_edit.setText(download_path)
+        self.watch_folder_edit.setText(self.settings_handler.get("Downloads", "watch_folder"))
 
         # Load download speed
-        max_download_speed = int(self.settings_handler.get("Speed", "max_download_speed"))
+        max_download_speed = self.settings_handler.get_int("Speed", "max_download_speed")
         if max_download_speed >= 1_000_000:
             self.max_download_spinbox.setValue(max_download_speed // 1_000_000)
             self.download_unit_selector.setCurrentText("MB/s")
@@ -113,7 +226,7 @@ class SettingsWindow(QDialog):
             self.download_unit_selector.setCurrentText("kB/s")
 
         # Load upload speed
-        max_upload_speed = int(self.settings_handler.get("Speed", "max_upload_speed"))
+        max_upload_speed = self.settings_handler.get_int("Speed", "max_upload_speed")
         if max_upload_speed >= 1_000_000:
             self.max_upload_spinbox.setValue(max_upload_speed // 1_000_000)
             self.upload_unit_selector.setCurrentText("MB/s")
@@ -121,10 +234,27 @@ class SettingsWindow(QDialog):
             self.max_upload_spinbox.setValue(max_upload_speed // 1_000)
             self.upload_unit_selector.setCurrentText("kB/s")
 
+        # Load queue settings
+        self.active_downloads_spinbox.setValue(self.settings_handler.get_int("Queue", "active_downloads", 3))
+        self.active_seeds_spinbox.setValue(self.settings_handler.get_int("Queue", "active_seeds", 5))
+        self.slow_torrents_checkbox.setChecked(self.settings_handler.get_bool("Queue", "dont_count_slow_torrents", True))
+        try:
+            self.ratio_limit_spinbox.setValue(float(self.settings_handler.get("Queue", "ratio_limit") or 0))
+        except ValueError:
+            self.ratio_limit_spinbox.setValue(0)
+        self.seed_time_spinbox.setValue(self.settings_handler.get_int("Queue", "seed_time_limit"))
+
+        # Load session profile
+        self.profile_selector.setCurrentText(self.settings_handler.get("Session", "profile"))
+        self.listen_interfaces_edit.setText(self.settings_handler.get("Session", "listen_interfaces"))
+        self.allocation_selector.setCurrentText(self.settings_handler.get("Storage", "allocation"))
+        self.part_file_selector.setCurrentText(self.settings_handler.get("Storage", "part_file"))
+
     def save_settings(self):
         """Save the settings to the settings handler."""
         download_path = self.download_path_edit.text()
         self.settings_handler.set("Downloads", "download_path", download_path)
+        self.settings_handler.set("Downloads", "watch_folder", self.watch_folder_edit.text())
 
         # Save download speed
         max_download_speed = self.max_download_spinbox.value()
@@ -142,4 +272,19 @@ class SettingsWindow(QDialog):
             max_upload_speed *= 1_000  # Convert kB/s to bytes/s
         self.settings_handler.set("Speed", "max_upload_speed", str(max_upload_speed))
 
+        # Save queue settings
+        self.settings_handler.set("Queue", "active_downloads", str(self.active_downloads_spinbox.value()))
+        self.settings_handler.set("Queue", "active_seeds", str(self.active_seeds_spinbox.value()))
+        self.settings_handler.set("Queue", "dont_count_slow_torrents", "true" if self.slow_torrents_checkbox.isChecked() else "false")
+        self.settings_handler.set("Queue", "ratio_limit", f"{self.ratio_limit_spinbox.value():g}")
+        self.settings_handler.set("Queue", "seed_time_limit", str(self.seed_time_spinbox.value()))
+
+        # Save session profile
+        self.settings_handler.set("Session", "profile", self.profile_selector.currentText())
+        self.settings_handler.set("Session", "listen_interfaces", self.listen_interfaces_edit.text().strip())
+        self.settings_handler.set("Storage", "allocation", self.allocation_selector.currentText())
+        self.settings_handler.set("Storage", "part_file", self.part_file_selector.currentText())
+
+        # One write for the whole dialog; subscribers have already applied the changes
+        self.settings_handler.flush()
         self.accept()
@@ -0,0 +1,63 @@
+import logging
+import libtorrent as lt
+from PyQt6.QtCore import QObject, pyqtSignal
+from modules.core.status_cache import info_hash_of
+
+
+class AlertBridge(QObject):
+    """
+    Re-emit libtorrent alerts from the dispatcher thread as Qt signals.
+
+    Signals are emitted on the dispatcher thread, so Qt queues them onto the
+    thread that owns the connected receivers. Payloads are plain Python
+    values; no libtorrent object crosses into the GUI thread.
+    """
+
+    torrents_updated = pyqtSignal(list)        # changed status dicts
+    torrent_removed = pyqtSignal(str)          # info-hash
+    torrent_finished = pyqtSignal(str, str)    # info-hash, name
+    metadata_received = pyqtSignal(str, str)   # info-hash, name
+    state_changed = pyqtSignal(str, str)       # info-hash, new state
+    resume_data_saved = pyqtSignal(str)        # info-hash
+    torrent_error = pyqtSignal(str, str)       # info-hash, message
+    session_stats = pyqtSignal(dict)           # counter name -> value
+    load_progress = pyqtSignal(int, int)       # loaded, total
+    storage_move = pyqtSignal(str, str, int, int)  # info-hash, event, active, queued
+    bandwidth_plan = pyqtSignal(str, int, int)  # plan name, download limit, upload limit
+
+    def __init__(self, torrentmanager, parent=None):
+        super().__init__(parent)
+        self.torrentmanager = torrentmanager
+
+        # Only statuses of torrents still in the session, after the status cache dropped late ones
+        torrentmanager.add_status_callback(self.torrents_updated.emit)
+        # Removals through the API, exports and verify reloads as well as the GUI's own
+        torrentmanager.add_removed_callback(self.torrent_removed.emit)
+        dispatcher = torrentmanager.dispatcher
+        dispatcher.subscribe(lt.torrent_finished_alert, self._on_torrent_finished)
+        dispatcher.subscribe(lt.metadata_received_alert, self._on_metadata_received)
+        dispatcher.subscribe(lt.state_changed_alert, self._on_state_changed)
+        dispatcher.subscribe(lt.save_resume_data_alert, self._on_resume_data_saved)
+        dispatcher.subscribe(lt.tracker_error_alert, self._on_error)
+        dispatcher.subscribe(lt.peer_error_alert, self._on_error)
+        dispatcher.subscribe(lt.torrent_error_alert, self._on_error)
+        dispatcher.subscribe(lt.session_stats_alert, self._on_session_stats)
+
+    def _on_torrent_finished(self, alert):
+        self.torrent_finished.emit(info_hash_of(alert.handle), alert.torrent_name)
+
+    def _on_metadata_received(self, alert):
+        self.metadata_received.emit(info_hash_of(alert.handle), alert.torrent_name)
+
+    def _on_state_changed(self, alert):
+        self.state_changed.emit(info_hash_of(alert.handle), self.torrentmanager._get_state(alert.state))
+
+    def _on_resume_data_saved(self, alert):
+        self.resume_data_saved.emit(info_hash_of(alert.handle))
+
+    def _on_error(self, alert):
+        logging.warning(f"Torrent error: {alert.message()}")
+        self.torrent_error.emit(info_hash_of(alert.handle), alert.message())
+
+    def _on_session_stats(self, alert):
+        self.session_stats.emit(dict(alert.values))
@@ -0,0 +1,146 @@
+import os
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog,
+    QComboBox, QCheckBox, QPlainTextEdit, QProgressDialog, QMessageBox
+)
+from PyQt6.QtCore import QTimer
+from modules.core.creator import VERSIONS, MIN_PIECE_SIZE, MAX_PIECE_SIZE, default_output
+
+PROGRESS_INTERVAL = 200  # ms between progress updates while hashing
+
+
+class CreateTorrentDialog(QDialog):
+    """Create a torrent from a file or directory and optionally seed it."""
+
+    def __init__(self, parent=None, torrentmanager=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("Create Torrent")
+        self.setGeometry(200, 200, 500, 450)
+
+        self.torrentmanager = torrentmanager
+        self.job = None
+
+        layout = QVBoxLayout()
+
+        # Source file or directory
+        layout.addWidget(QLabel("File or Folder to Share:"))
+        self.source_edit = QLineEdit(self)
+        self.source_edit.textChanged.connect(self.update_output)
+        layout.addWidget(self.source_edit)
+        source_buttons = QHBoxLayout()
+        self.select_file_button = QPushButton("File...")
+        self.select_file_button.clicked.connect(self.browse_file)
+        source_buttons.addWidget(self.select_file_button)
+        self.select_folder_button = QPushButton("Folder...")
+        self.select_folder_button.clicked.connect(self.browse_folder)
+        source_buttons.addWidget(self.select_folder_button)
+        layout.addLayout(source_buttons)
+
+        # Output .torrent
+        layout.addWidget(QLabel("Save Torrent As:"))
+        self.output_edit = QLineEdit(self)
+        layout.addWidget(self.output_edit)
+
+        # Format and piece size
+        options = QHBoxLayout()
+        options.addWidget(QLabel("Format:"))
+        self.version_selector = QComboBox(self)
+        self.version_selector.addItems(VERSIONS.keys())
+        self.version_selector.setCurrentText("v1")
+        options.addWidget(self.version_selector)
+        options.addWidget(QLabel("Piece Size:"))
+        self.piece_size_selector = QComboBox(self)
+        self.piece_size_selector.addItem("Auto", 0)
+        piece_size = MIN_PIECE_SIZE
+        while piece_size <= MAX_PIECE_SIZE:
+            self.piece_size_selector.addItem(f"{piece_size // 1024} KiB", piece_size)
+            piece_size *= 2
+        options.addWidget(self.piece_size_selector)
+        layout.addLayout(options)
+
+        layout.addWidget(QLabel("Trackers (one per line):"))
+        self.trackers_edit = QPlainTextEdit(self)
+        layout.addWidget(self.trackers_edit)
+
+        layout.addWidget(QLabel("Web Seeds (one per line):"))
+        self.web_seeds_edit = QPlainTextEdit(self)
+        layout.addWidget(self.web_seeds_edit)
+
+        layout.addWidget(QLabel("Comment:"))
+        self.comment_edit = QLineEdit(self)
+        layout.addWidget(self.comment_edit)
+
+        self.private_checkbox = QCheckBox("Private torrent")
+        layout.addWidget(self.private_checkbox)
+        self.seed_checkbox = QCheckBox("Start seeding")
+        self.seed_checkbox.setChecked(True)
+        layout.addWidget(self.seed_checkbox)
+
+        self.create_button = QPushButton("Create")
+        self.create_button.clicked.connect(self.create_torrent)
+        layout.addWidget(self.create_button)
+
+        self.setLayout(layout)
+
+        self.progress_timer = QTimer(self)
+        self.progress_timer.timeout.connect(self.update_progress)
+
+    def browse_file(self):
+        """Pick a single file to share."""
+        path, _ = QFileDialog.getOpenFileName(self, "Select File")
+        if path:
+            self.source_edit.setText(path)
+
+    def browse_folder(self):
+        """Pick a folder to share."""
+        path = QFileDialog.getExistingDirectory(self, "Select Folder")
+        if path:
+            self.source_edit.setText(path)
+
+    def update_output(self, source):
+        """Suggest saving the torrent next to the shared file or folder."""
+        self.output_edit.setText(default_output(source) if source else "")
+
+    def create_torrent(self):
+        """Start hashing in the background and show its progress."""
+        source = self.source_edit.text().strip()
+        if not source or not os.path.exists(source):
+            QMessageBox.warning(self, "Error", "Select an existing file or folder to share.")
+            return
+
+        self.job = self.torrentmanager.creator.start(
+            source,
+            self.output_edit.text().strip() or None,
+            self.seed_checkbox.isChecked(),
+            version=self.version_selector.currentText(),
+            piece_size=self.piece_size_selector.currentData(),
+            trackers=[line.strip() for line in self.trackers_edit.toPlainText().splitlines() if line.strip()],
+            web_seeds=[line.strip() for line in self.web_seeds_edit.toPlainText().splitlines() if line.strip()],
+            comment=self.comment_edit.text().strip(),
+            private=self.private_checkbox.isChecked(),
+        )
+        self.create_button.setEnabled(False)
+        self.progress = QProgressDialog("Hashing pieces...", None, 0, 100, self)
+        self.progress.setWindowTitle("Create Torrent")
+        self.progress.setMinimumDuration(0)
+        self.progress_timer.start(PROGRESS_INTERVAL)
+
+    def update_progress(self):
+        """Follow the creation job until it is done or failed."""
+        job = self.torrentmanager.creator.status()[self.job]
+        self.progress.setValue(int(job["progress"] * 100))
+        if job["state"] == "running":
+            return
+
+        self.progress_timer.stop()
+        self.progress.close()
+        self.create_button.setEnabled(True)
+        if job["state"] == "failed":
+            QMessageBox.critical(self, "Error", f"Failed to create torrent:\n{job['error']}")
+            return
+        message = f"Saved {job['output']}"
+        if job["seed"]:
+            message += "\nThe torrent is seeding."
+        QMessageBox.information(self, "Create Torrent", message)
+        self.accept()
@@ -0,0 +1,311 @@
+"""
+Detail panel of the selected torrent: its peers, files and piece map.
+
+Nothing is fetched while the panel is hidden. While it is visible, the
+selected torrent alone is queried once a second on a background thread,
+and only for the open tab, so a torrent with 100k pieces or hundreds of
+peers never holds up the GUI thread. The piece bitfield and availability
+are reduced with NumPy to one value per pixel column before they reach
+Qt; the rendered bar and the table cells are kept between ticks and only
+redrawn where they changed.
+"""
+import logging
+import threading
+import numpy as np
+import libtorrent as lt
+from PyQt6.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QLabel, QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView
+)
+from PyQt6.QtCore import QTimer, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter, QPixmap
+from modules.ui.table_manager import format_rate
+from modules.ui.history_panel import RateHistoryView
+
+REFRESH_INTERVAL = 1000  # ms between fetches while the panel is visible
+PEER_COLUMNS = ["Address", "Client", "Flags", "Progress", "Download", "Upload"]
+FILE_COLUMNS = ["Path", "Size", "Progress"]
+
+MISSING_COLOR = np.array([230, 230, 230])
+HAVE_COLOR = np.array([40, 110, 220])
+UNAVAILABLE_COLOR = np.array([210, 60, 50])
+AVAILABLE_COLOR = np.array([60, 170, 80])
+FULL_AVAILABILITY = 4  # copies, ours included, shown at full colour
+
+# Peer flags as letters, in the spirit of other clients' peer lists
+PEER_FLAGS = (
+    (lt.peer_info.interesting, "I"),        # we want pieces from the peer
+    (lt.peer_info.remote_interested, "i"),  # the peer wants pieces from us
+    (lt.peer_info.choked, "C"),             # we choke the peer
+    (lt.peer_info.remote_choked, "c"),      # the peer chokes us
+    (lt.peer_info.snubbed, "S"),
+    (lt.peer_info.rc4_encrypted | lt.peer_info.plaintext_encrypted, "E"),
+)
+
+
+def format_size(size):
+    """Format a size in bytes for display."""
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1000:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.2f} {unit}"
+        size /= 1000
+    return f"{size:.2f} TB"
+
+
+def downsample(values, bins, reduce=np.add):
+    """
+    Reduce an array to ``bins`` runs of consecutive values with a ufunc, e.g. a sum or minimum per run.
+
+    With fewer values than bins, each value is repeated over several bins.
+    """
+    if len(values) <= bins:
+        return values[np.arange(bins) * len(values) // bins]
+    return reduce.reduceat(values, np.arange(bins) * len(values) // bins)
+
+
+def piece_map(have, availability, bins):
+    """
+    Return the fraction of pieces we have and the copies of the least available piece of each of ``bins`` runs.
+
+    Copies count the connected peers and ourselves, so only pieces nobody
+    has show as unavailable.
+    """
+    if not len(have) or bins <= 0:
+        return np.zeros(0), np.zeros(0, dtype=np.int32)
+    if len(have) <= bins:
+        done = downsample(have, bins).astype(float)
+    else:
+        counts = np.diff(np.append(np.arange(bins) * len(have) // bins, len(have)))
+        done = downsample(have.astype(np.int32), bins) / counts
+    if len(availability) != len(have):
+        availability = np.zeros(len(have), dtype=np.int32)
+    return done, downsample(availability + have, bins, np.minimum)
+
+
+def render_piece_map(done, availability):
+    """Render a piece map as a two-row RGB image: pieces we have on top, availability below."""
+    done = done[:, None]
+    have_row = MISSING_COLOR + (HAVE_COLOR - MISSING_COLOR) * done
+    shade = np.minimum(availability, FULL_AVAILABILITY)[:, None] / FULL_AVAILABILITY
+    availability_row = np.where(
+        availability[:, None] > 0, MISSING_COLOR + (AVAILABLE_COLOR - MISSING_COLOR) * shade, UNAVAILABLE_COLOR
+    )
+    pixels = np.ascontiguousarray(np.stack([have_row, availability_row]).astype(np.uint8))
+    image = QImage(pixels.data, len(done), 2, len(done) * 3, QImage.Format.Format_RGB888)
+    return QPixmap.fromImage(image)  # copies the pixels, so the array can go
+
+
+def peer_flags(peer):
+    return "".join(letter for flag, letter in PEER_FLAGS if peer.flags & flag)
+
+
+def fetch_details(handle, bins, peers=False):
+    """
+    Query a torrent for the detail panel; runs off the GUI thread.
+
+    Returns the downsampled piece map, the progress of each file and, with
+    ``peers``, one row of display strings per connected peer.
+    """
+    status = handle.status(lt.status_flags_t.query_pieces)
+    have = np.frombuffer(bytes(status.pieces), dtype=bool)
+    availability = np.array(handle.piece_availability(), dtype=np.int32)
+    done, least = piece_map(have, availability, bins)
+    details = {
+        "done": done,
+        "availability": least,
+        "file_progress": handle.file_progress(lt.torrent_handle.piece_granularity),
+        "peers": None,
+    }
+    if peers:
+        details["peers"] = [
+            (
+                f"{peer.ip[0]}:{peer.ip[1]}",
+                peer.client.decode("utf-8", "replace"),
+                peer_flags(peer),
+                f"{peer.progress * 100:.1f}%",
+                format_rate(peer.payload_down_speed),
+                format_rate(peer.payload_up_speed),
+            )
+            for peer in handle.get_peer_info()
+        ]
+    return details
+
+
+class PieceBar(QWidget):
+    """Bar of a torrent's pieces, drawn from a cached pixmap."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(24)
+        self.pixmap = None
+        self._done = None
+        self._availability = None
+
+    def set_map(self, done, availability):
+        """Show a new piece map; the pixmap is only rendered again if it changed."""
+        if (
+            self._done is not None
+            and np.array_equal(done, self._done)
+            and np.array_equal(availability, self._availability)
+        ):
+            return
+        self._done, self._availability = done, availability
+        self.pixmap = render_piece_map(done, availability) if len(done) else None
+        self.update()
+
+    def clear(self):
+        self._done = self._availability = self.pixmap = None
+        self.update()
+
+    def paintEvent(self, event):
+        if self.pixmap is None:
+            return
+        # Two image rows stretched to the widget; no smoothing, so runs keep sharp edges
+        QPainter(self).drawPixmap(self.rect(), self.pixmap)
+
+
+class DetailPanel(QDockWidget):
+    """Dock with the peers, files and pieces of the torrent selected in the table."""
+
+    fetched = pyqtSignal(str, object)  # info-hash, details dictionary or None on failure
+
+    def __init__(self, parent=None, torrentmanager=None):
+        super().__init__("Details", parent)
+
+        self.torrentmanager = torrentmanager
+        self.info_hash = None
+        self._fetching = False
+        self._files = None  # file indexes, paths and sizes of the selected torrent, skipping pad files
+        self._rows = {}     # table -> rows of strings it shows
+
+        body = QWidget(self)
+        layout = QVBoxLayout(body)
+
+        self.summary = QLabel(body)
+        layout.addWidget(self.summary)
+        self.piece_bar = PieceBar(body)
+        layout.addWidget(self.piece_bar)
+
+        self.tabs = QTabWidget(body)
+        self.peers_table = self._make_table(PEER_COLUMNS)
+        self.tabs.addTab(self.peers_table, "Peers")
+        self.files_table = self._make_table(FILE_COLUMNS)
+        self.tabs.addTab(self.files_table, "Files")
+        self.speed_view = RateHistoryView(body, history=torrentmanager.history)
+        self.tabs.addTab(self.speed_view, "Speed")
+        self.tabs.currentChanged.connect(self.refresh)
+        layout.addWidget(self.tabs)
+
+        self.setWidget(body)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.fetched.connect(self._on_fetched)
+
+    def _make_table(self, columns):
+        table = QTableWidget(0, len(columns), self)
+        table.setHorizontalHeaderLabels(columns)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        return table
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.timer.start(REFRESH_INTERVAL)
+        self.refresh()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def set_torrent(self, info_hash):
+        """Show another torrent, or none."""
+        if info_hash == self.info_hash:
+            return
+        self.info_hash = info_hash
+        self._files = None
+        self._rows = {}
+        self.piece_bar.clear()
+        self.peers_table.setRowCount(0)
+        self.files_table.setRowCount(0)
+        self.speed_view.set_torrent(info_hash)
+        self.summary.clear()
+        self.refresh()
+
+    def refresh(self, *_):
+        """Start fetching the selected torrent's details, unless hidden or a fetch is still running."""
+        if not self.isVisible() or self.info_hash is None or self._fetching:
+            return
+        handle = self.torrentmanager.get_handle(self.info_hash)
+        if handle is None:
+            return
+        self._update_summary()
+        # The history is already in memory; only the libtorrent queries go to the background
+        self.speed_view.refresh()
+        self._fetching = True
+        threading.Thread(
+            target=self._fetch,
+            args=(self.info_hash, handle, max(self.piece_bar.width(), 1), self.tabs.currentWidget() is self.peers_table),
+            name="details", daemon=True,
+        ).start()
+
+    def _fetch(self, info_hash, handle, bins, peers):
+        try:
+            details = fetch_details(handle, bins, peers)
+        except RuntimeError as e:
+            logging.warning(f"Failed to fetch the details of {info_hash}. Error: {e}")
+            details = None
+        self.fetched.emit(info_hash, details)
+
+    def _on_fetched(self, info_hash, details):
+        self._fetching = False
+        if details is None or info_hash != self.info_hash or not self.isVisible():
+            return
+        self.piece_bar.set_map(details["done"], details["availability"])
+        if details["peers"] is not None:
+            self._update_rows(self.peers_table, details["peers"])
+        if self.tabs.currentWidget() is self.files_table:
+            self._update_files(details["file_progress"])
+
+    def _update_summary(self):
+        status = self.torrentmanager.status_cache.get(self.info_hash)
+        if status is None:
+            return
+        self.summary.setText(
+            f"{status.name}  |  {status.progress * 100:.2f}%  |  "
+            f"down {format_rate(status.download_rate)}  |  up {format_rate(status.upload_rate)}  |  "
+            f"{status.num_peers} peers"
+        )
+
+    def _update_files(self, progress):
+        if self._files is None:
+            handle = self.torrentmanager.get_handle(self.info_hash)
+            info = handle.torrent_file() if handle is not None else None
+            if info is None:
+                return  # no metadata yet
+            files = info.files()
+            self._files = [
+                (index, files.file_path(index), files.file_size(index))
+                for index in range(files.num_files())
+                if not files.file_flags(index) & lt.file_storage.flag_pad_file
+            ]
+        self._update_rows(self.files_table, [
+            (path, format_size(size), f"{progress[index] / size * 100:.1f}%" if size else "100.0%")
+            for index, path, size in self._files
+        ])
+
+    def _update_rows(self, table, rows):
+        """Fill a table with rows of strings, touching only the cells whose text changed."""
+        shown = self._rows.get(table, [])
+        if table.rowCount() != len(rows):
+            table.setRowCount(len(rows))
+        for row, cells in enumerate(rows):
+            if row < len(shown) and shown[row] == cells:
+                continue
+            for column, text in enumerate(cells):
+                item = table.item(row, column)
+                if item is None:
+                    table.setItem(row, column, QTableWidgetItem(text))
+                elif item.text() != text:
+                    item.setText(text)
+        self._rows[table] = rows
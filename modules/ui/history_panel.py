@@ -0,0 +1,142 @@
+import numpy as np
+from PyQt6.QtWidgets import QDialog, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+from PyQt6.QtCore import Qt, QPointF, QTimer
+from PyQt6.QtGui import QColor, QPainter, QPen, QPolygonF
+from modules.core.rate_history import RESOLUTIONS
+from modules.ui.table_manager import format_rate
+
+REFRESH_INTERVAL = 1000  # ms between redraws while visible
+RESOLUTION_LABELS = {"seconds": "1 s samples", "minutes": "1 min samples", "hours": "1 h samples"}
+
+DOWNLOAD_COLOR = QColor(40, 110, 220)
+UPLOAD_COLOR = QColor(60, 170, 80)
+PEERS_COLOR = QColor(150, 150, 150)
+MARGIN = 6
+
+
+def format_span(seconds):
+    """Format a duration for the time axis."""
+    if seconds < 3600:
+        return f"{seconds / 60:g} min"
+    if seconds < 2 * 86400:
+        return f"{seconds / 3600:g} h"
+    return f"{seconds / 86400:g} days"
+
+
+class RateGraph(QWidget):
+    """Line graph of a rate history: download and upload on one scale, peers on their own."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(300, 120)
+        self.series = None
+
+    def set_series(self, series):
+        """Show a history from RateHistory.series; only repaints when a sample was added."""
+        if (
+            series is not None and self.series is not None
+            and series["step"] == self.series["step"]
+            and len(series["times"]) == len(self.series["times"])
+            and np.array_equal(series["times"][-1:], self.series["times"][-1:])
+        ):
+            return
+        self.series = series
+        self.update()
+
+    def _polygon(self, times, values, peak, rect):
+        """Map samples onto the graph area: time runs right to now, values up to ``peak``."""
+        xs = rect.right() - (times[-1] - times) / self.series["span"] * rect.width()
+        ys = rect.bottom() - values / peak * rect.height()
+        return QPolygonF([QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())])
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.GlobalColor.white)
+        series = self.series
+        if series is None or len(series["times"]) < 2:
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "No samples yet")
+            return
+
+        rect = self.rect().adjusted(MARGIN, MARGIN + 14, -MARGIN, -MARGIN - 14)
+        times = series["times"]
+        peak = max(float(series["download"].max()), float(series["upload"].max()), 1.0)
+        peers = float(series["peers"].max())
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(PEERS_COLOR, 1, Qt.PenStyle.DotLine))
+        painter.drawPolyline(self._polygon(times, series["peers"], max(peers, 1.0), rect))
+        for name, color in (("upload", UPLOAD_COLOR), ("download", DOWNLOAD_COLOR)):
+            painter.setPen(QPen(color, 1.5))
+            painter.drawPolyline(self._polygon(times, series[name], peak, rect))
+
+        painter.setPen(Qt.GlobalColor.black)
+        painter.drawText(
+            MARGIN, MARGIN + 10,
+            f"peak {format_rate(peak)}   now down {format_rate(series['download'][-1])}, "
+            f"up {format_rate(series['upload'][-1])}, {series['peers'][-1]:.0f} peers (max {peers:.0f})",
+        )
+        painter.drawText(MARGIN, self.height() - MARGIN, f"-{format_span(series['span'])}")
+        painter.drawText(
+            self.rect().adjusted(0, 0, -MARGIN, -MARGIN), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignBottom, "now"
+        )
+
+
+class RateHistoryView(QWidget):
+    """A resolution selector over the rate graph of one torrent, or of the session with ``session``."""
+
+    def __init__(self, parent=None, history=None, session=False):
+        super().__init__(parent)
+        self.history = history
+        self.session = session
+        self.info_hash = None
+
+        layout = QVBoxLayout(self)
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Show:"))
+        self.resolution_selector = QComboBox(self)
+        for name, _ in RESOLUTIONS:
+            self.resolution_selector.addItem(RESOLUTION_LABELS[name], name)
+        self.resolution_selector.currentIndexChanged.connect(self.refresh)
+        controls.addWidget(self.resolution_selector)
+        controls.addStretch()
+        layout.addLayout(controls)
+        self.graph = RateGraph(self)
+        layout.addWidget(self.graph)
+
+    def set_torrent(self, info_hash):
+        """Follow another torrent, or none."""
+        self.info_hash = info_hash
+        self.graph.set_series(None)
+        self.refresh()
+
+    def refresh(self, *_):
+        if not self.isVisible() or (self.info_hash is None and not self.session):
+            return
+        self.graph.set_series(self.history.series(self.info_hash, self.resolution_selector.currentData()))
+
+
+class HistoryPanel(QDialog):
+    """Window with the transfer history of the whole session."""
+
+    def __init__(self, parent=None, history=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("Transfer History")
+        self.setGeometry(250, 250, 700, 300)
+
+        layout = QVBoxLayout()
+        self.view = RateHistoryView(self, history=history, session=True)
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.view.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.timer.start(REFRESH_INTERVAL)
+        self.view.refresh()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
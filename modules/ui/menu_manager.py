@@ -8,10 +8,23 @@ def setup_menu(parent):
     # File Menu
     file_menu = QMenu("File", parent)
     file_menu.addAction("Add Torrent", parent.add_torrent)
+    file_menu.addAction("Add Magnet Link", parent.add_magnet)
+    file_menu.addAction("Create Torrent", parent.create_torrent)
     file_menu.addAction("Settings", parent.open_settings)
     file_menu.addAction("Exit", parent.close)
     menu_bar.addMenu(file_menu)
 
+    # View Menu
+    view_menu = QMenu("View", parent)
+    view_menu.addAction(parent.detail_panel.toggleViewAction())
+    view_menu.addAction("Transfer History", parent.open_history)
+    menu_bar.addMenu(view_menu)
+
+    # Debug Menu
+    debug_menu = QMenu("Debug", parent)
+    debug_menu.addAction("Metrics", parent.open_metrics)
+    menu_bar.addMenu(debug_menu)
+
     # Help Menu
     help_menu = QMenu("Help", parent)
     help_menu.addAction("About", lambda: QMessageBox.about(
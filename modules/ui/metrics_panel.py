@@ -0,0 +1,59 @@
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView, QLabel
+from modules.core.metrics import HIGHLIGHTED_METRICS
+
+
+class MetricsPanel(QDialog):
+    """Debug panel with the main session counters and our hot-path timings."""
+
+    def __init__(self, parent=None, metrics=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("Metrics")
+        self.setGeometry(250, 250, 500, 600)
+
+        self.metrics = metrics
+
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel("Session counters"))
+        self.counters_table = QTableWidget(len(HIGHLIGHTED_METRICS), 2, self)
+        self.counters_table.setHorizontalHeaderLabels(["Counter", "Value"])
+        self.counters_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for row, name in enumerate(HIGHLIGHTED_METRICS):
+            self.counters_table.setItem(row, 0, QTableWidgetItem(name))
+            self.counters_table.setItem(row, 1, QTableWidgetItem(""))
+        layout.addWidget(self.counters_table)
+
+        layout.addWidget(QLabel("Timings (ms)"))
+        self.timings_table = QTableWidget(0, 5, self)
+        self.timings_table.setHorizontalHeaderLabels(["Path", "Count", "Mean", "p50", "p99"])
+        self.timings_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.timings_table)
+
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self, *_):
+        """Show the latest counters and timings while the panel is visible."""
+        if not self.isVisible():
+            return
+
+        values = self.metrics.values()
+        for row, name in enumerate(HIGHLIGHTED_METRICS):
+            self.counters_table.item(row, 1).setText(str(values.get(name, "")))
+
+        timings = self.metrics.timings()
+        self.timings_table.setRowCount(len(timings))
+        for row, (name, timing) in enumerate(sorted(timings.items())):
+            cells = (
+                name,
+                str(timing["count"]),
+                f"{timing['mean'] * 1000:.2f}",
+                f"<{timing['p50'] * 1000:g}",
+                f"<{timing['p99'] * 1000:g}",
+            )
+            for column, text in enumerate(cells):
+                self.timings_table.setItem(row, column, QTableWidgetItem(text))
@@ -1,79 +1,180 @@
-from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt6.QtWidgets import QTableView, QHeaderView, QAbstractItemView
 from PyQt6.QtGui import QColor
 
+COLUMNS = ["#", "Name", "Progress", "Download", "Upload"]
+SORT_ROLE = Qt.ItemDataRole.UserRole
+INFO_HASH_ROLE = Qt.ItemDataRole.UserRole + 1
+
+FINISHED_COLOR = QColor(0, 255, 0, 20)
+ACTIVE_COLOR = QColor(0, 0, 255, 20)
+
+
+def format_rate(rate):
+    """Format a transfer rate in bytes/s for display."""
+    if rate < 1_000_000:
+        return f"{rate / 1_000:.2f} kB/s"
+    return f"{rate / 1_000_000:.2f} MB/s"
+
+
+def format_row(torrent):
+    """Return the display strings of a torrent row, one per column."""
+    return (
+        str(torrent["queue_position"] + 1) if torrent["queue_position"] >= 0 else "",
+        torrent["name"],
+        f"{torrent['progress'] * 100:.2f}%",
+        format_rate(torrent["download_rate"]),
+        format_rate(torrent["upload_rate"]),
+    )
+
+
+def sort_keys(torrent):
+    """Return the raw values used to sort each column."""
+    return (
+        # Unqueued torrents (seeds) sort after the queue
+        torrent["queue_position"] if torrent["queue_position"] >= 0 else float("inf"),
+        torrent["name"].lower(),
+        torrent["progress"],
+        torrent["download_rate"],
+        torrent["upload_rate"],
+    )
+
+
+class TorrentTableModel(QAbstractTableModel):
+    """
+    Table model of torrent statuses keyed by info-hash.
+
+    Rows keep their insertion order; sorting is left to a proxy model.
+    Display strings are formatted once per update and cached, and
+    ``dataChanged`` is only emitted for the cells whose text changed.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._hashes = []      # row -> info-hash
+        self._rows = {}        # info-hash -> row
+        self._display = []     # row -> formatted strings
+        self._keys = []        # row -> sort keys
+        self._finished = []    # row -> progress >= 1.0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._hashes)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._display[row][column]
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return FINISHED_COLOR if self._finished[row] else ACTIVE_COLOR
+        if role == SORT_ROLE:
+            return self._keys[row][column]
+        if role == INFO_HASH_ROLE:
+            return self._hashes[row]
+        return None
+
+    def update_torrents(self, torrents):
+        """Insert new torrents and refresh the cells of changed ones."""
+        new = []
+        for torrent in torrents:
+            row = self._rows.get(torrent["info_hash"])
+            if row is None:
+                new.append(torrent)
+                continue
+
+            display = format_row(torrent)
+            finished = torrent["progress"] >= 1.0
+            if finished != self._finished[row]:
+                changed = list(range(len(COLUMNS)))
+            else:
+                old = self._display[row]
+                changed = [column for column in range(len(COLUMNS)) if display[column] != old[column]]
+            if not changed:
+                continue
+
+            self._display[row] = display
+            self._keys[row] = sort_keys(torrent)
+            self._finished[row] = finished
+            self.dataChanged.emit(self.index(row, changed[0]), self.index(row, changed[-1]))
+
+        if new:
+            first = len(self._hashes)
+            self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+            for torrent in new:
+                self._rows[torrent["info_hash"]] = len(self._hashes)
+                self._hashes.append(torrent["info_hash"])
+                self._display.append(format_row(torrent))
+                self._keys.append(sort_keys(torrent))
+                self._finished.append(torrent["progress"] >= 1.0)
+            self.endInsertRows()
+
+    def remove_torrent(self, info_hash):
+        """Remove the row of a torrent."""
+        row = self._rows.pop(info_hash, None)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        for column_list in (self._hashes, self._display, self._keys, self._finished):
+            del column_list[row]
+        for moved_row in range(row, len(self._hashes)):
+            self._rows[self._hashes[moved_row]] = moved_row
+        self.endRemoveRows()
+
 
 def setup_table(parent):
-    """Create and configure the torrent table."""
-    table = QTableWidget(parent)
-    table.setColumnCount(4)
-    table.setHorizontalHeaderLabels(["Name", "Progress", "Download", "Upload"])
+    """Create and configure the torrent table view and its models."""
+    model = TorrentTableModel(parent)
+
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setSortRole(SORT_ROLE)
+    proxy.setDynamicSortFilter(True)
 
-    # Fix resize mode
+    table = QTableView(parent)
+    table.setModel(proxy)
+    table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    table.verticalHeader().setVisible(False)
+
+    # Sort: in-progress first, finished last
+    table.setSortingEnabled(True)
+    table.sortByColumn(COLUMNS.index("Progress"), Qt.SortOrder.AscendingOrder)
+
+    # Fix resize mode; ResizeToContents would measure every row on each change
     header = table.horizontalHeader()
-    header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
-    header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
-    header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-    header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
+    for column in range(len(COLUMNS)):
+        header.setSectionResizeMode(column, QHeaderView.ResizeMode.Interactive)
+        header.resizeSection(column, 110)
+    header.setSectionResizeMode(COLUMNS.index("Name"), QHeaderView.ResizeMode.Stretch)
+    header.resizeSection(COLUMNS.index("#"), 40)
 
     # Enable custom context menu
     table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
     table.customContextMenuRequested.connect(parent.show_context_menu)
 
-    return table
+    return table, model
 
 
-def update_table(table, torrents):
+def update_table(model, torrents):
     """
-    Update the table with the latest torrent statuses.
+    Update the table model with the latest torrent statuses.
 
     Args:
-        table (QTableWidget): The table to update.
-        torrents (list): A list of torrent dictionaries.
+        model (TorrentTableModel): The model to update.
+        torrents (list): A list of torrent dictionaries, changed ones only.
     """
-    # Sort torrents: in-progress first, finished last
-    torrents = sorted(torrents, key=lambda t: t["progress"] >= 1.0)
-
-    table.setRowCount(len(torrents))
-    for i, torrent in enumerate(torrents):
-        name_item = QTableWidgetItem(torrent["name"])
-        progress_item = QTableWidgetItem(f"{torrent['progress'] * 100:.2f}%")
-
-        # Dynamically adjust speed display based on the value
-        download_rate = (
-            f"{torrent['download_rate'] / 1_000:.2f} kB/s"
-            if torrent["download_rate"] < 1_000_000
-            else f"{torrent['download_rate'] / 1_000_000:.2f} MB/s"
-        )
-        upload_rate = (
-            f"{torrent['upload_rate'] / 1_000:.2f} kB/s"
-            if torrent["upload_rate"] < 1_000_000
-            else f"{torrent['upload_rate'] / 1_000_000:.2f} MB/s"
-        )
-
-        download_item = QTableWidgetItem(download_rate)
-        upload_item = QTableWidgetItem(upload_rate)
-
-        # Set items as non-editable
-        for item in (name_item, progress_item, download_item, upload_item):
-            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-
-        table.setItem(i, 0, name_item)
-        table.setItem(i, 1, progress_item)
-        table.setItem(i, 2, download_item)
-        table.setItem(i, 3, upload_item)
-
-        # Set row color based on progress
-        if torrent["progress"] >= 1.0:
-            set_row_color(table, i, QColor(0, 255, 0, 20))
-        else:
-            set_row_color(table, i, QColor(0, 0, 255, 20))
-
-
-
-def set_row_color(table, row, color):
-    """Set the background color for a specific row."""
-    for col in range(table.columnCount()):
-        item = table.item(row, col)
-        if item:
-            item.setBackground(color)
+    model.update_torrents(torrents)
+
+
+def info_hash_at(table, index):
+    """Return the info-hash of the torrent at a view index."""
+    return table.model().data(index.siblingAtColumn(0), INFO_HASH_ROLE)
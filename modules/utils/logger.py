@@ -1,15 +1,180 @@
+"""
+Logging to the terminal and a rotating log file, written on a background thread.
+
+Log calls only put the record on a queue; a ``QueueListener`` thread
+formats it and does the I/O, so no thread of the client waits on the
+disk. Configured in the [Logging] section of settings.ini::
+
+    [Logging]
+    level = INFO
+    file = nanotorrent.log
+    console = true
+    format = json
+    max_bytes = 10485760
+    rotate_hours = 24
+    backup_count = 5
+
+The file is rotated when it reaches ``max_bytes`` or is ``rotate_hours``
+old, whichever comes first; 0 turns either off. ``format = json`` writes
+one JSON object per line, with any ``extra`` fields of the record.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
 import logging
+import logging.handlers
+from modules.utils.settings_handler import DEFAULT_SETTINGS
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_settings = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a single line of JSON."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Put records on the queue as they are.
+
+    The stock handler formats and copies every record on the calling
+    thread; here only the message arguments are merged, and formatting is
+    left to the writer thread.
+    """
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class RotatingLogHandler(logging.handlers.RotatingFileHandler):
+    """A RotatingFileHandler that also rolls the file over every ``interval`` seconds."""
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, interval=0):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval = interval
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self):
+        if not self.interval:
+            return None
+        try:
+            opened = os.path.getmtime(self.baseFilename)
+        except OSError:
+            opened = time.time()
+        return min(opened, time.time()) + self.interval
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+
+def _option(settings, option):
+    """Return a [Logging] option, from the defaults if there are no settings."""
+    return settings.get("Logging", option) if settings is not None else DEFAULT_SETTINGS["Logging"][option]
+
+
+def _int_option(settings, option):
+    try:
+        return int(_option(settings, option))
+    except ValueError:
+        return int(DEFAULT_SETTINGS["Logging"][option])
+
+
+def _handlers(settings):
+    """Build the terminal and file handlers described by the [Logging] settings."""
+    formatter = JsonFormatter() if _option(settings, "format") == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    if settings is None or settings.get_bool("Logging", "console", True):
+        handlers.append(logging.StreamHandler(sys.stderr))
+    if _option(settings, "file"):
+        handlers.append(RotatingLogHandler(
+            _option(settings, "file"),
+            max_bytes=_int_option(settings, "max_bytes"),
+            backup_count=_int_option(settings, "backup_count"),
+            interval=_int_option(settings, "rotate_hours") * 3600,
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def setup_logging(settings=None):
+    """
+    Route the root logger through a queue to the terminal and the log file.
+
+    Without settings the [Logging] defaults are used. Calling it again
+    replaces the previous handlers; given a SettingsHandler, it also
+    follows later changes of the [Logging] section.
+    """
+    global _listener, _settings
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, *_handlers(settings), respect_handler_level=True)
+    listener.start()
+
+    # Swap in the new queue before stopping the old writer, which then drains what is left
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(records))
+    level = logging.getLevelName(_option(settings, "level").upper())
+    root.setLevel(level if isinstance(level, int) else logging.INFO)
+    stop_logging()
+    _listener = listener
+
+    if settings is not None and settings is not _settings:
+        _settings = settings
+        settings.subscribe(_on_settings_changed)
+    return listener
+
+
+def _on_settings_changed(changes):
+    if any(section == "Logging" for section, _ in changes):
+        setup_logging(_settings)
+
+
+def stop_logging():
+    """Write out the queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
 
-def setup_logging():
-    """Set up logging to both terminal and a log file."""
-    logging.basicConfig(
-        level=logging.INFO,  # Set the logging level
-        format="%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
-        handlers=[
-            logging.StreamHandler(),  # Log to terminal
-            logging.FileHandler("nanotorrent.log", mode="a")  # Log to file
-        ]
-    )
-
-# Call setup_logging at the start of the program
-setup_logging()
+atexit.register(stop_logging)
@@ -1,11 +1,108 @@
 import configparser
+import logging
 import os
+import threading
+
+SAVE_DELAY = 0.5     # seconds to coalesce settings changes into one write
+WATCH_INTERVAL = 2.0  # seconds between checks of the settings file
+
+
+DEFAULT_SETTINGS = {
+    "Downloads": {
+        "download_path": "",
+        "watch_folder": "",         # .torrent and .magnet files dropped here are added; empty disables
+        "watch_interval": "2",      # seconds between watch folder scans
+    },
+    "Speed": {
+        "max_download_speed": "0",  # 0 means no limit
+        "max_upload_speed": "0",    # 0 means no limit
+    },
+    "Session": {
+        "profile": "desktop",       # desktop, seedbox or low_memory; other keys override libtorrent settings
+    },
+    "Bandwidth": {
+        "classes": "high:4, normal:2, low:1",  # name:weight
+        "default_class": "normal",
+        "plans": "",                # name=download/upload bytes/s, e.g. business=500000/100000
+        "schedule": "",             # e.g. mon-fri 09:00-18:00 business; sat,sun 01:00-07:00 night
+    },
+    "Queue": {
+        "active_downloads": "3",
+        "active_seeds": "5",
+        "active_limit": "500",
+        "dont_count_slow_torrents": "true",
+        "slow_download_rate": "2048",   # bytes/s below which a torrent does not take a slot
+        "slow_upload_rate": "2048",
+        "ratio_limit": "0",         # stop seeding at this upload ratio; 0 means never
+        "seed_time_limit": "0",     # stop seeding after this many minutes; 0 means never
+    },
+    "Streaming": {
+        "host": "127.0.0.1",
+        "port": "8090",             # 0 picks a free port
+        "read_ahead": "8388608",    # bytes requested with deadlines ahead of the playback position
+        "deadline": "500",          # milliseconds to fetch the next piece; later pieces get multiples
+        "timeout": "60",            # seconds a request waits for a piece before it is dropped
+    },
+    "Storage": {
+        "allocation": "sparse",     # sparse or full; [Storage:<path>] sections override per save path
+        "part_file": "keep",        # keep, or remove on torrent removal
+        "move_concurrency": "2",    # finished torrents moved at once; renames go ahead of copies across filesystems
+        "move_retries": "3",
+    },
+    "Verify": {
+        "workers": "0",             # hashing processes; 0 means one per CPU
+        "rate_limit": "0",          # MB/s read across all workers; 0 means unlimited
+    },
+    "History": {
+        "seconds": "120",           # rate samples kept at 1 s resolution, read at startup
+        "minutes": "180",           # at 1 min resolution
+        "hours": "24",              # at 1 h resolution
+    },
+    "Logging": {
+        "level": "INFO",
+        "file": "nanotorrent.log",  # empty logs to the terminal only
+        "console": "true",          # also log to the terminal
+        "format": "text",           # text, or json for one JSON object per line
+        "max_bytes": "10485760",    # rotate the file at this size; 0 means never
+        "rotate_hours": "24",       # rotate the file this often; 0 means never
+        "backup_count": "5",        # rotated files kept
+        "alert_categories": "",     # extra libtorrent alert categories to log, e.g. peer, block_progress
+        "alert_sample_rate": "20",  # alerts of one type logged per second before its categories are muted until the next second
+    },
+    "Shards": {
+        "count": "0",               # daemon sessions in worker processes, torrents spread by info-hash; 0 runs one in-process
+        "directory": "shards",      # each shard keeps its settings, torrents.db and log in a numbered folder here
+    },
+    "API": {
+        "enabled": "false",
+        "host": "127.0.0.1",
+        "port": "8089",
+        "unix_socket": "",          # overrides host/port when set
+    },
+}
 
 
 class SettingsHandler:
+    """
+    Settings cached in memory and backed by an INI file.
+
+    Reads never touch the file. Changes are coalesced: ``set`` marks the
+    settings dirty and a single atomic write (temporary file and rename)
+    follows ``SAVE_DELAY`` seconds later, or immediately on ``flush``.
+    ``watch`` polls the file's modification time and reloads it when it is
+    edited by hand. Both kinds of changes are pushed to the callbacks
+    registered with ``subscribe`` as ``{(section, option): value}``.
+    """
+
     def __init__(self, file_name):
         self.file_name = file_name
         self.config = configparser.ConfigParser()
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._save_timer = None
+        self._mtime = None
+        self._stop_watching = threading.Event()
+        self._watch_thread = None
 
         # Ensure the settings file exists
         if not os.path.exists(self.file_name):
@@ -15,59 +112,170 @@ class SettingsHandler:
 
     def _create_default_settings(self):
         """Create default settings and save them to the file."""
-        self.config["Downloads"] = {"download_path": ""}
-        self.config["Speed"] = {
-            "max_download_speed": "0",  # 0 means no limit
-            "max_upload_speed": "0",    # 0 means no limit
-        }
+        for section, options in DEFAULT_SETTINGS.items():
+            self.config[section] = dict(options)
         self.save()
 
     def _load_settings(self):
         """Load settings from the file, ensuring all sections and options exist."""
         try:
             self.config.read(self.file_name)
+            self._mtime = self._file_mtime()
 
             # Validate and add missing sections or options
-            if "Downloads" not in self.config:
-                self.config["Downloads"] = {"download_path": ""}
-            if "Speed" not in self.config:
-                self.config["Speed"] = {
-                    "max_download_speed": "0",
-                    "max_upload_speed": "0",
-                }
-            else:
-                # Add missing keys to existing Speed section
-                if "max_download_speed" not in self.config["Speed"]:
-                    self.config["Speed"]["max_download_speed"] = "0"
-                if "max_upload_speed" not in self.config["Speed"]:
-                    self.config["Speed"]["max_upload_speed"] = "0"
-
-            self.save()  # Save updated settings if any defaults were added
+            if self._add_missing_defaults(self.config):
+                self.save()  # Only rewrite the file if defaults were added
         except configparser.Error as e:
-            print(f"Error loading configuration file: {e}")
+            logging.error(f"Failed to load {self.file_name}, using the defaults. Error: {e}")
+            self.config = configparser.ConfigParser()
             self._create_default_settings()
 
+    @staticmethod
+    def _add_missing_defaults(config):
+        """Add missing default sections and options to a parser; return True if any were added."""
+        added = False
+        for section, options in DEFAULT_SETTINGS.items():
+            if section not in config:
+                config[section] = {}
+            for option, value in options.items():
+                if option not in config[section]:
+                    config[section][option] = value
+                    added = True
+        return added
+
     def get(self, section, option):
-        """Get a value from the settings file."""
+        """Get a value from the settings."""
+        with self._lock:
+            try:
+                return self.config.get(section, option)
+            except (configparser.NoSectionError, configparser.NoOptionError):
+                return DEFAULT_SETTINGS.get(section, {}).get(option, "")
+
+    def get_int(self, section, option, default=0):
+        """Get an integer value, or ``default`` if it is missing or invalid."""
         try:
-            return self.config.get(section, option)
-        except (configparser.NoSectionError, configparser.NoOptionError):
-            # Add missing section/option with default value
-            self.set(section, option, "")
-            return ""
+            return int(self.get(section, option))
+        except ValueError:
+            return default
+
+    def get_bool(self, section, option, default=False):
+        """Get a boolean value, or ``default`` if it is missing or invalid."""
+        value = self.get(section, option).strip().lower()
+        if value in ("1", "true", "yes", "on"):
+            return True
+        if value in ("0", "false", "no", "off"):
+            return False
+        return default
+
+    def options(self, section):
+        """Return every option of a section as a dictionary."""
+        with self._lock:
+            if section not in self.config:
+                return {}
+            return dict(self.config[section])
+
+    def sections(self):
+        """Return the names of every section."""
+        with self._lock:
+            return self.config.sections()
 
     def set(self, section, option, value):
-        """Set a value in the settings file."""
-        if section not in self.config:
-            self.config[section] = {}
-        self.config[section][option] = value
+        """Set a value; the file is written shortly after the last change."""
+        with self._lock:
+            if section not in self.config:
+                self.config[section] = {}
+            if self.config[section].get(option) == value:
+                return
+            self.config[section][option] = value
+            self._schedule_save()
+        self._notify({(section, option): value})
+
+    def subscribe(self, callback):
+        """Call ``callback(changes)`` with ``{(section, option): value}`` whenever settings change."""
+        self._subscribers.append(callback)
+
+    def _notify(self, changes):
+        for callback in self._subscribers:
+            try:
+                callback(changes)
+            except Exception as e:
+                logging.error(f"Settings subscriber failed. Error: {e}")
+
+    def _schedule_save(self):
+        """Restart the coalescing timer; called with the lock held."""
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+        self._save_timer = threading.Timer(SAVE_DELAY, self.save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def flush(self):
+        """Write pending changes now."""
+        with self._lock:
+            if self._save_timer is None:
+                return
         self.save()
 
     def save(self):
-        """Save the current settings to the file."""
+        """Save the current settings to the file atomically."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            temp_file = f"{self.file_name}.tmp"
+            try:
+                with open(temp_file, "w") as f:
+                    self.config.write(f)
+                os.replace(temp_file, self.file_name)
+                self._mtime = self._file_mtime()
+            except OSError as e:
+                logging.error(f"Failed to save {self.file_name}. Error: {e}")
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.file_name).st_mtime_ns
+        except OSError:
+            return None
+
+    def watch(self, interval=WATCH_INTERVAL):
+        """Reload the file and notify subscribers when it changes on disk."""
+        if self._watch_thread is not None:
+            return
+        self._stop_watching.clear()
+        self._watch_thread = threading.Thread(target=self._watch, args=(interval,), name="settings-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def _watch(self, interval):
+        while not self._stop_watching.wait(interval):
+            mtime = self._file_mtime()
+            # A pending save overwrites the file anyway; local changes win
+            if mtime is not None and mtime != self._mtime and self._save_timer is None:
+                self.reload()
+
+    def reload(self):
+        """Re-read the file and notify subscribers of the values that differ."""
+        config = configparser.ConfigParser()
         try:
-            with open(self.file_name, "w") as f:
-                self.config.write(f)
-        except OSError as e:
-            print(f"Error saving configuration file: {e}")
+            config.read(self.file_name)
+        except configparser.Error as e:
+            logging.warning(f"Ignoring invalid settings file {self.file_name}. Error: {e}")
+            self._mtime = self._file_mtime()
+            return
+        self._add_missing_defaults(config)
+
+        with self._lock:
+            old = {(section, option): value for section in self.config.sections() for option, value in self.config[section].items()}
+            new = {(section, option): value for section in config.sections() for option, value in config[section].items()}
+            self.config = config
+            self._mtime = self._file_mtime()
+        changes = {key: value for key, value in new.items() if old.get(key) != value}
+        changes.update({key: "" for key in old.keys() - new.keys()})
+        if changes:
+            logging.info(f"Reloaded {self.file_name}: {', '.join(f'{s}.{o}' for s, o in sorted(changes))}")
+            self._notify(changes)
 
+    def close(self):
+        """Stop watching the file and write pending changes."""
+        self._stop_watching.set()
+        self._watch_thread = None
+        self.flush()
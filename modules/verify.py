@@ -0,0 +1,78 @@
+"""
+Verify downloaded data without running the client.
+
+Hashes a torrent's pieces from disk and prints a JSON report of the bad
+pieces and files; the exit status is 1 if any piece is bad. A torrent is
+given as a .torrent file and the directory holding its data, or as the
+info-hash of a torrent in the torrent store::
+
+    python verify.py movie.torrent --save-path /data/downloads
+    python verify.py --info-hash <hash> --resume --workers 2 --rate-limit 80
+
+``--resume`` stores the result as the torrent's resume data, so the next
+start takes the verified pieces without a re-check. Do not use it while
+the client is running: it would overwrite the resume data on exit.
+"""
+import sys
+import json
+import argparse
+import libtorrent as lt
+from modules.core.torrent_store import TorrentStore
+from modules.core.resume_data import ResumeDataManager
+from modules.core.verifier import verify, have_pieces
+from modules.utils.settings_handler import SettingsHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify downloaded torrent data from disk.")
+    parser.add_argument("torrent", nargs="?", help="path to a .torrent file")
+    parser.add_argument("--info-hash", help="verify a torrent of the torrent store instead")
+    parser.add_argument("--save-path", help="directory holding the data, by default the stored save path")
+    parser.add_argument("--store", default="torrents.db", help="path to the torrent store")
+    parser.add_argument("--settings", default="settings.ini", help="path to the settings file")
+    parser.add_argument("--workers", type=int, help="hashing processes, by default [Verify] workers")
+    parser.add_argument("--rate-limit", type=int, help="MB/s read across all workers, by default [Verify] rate_limit")
+    parser.add_argument("--resume", action="store_true", help="store the verified pieces as resume data")
+    args = parser.parse_args()
+    if bool(args.torrent) == bool(args.info_hash):
+        parser.error("give either a .torrent file or --info-hash")
+    if args.resume and not args.info_hash:
+        parser.error("--resume needs --info-hash")
+
+    settings = SettingsHandler(args.settings)
+    workers = args.workers if args.workers is not None else settings.get_int("Verify", "workers", 0)
+    rate_limit = args.rate_limit if args.rate_limit is not None else settings.get_int("Verify", "rate_limit", 0)
+    settings.close()
+
+    store = row = None
+    if args.info_hash:
+        store = TorrentStore(args.store)
+        row = store.get(args.info_hash)
+        if row is None or row["torrent"] is None:
+            parser.error(f"no metadata stored for {args.info_hash}")
+        info = lt.torrent_info(lt.bdecode(row["torrent"]))
+    else:
+        info = lt.torrent_info(args.torrent)
+    save_path = args.save_path or (row["save_path"] if row is not None else None)
+    if not save_path:
+        parser.error("--save-path is required with a .torrent file")
+
+    try:
+        report = verify(info, save_path, workers=workers, rate_limit=rate_limit * 1024 * 1024)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.resume:
+        params = ResumeDataManager(store).params(row)
+        params.save_path = save_path
+        params.have_pieces = have_pieces(info.num_pieces(), report["bad_pieces"])
+        params.unfinished_pieces = {}
+        store.save_resume(args.info_hash, lt.write_resume_data_buf(params))
+    if store is not None:
+        store.close()
+
+    print(json.dumps(report, indent=4))
+    sys.exit(1 if report["bad_pieces"] else 0)
+
+
+if __name__ == "__main__":
+    main()
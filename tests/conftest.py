@@ -0,0 +1,37 @@
+"""
+Shared fixtures: a session that only talks to 127.0.0.1, in a temporary working directory.
+
+Run from the repository root with ``python -m pytest``.
+"""
+import pytest
+from modules.core.torrent_manager import TorrentManager
+from modules.utils.settings_handler import SettingsHandler
+from benchmarks.swarm import make_content, make_torrent, loopback
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    """Loopback settings in an empty working directory, where the session keeps its files."""
+    monkeypatch.chdir(tmp_path)
+    settings = loopback(SettingsHandler("settings.ini"))
+    settings.set("Streaming", "port", "0")
+    settings.set("Logging", "console", "false")
+    settings.set("Downloads", "download_path", str(tmp_path / "downloads"))
+    yield settings
+    settings.close()
+
+
+@pytest.fixture
+def torrentmanager(settings):
+    """A loaded TorrentManager over the loopback settings."""
+    torrentmanager = TorrentManager(settings)
+    assert torrentmanager.loaded.wait(10)
+    yield torrentmanager
+    torrentmanager.stop()
+
+
+@pytest.fixture
+def torrent_file(tmp_path):
+    """A .torrent of 256 kB of random data in 16 kB pieces; the data is under tmp_path/content."""
+    content = make_content(str(tmp_path / "content"), "item", 256 * 1024)
+    return make_torrent(content, str(tmp_path / "item.torrent"), piece_size=16 * 1024)
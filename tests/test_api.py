@@ -0,0 +1,81 @@
+import json
+import time
+import urllib.request
+import pytest
+from modules.api.server import ApiServer
+
+
+@pytest.fixture
+def api(torrentmanager, tmp_path):
+    server = ApiServer(torrentmanager, port=0, default_save_path=str(tmp_path / "content"))
+    assert server.start()
+    yield f"http://127.0.0.1:{server.port}"
+    server.stop()
+
+
+def rpc(base, method, params=None):
+    request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or {}}
+    data = json.dumps(request).encode()
+    with urllib.request.urlopen(urllib.request.Request(f"{base}/rpc", data, {"Content-Type": "application/json"})) as response:
+        reply = json.loads(response.read())
+    assert "error" not in reply, reply
+    return reply["result"]
+
+
+def poll(base, since, timeout=5):
+    with urllib.request.urlopen(f"{base}/poll?since={since}&timeout={timeout}", timeout=timeout + 5) as response:
+        return json.loads(response.read())
+
+
+def poll_until(base, since, predicate, timeout=10):
+    """Poll from ``since`` until a delta matches ``predicate``; return it and the last sequence."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        reply = poll(base, since, timeout=1)
+        since = reply["seq"]
+        for torrent in reply["torrents"]:
+            if predicate(torrent):
+                return torrent, since
+    pytest.fail("no matching delta was published")
+
+
+def test_first_poll_returns_snapshot_without_waiting(api):
+    start = time.monotonic()
+    reply = poll(api, 0, timeout=30)
+    assert time.monotonic() - start < 5
+    assert reply["full"] is True
+    assert reply["torrents"] == []
+    # The snapshot's sequence is one to wait from, not another request for a snapshot
+    start = time.monotonic()
+    assert poll(api, reply["seq"], timeout=1) == {"seq": reply["seq"], "full": False, "torrents": []}
+    assert time.monotonic() - start >= 1
+
+
+def test_rpc_add_and_remove_reach_long_poll(api, torrent_file):
+    seq = poll(api, 0)["seq"]
+    [added] = rpc(api, "torrent.add", {"torrents": [{"file": torrent_file}]})
+    info_hash = added["info_hash"]
+
+    torrent, seq = poll_until(api, seq, lambda torrent: torrent["info_hash"] == info_hash)
+    assert not torrent.get("removed")
+    assert [entry["info_hash"] for entry in rpc(api, "torrent.list")] == [info_hash]
+
+    assert rpc(api, "torrent.remove", {"info_hashes": [info_hash]}) == [info_hash]
+    torrent, seq = poll_until(api, seq, lambda torrent: torrent["info_hash"] == info_hash and torrent.get("removed"))
+    assert torrent == {"info_hash": info_hash, "removed": True}
+    assert poll(api, 0)["torrents"] == []
+
+
+def test_failed_bind_does_not_subscribe(torrentmanager, api):
+    port = int(api.rsplit(":", 1)[1])
+    server = ApiServer(torrentmanager, port=port)
+    assert not server.start()
+    assert isinstance(server.error, OSError)
+    assert server._on_statuses not in torrentmanager._status_callbacks
+    server.stop()
+
+
+def test_rpc_add_reports_duplicates(api, torrent_file):
+    [added] = rpc(api, "torrent.add", {"torrents": [{"file": torrent_file}]})
+    assert "info_hash" in added
+    assert rpc(api, "torrent.add", {"torrents": [{"file": torrent_file}]}) == [{"error": "already added"}]
@@ -0,0 +1,43 @@
+from datetime import datetime
+from modules.core.bandwidth import allocate
+
+MONDAY = datetime(2026, 10, 12)
+SUNDAY = datetime(2026, 10, 18)
+
+
+def rate_limits(torrentmanager):
+    pack = torrentmanager.session_manager.get_session().get_settings()
+    return pack["download_rate_limit"], pack["upload_rate_limit"]
+
+
+def test_allocate_redistributes_what_satisfied_torrents_leave():
+    limits = allocate(300, {"a": None, "b": None, "c": 50}, {"a": 2, "b": 1, "c": 1})
+    assert limits == {"a": 166, "b": 83, "c": 50}
+
+
+def test_scheduler_switches_plans_on_its_clock(settings, torrentmanager):
+    now = MONDAY.replace(hour=8, minute=59)
+    scheduler = torrentmanager.bandwidth
+    scheduler.clock = lambda: now
+    plans = []
+    scheduler.add_plan_callback(lambda name, download_limit, upload_limit: plans.append(name))
+    settings.set("Bandwidth", "plans", "business=500000/100000, night=0/0")
+    settings.set("Bandwidth", "schedule", "mon-fri 09:00-18:00 business; sat,sun 01:00-07:00 night")
+    assert scheduler.plan.name == "default"
+    assert scheduler.status()["next_change"] == "2026-10-12T09:00"
+
+    now = MONDAY.replace(hour=9)
+    scheduler.tick()
+    assert scheduler.plan.name == "business"
+    assert rate_limits(torrentmanager) == (500000, 100000)
+    assert scheduler.status()["next_change"] == "2026-10-12T18:00"
+
+    now = MONDAY.replace(hour=18)
+    scheduler.tick()
+    assert scheduler.plan.name == "default"
+    assert rate_limits(torrentmanager) == (0, 0)
+
+    now = SUNDAY.replace(hour=6, minute=59)
+    scheduler.tick()
+    assert scheduler.plan.name == "night"
+    assert plans[-3:] == ["business", "default", "night"]
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+from modules.core.file_manager import FileManager, RETRY_DELAY
+
+
+class Handle:
+    """A torrent handle whose move_storage records the target, or raises ``fail`` times first."""
+
+    def __init__(self, info_hash, fail=0):
+        self.info_hashes = SimpleNamespace(get_best=lambda: info_hash)
+        self.fail = fail
+        self.moved_to = None
+
+    def move_storage(self, target, flags):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("invalid torrent handle")
+        self.moved_to = target
+
+
+def moved(handle):
+    return SimpleNamespace(handle=handle, torrent_name=handle.info_hashes.get_best(), storage_path=lambda: handle.moved_to)
+
+
+def manager(max_concurrent=1, max_retries=2):
+    events = []
+    now = [0.0]
+    file_manager = FileManager(max_concurrent, max_retries, clock=lambda: now[0])
+    file_manager.add_progress_callback(lambda info_hash, event, active, queued: events.append((info_hash, event)))
+    return file_manager, events, now
+
+
+def incomplete(folder):
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / ".incomplete"
+    path.mkdir()
+    return str(path)
+
+
+def test_renames_wait_for_a_slot_in_order(tmp_path):
+    file_manager, _, _ = manager(max_concurrent=1)
+    handles = [Handle(name) for name in "abc"]
+    for handle in handles:
+        file_manager.move_completed_torrent(handle, incomplete(tmp_path / handle.info_hashes.get_best()), "item")
+
+    assert [handle.moved_to is not None for handle in handles] == [True, False, False]
+    assert file_manager.pending() == (1, 2)
+    file_manager.on_storage_moved(moved(handles[0]))
+    assert [handle.moved_to is not None for handle in handles] == [True, True, False]
+    file_manager.on_storage_moved(moved(handles[1]))
+    assert handles[2].moved_to == str(tmp_path / "c")
+    assert file_manager.pending() == (1, 0)
+
+
+def test_rename_starts_before_a_queued_copy(tmp_path, monkeypatch):
+    # Folders named "copy" count as another filesystem
+    monkeypatch.setattr(FileManager, "_same_filesystem", staticmethod(lambda source, target: "copy" not in source))
+    file_manager, events, _ = manager(max_concurrent=1)
+    first, copy, rename = Handle("a"), Handle("b"), Handle("c")
+    file_manager.move_completed_torrent(first, incomplete(tmp_path / "first"), "first")
+    file_manager.move_completed_torrent(copy, incomplete(tmp_path / "copy"), "copy")
+    file_manager.move_completed_torrent(rename, incomplete(tmp_path / "rename"), "rename")
+
+    file_manager.on_storage_moved(moved(first))
+    assert (copy.moved_to, rename.moved_to) == (None, str(tmp_path / "rename"))
+    file_manager.on_storage_moved(moved(rename))
+    assert copy.moved_to == str(tmp_path / "copy")
+    assert [info_hash for info_hash, event in events if event == "moving"] == ["a", "c", "b"]
+
+
+def test_rename_that_fails_to_start_is_retried_after_a_delay(tmp_path):
+    file_manager, events, now = manager(max_retries=2)
+    handle = Handle("a", fail=1)
+    file_manager.move_completed_torrent(handle, incomplete(tmp_path), "item")
+
+    assert handle.moved_to is None
+    assert events == [("a", "queued"), ("a", "retrying")]
+    assert file_manager.pending() == (0, 1)
+    now[0] = RETRY_DELAY - 0.1
+    file_manager.tick()
+    assert handle.moved_to is None
+    now[0] = RETRY_DELAY
+    file_manager.tick()
+    assert handle.moved_to == str(tmp_path)
+    assert events[-1] == ("a", "moving")
+
+
+def test_rename_that_keeps_failing_backs_off_and_is_reported(tmp_path, caplog):
+    file_manager, events, now = manager(max_retries=2)
+    file_manager.move_completed_torrent(Handle("a", fail=5), incomplete(tmp_path), "item")
+
+    # The second retry waits twice as long as the first
+    for delay in (RETRY_DELAY, 2 * RETRY_DELAY):
+        now[0] += delay - 0.1
+        file_manager.tick()
+        assert events[-1] == ("a", "retrying")
+        now[0] += 0.1
+        file_manager.tick()
+    assert events[-1] == ("a", "failed")
+    assert [event for _, event in events].count("retrying") == 2
+    assert file_manager.pending() == (0, 0)
+    assert "Failed to move completed torrent: item" in caplog.text
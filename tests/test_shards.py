@@ -0,0 +1,57 @@
+import os
+import time
+import pytest
+from modules.core.shards import ShardedTorrentManager, shard_of
+from modules.core.torrent_store import TorrentStore
+from benchmarks.swarm import make_library
+
+TORRENTS = 8
+
+
+def start(settings, shards):
+    torrentmanager = ShardedTorrentManager(settings, shards)
+    assert torrentmanager.loaded.wait(60)
+    return torrentmanager
+
+
+def wait_placed(torrentmanager, info_hashes, shards, timeout=30):
+    """Wait until every torrent reports from the shard its info-hash maps to; return the owners."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        owners = {info_hash: torrentmanager.owner(info_hash) for info_hash in info_hashes}
+        if all(owner == shard_of(info_hash, shards) for info_hash, owner in owners.items()):
+            break
+        time.sleep(0.1)
+    return owners
+
+
+@pytest.fixture
+def library(tmp_path):
+    return make_library(str(tmp_path), TORRENTS)
+
+
+def test_torrents_follow_the_shard_count(settings, tmp_path, library):
+    save_path = str(tmp_path / "content")
+    torrentmanager = start(settings, 3)
+    try:
+        info_hashes = [torrentmanager.add_torrent(path, save_path, seed=True) for path in library]
+        owners = wait_placed(torrentmanager, info_hashes, 3)
+        assert owners == {info_hash: shard_of(info_hash, 3) for info_hash in info_hashes}
+    finally:
+        torrentmanager.stop()
+
+    for shards in (2, 4):
+        torrentmanager = start(settings, shards)
+        try:
+            owners = wait_placed(torrentmanager, info_hashes, shards)
+            assert owners == {info_hash: shard_of(info_hash, shards) for info_hash in info_hashes}
+            assert len(torrentmanager.get_torrents()) == TORRENTS
+        finally:
+            torrentmanager.stop()
+        # Shards beyond the count hand their torrents over and are left empty
+        for index in range(shards, 3):
+            store = TorrentStore(os.path.join("shards", str(index), "torrents.db"))
+            try:
+                assert store.info_hashes() == []
+            finally:
+                store.close()
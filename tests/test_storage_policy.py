@@ -0,0 +1,21 @@
+import libtorrent as lt
+from modules.core.storage_policy import StoragePolicy
+
+
+def test_longest_matching_section_wins(settings):
+    settings.set("Storage:/mnt", "allocation", "full")
+    settings.set("Storage:/mnt/xfs", "part_file", "remove")
+    policy = StoragePolicy(settings)
+
+    assert policy.for_path("/mnt/xfs/films") == {"allocation": "full", "part_file": "remove"}
+    assert policy.for_path("/mnt/xfs2") == {"allocation": "full", "part_file": "keep"}
+    assert policy.for_path("/home") == {"allocation": "sparse", "part_file": "keep"}
+    assert policy.remove_options("/mnt/xfs/films") == lt.session.delete_partfile
+
+
+def test_part_files_cannot_be_turned_off(settings):
+    settings.set("Storage", "part_file", "off")
+    policy = StoragePolicy(settings)
+
+    assert policy.for_path("/data")["part_file"] == "keep"
+    assert policy.remove_options("/data") == 0
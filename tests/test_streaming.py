@@ -0,0 +1,104 @@
+import os
+import time
+import threading
+import urllib.request
+import libtorrent as lt
+import pytest
+from modules.core.streaming import parse_range, StreamError, TorrentStream
+from benchmarks.swarm import Seeder, make_content, make_torrent
+
+
+@pytest.fixture
+def swarm(tmp_path):
+    """A loopback seeder of two 192 kB files in 16 kB pieces; yields it, the .torrent and the content folder."""
+    content = make_content(str(tmp_path / "seed"), "video", 384 * 1024, files=2)
+    torrent = make_torrent(content, str(tmp_path / "video.torrent"), piece_size=16 * 1024)
+    seeder = Seeder(torrent, os.path.dirname(content))
+    assert seeder.wait_seeding()
+    yield seeder, torrent, content
+
+
+def wait_for_handle(torrentmanager, info_hash, timeout=10):
+    deadline = time.monotonic() + timeout
+    while torrentmanager.get_handle(info_hash) is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return torrentmanager.get_handle(info_hash)
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=500-5000", 1000) == (500, 999)
+    assert parse_range("bytes=1000-", 1000) is None
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+
+
+class Handle:
+    """A torrent handle that records piece deadlines and never delivers a piece."""
+
+    def __init__(self):
+        self.deadlines = []
+
+    def get_file_priorities(self):
+        return []
+
+    def flags(self):
+        return lt.torrent_flags.auto_managed
+
+    def set_piece_deadline(self, piece, deadline, flags):
+        self.deadlines.append(piece)
+
+
+def test_timed_out_piece_is_requested_again(swarm):
+    _, torrent, _ = swarm
+    handle = Handle()
+    stream = TorrentStream(handle, lt.torrent_info(torrent), deadline=500, read_ahead=16 * 1024)
+    for _ in range(2):
+        with pytest.raises(StreamError):
+            stream.read(0, 100, timeout=0.05)
+    assert handle.deadlines == [0, 0]
+
+
+def test_stopping_restores_a_paused_torrent(tmp_path, torrentmanager, swarm):
+    _, torrent, _ = swarm
+    info_hash = torrentmanager.add_torrent(torrent, str(tmp_path / "downloads"))
+    handle = wait_for_handle(torrentmanager, info_hash)
+    torrentmanager.pause_torrent(info_hash)
+    deadline = time.monotonic() + 10
+    while not torrentmanager.is_paused(info_hash) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    torrentmanager.streams.start(info_hash)
+    assert not handle.flags() & lt.torrent_flags.paused
+    torrentmanager.streams.stop(info_hash)
+    flags = handle.flags()
+    assert flags & lt.torrent_flags.paused
+    assert not flags & lt.torrent_flags.auto_managed
+
+
+def test_range_request_waits_for_the_pieces_it_covers(tmp_path, torrentmanager, swarm):
+    seeder, torrent, content = swarm
+    info_hash = torrentmanager.add_torrent(torrent, str(tmp_path / "downloads"))
+    handle = wait_for_handle(torrentmanager, info_hash)
+    files = lt.torrent_info(torrent).files()
+    index = [files.file_name(index) for index in range(files.num_files())].index("file-0001.bin")
+    url = torrentmanager.streams.start(info_hash, index)
+
+    # Nothing is downloaded yet: the request blocks on its piece deadlines until a peer serves them
+    responses = []
+    request = urllib.request.Request(url, headers={"Range": "bytes=20000-70000"})
+    reader = threading.Thread(target=lambda: responses.append(urllib.request.urlopen(request, timeout=30)))
+    reader.start()
+    time.sleep(0.5)
+    assert handle.status().total_done == 0
+    handle.connect_peer(("127.0.0.1", seeder.port))
+    reader.join(30)
+
+    [response] = responses
+    with open(os.path.join(content, "file-0001.bin"), "rb") as f:
+        expected = f.read()
+    assert response.status == 206
+    assert response.headers["Content-Range"] == f"bytes 20000-70000/{len(expected)}"
+    assert response.read() == expected[20000:70001]
+    assert handle.status().flags & lt.torrent_flags.sequential_download
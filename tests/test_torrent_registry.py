@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+from modules.core.torrent_registry import TorrentRegistry
+
+
+def status(info_hash, name, save_path="/data", state=3):
+    return SimpleNamespace(
+        info_hashes=SimpleNamespace(get_best=lambda: info_hash),
+        name=name, save_path=save_path, state=state,
+    )
+
+
+def test_search_matches_word_prefixes():
+    registry = TorrentRegistry()
+    registry.add("a", object(), status("a", "Ubuntu 24.04 Desktop"))
+    registry.add("b", object(), status("b", "ubuntu-server"))
+    registry.add("c", object(), status("c", "Debian"))
+
+    assert registry.select(search="ubu") == ["a", "b"]
+    assert registry.select(search="ubuntu desk") == ["a"]
+    assert registry.select(search="deb") == ["c"]
+    assert registry.select(search="buntu") == []
+
+
+def test_search_follows_renames_and_removals():
+    registry = TorrentRegistry()
+    registry.add("a", object(), status("a", "Ubuntu"))
+    registry.add("b", object(), status("b", "Ubuntu"))
+    assert registry.select(search="ubuntu") == ["a", "b"]
+
+    registry.update([status("a", "Fedora")])
+    registry.remove("b")
+    assert registry.select(search="ubuntu") == []
+    assert registry.select(search="fed") == ["a"]
+
+
+def test_save_path_filter_stops_at_folder_boundaries():
+    registry = TorrentRegistry()
+    registry.add("a", object(), status("a", "one", save_path="/data"))
+    registry.add("b", object(), status("b", "two", save_path="/data/films"))
+    registry.add("c", object(), status("c", "three", save_path="/data2"))
+
+    assert registry.select(save_path="/data") == ["a", "b"]
+    assert registry.select(save_path="/data/") == ["a", "b"]
+    assert registry.select(save_path="/data/films") == ["b"]
+    assert registry.select(save_path="/dat") == []
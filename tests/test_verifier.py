@@ -0,0 +1,77 @@
+import os
+import time
+import libtorrent as lt
+import pytest
+from modules.core.verifier import verify, have_pieces
+from benchmarks.swarm import make_content, make_torrent
+
+PIECE = 16 * 1024
+
+
+@pytest.fixture
+def fixture_torrent(tmp_path):
+    """A hybrid torrent of three 100 kB files in 16 kB pieces, with pad files; returns its info and save path."""
+    content = make_content(str(tmp_path / "data"), "album", 300 * 1024, files=3)
+    torrent = make_torrent(content, str(tmp_path / "album.torrent"), piece_size=PIECE)
+    return lt.torrent_info(torrent), os.path.dirname(content)
+
+
+def file_index(info, name):
+    files = info.files()
+    return [files.file_name(index) for index in range(files.num_files())].index(name)
+
+
+def corrupt(info, save_path, name, offset):
+    """Flip a byte of a file and return the piece that holds it."""
+    with open(os.path.join(save_path, "album", name), "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    return (info.files().file_offset(file_index(info, name)) + offset) // PIECE
+
+
+def test_intact_data_verifies(fixture_torrent):
+    info, save_path = fixture_torrent
+    report = verify(info, save_path, workers=2)
+    assert report["pieces"] == info.num_pieces()
+    assert report["bad_pieces"] == report["bad_files"] == report["missing_files"] == []
+    assert report["bytes"] == 300 * 1024 + len("album-0album-1album-2")
+
+
+def test_corrupt_and_missing_files_are_reported(fixture_torrent):
+    info, save_path = fixture_torrent
+    bad = corrupt(info, save_path, "file-0000.bin", 40000)
+    os.remove(os.path.join(save_path, "album", "file-0002.bin"))
+
+    report = verify(info, save_path, workers=2)
+    first, last = (
+        info.files().file_offset(file_index(info, "file-0002.bin")) // PIECE,
+        info.num_pieces() - 1,
+    )
+    assert report["bad_pieces"] == [bad] + list(range(first, last + 1))
+    assert report["bad_files"] == [os.path.join("album", "file-0000.bin"), os.path.join("album", "file-0002.bin")]
+    assert report["missing_files"] == [os.path.join("album", "file-0002.bin")]
+
+
+def test_verify_manager_marks_only_good_pieces_as_downloaded(torrentmanager, fixture_torrent):
+    info, save_path = fixture_torrent
+    bad = corrupt(info, save_path, "file-0001.bin", 5)
+    info_hash = torrentmanager.add_torrent(info, save_path, seed=True)
+    deadline = time.monotonic() + 10
+    while torrentmanager.get_handle(info_hash) is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    torrentmanager.verifier.start(info_hash, resume=True)
+    while torrentmanager.verifier.status()[info_hash]["state"] == "running" and time.monotonic() < deadline + 20:
+        time.sleep(0.05)
+    job = torrentmanager.verifier.status()[info_hash]
+    assert job["state"] == "done"
+    assert job["report"]["bad_pieces"] == [bad]
+
+    while time.monotonic() < deadline + 30:
+        handle = torrentmanager.get_handle(info_hash)
+        if handle is not None and handle.status().has_metadata:
+            break
+        time.sleep(0.05)
+    assert list(handle.status().pieces) == have_pieces(info.num_pieces(), [bad])
@@ -0,0 +1,74 @@
+import os
+import time
+import shutil
+import libtorrent as lt
+from benchmarks.swarm import Seeder
+
+MAGNET = "magnet:?xt=urn:btih:" + "ab" * 20 + "&dn=fetching"
+
+
+def drop(path, data=None, source=None):
+    """Write or copy a file into the watch folder, dated before the settle time."""
+    if source is not None:
+        shutil.copy(source, path)
+    else:
+        with open(path, "w") as f:
+            f.write(data)
+    past = time.time() - 60
+    os.utime(path, (past, past))
+    return path
+
+
+def wait_for(torrentmanager, count, timeout=10):
+    deadline = time.monotonic() + timeout
+    while len(torrentmanager.torrents) < count and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return len(torrentmanager.torrents)
+
+
+def test_scan_adds_torrents_and_magnets_and_marks_the_files(tmp_path, torrentmanager, torrent_file):
+    folder = tmp_path / "watch"
+    folder.mkdir()
+    drop(folder / "item.torrent", source=torrent_file)
+    drop(folder / "links.magnet", f"# fetched later\n{MAGNET}\n")
+    drop(folder / "broken.torrent", "not bencoded")
+    drop(folder / "notes.txt", "ignored")
+
+    counts = torrentmanager.watch_folder.scan(str(folder))
+
+    assert counts == {"added": 2, "duplicate": 0, "invalid": 1}
+    assert sorted(os.listdir(folder)) == ["broken.torrent.invalid", "item.torrent.added", "links.magnet.added", "notes.txt"]
+    assert wait_for(torrentmanager, 2) == 2
+    assert "ab" * 20 in torrentmanager.torrents
+
+
+def test_scan_skips_loaded_and_unsettled_files(tmp_path, torrentmanager, torrent_file):
+    folder = tmp_path / "watch"
+    folder.mkdir()
+    drop(folder / "first.torrent", source=torrent_file)
+    torrentmanager.watch_folder.scan(str(folder))
+    assert wait_for(torrentmanager, 1) == 1
+
+    drop(folder / "again.torrent", source=torrent_file)
+    shutil.copy(torrent_file, folder / "copying.torrent")
+    assert torrentmanager.watch_folder.scan(str(folder)) == {"added": 0, "duplicate": 1, "invalid": 0}
+    assert (folder / "copying.torrent").exists()
+
+
+def test_magnet_fetches_metadata_from_a_loopback_peer(tmp_path, torrentmanager, torrent_file):
+    seeder = Seeder(torrent_file, str(tmp_path / "content"))
+    assert seeder.wait_seeding()
+    info_hash = str(seeder.handle.info_hashes().get_best())
+    folder = tmp_path / "watch"
+    folder.mkdir()
+    drop(folder / "item.magnet", f"{lt.make_magnet_uri(seeder.handle)}&x.pe=127.0.0.1:{seeder.port}\n")
+
+    assert torrentmanager.watch_folder.scan(str(folder))["added"] == 1
+    assert wait_for(torrentmanager, 1) == 1
+    deadline = time.monotonic() + 10
+    while torrentmanager.metadata_pending() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert torrentmanager.metadata_pending() == {}
+    while torrentmanager.store.get(info_hash)["torrent"] is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert lt.torrent_info(lt.bdecode(torrentmanager.store.get(info_hash)["torrent"])).name() == "item"
@@ -0,0 +1,5 @@
+from modules.verify import main
+
+
+if __name__ == "__main__":
+    main()